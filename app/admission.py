@@ -0,0 +1,254 @@
+"""
+Допуск запросов под нагрузкой и сроки выполнения запросов к базе.
+
+Без ограничений при перегрузке запросы копятся в ожидании соединения пула
+в get_async_db и истекают все вместе. AdmissionMiddleware пропускает к
+обработчикам не больше ADMISSION_CONCURRENCY запросов (по умолчанию — размер
+пула с переполнением), остальные ждут в ограниченной очереди своего класса.
+Освободившийся слот получает ожидающий из самого приоритетного класса.
+При полной очереди или слишком долгом ожидании запрос сразу получает 503
+с Retry-After, пока клиент ещё может повторить его на другом воркере.
+
+Каждый допущенный запрос получает срок (deadline) своего класса: в начале
+каждой транзакции сессии выставляется SET LOCAL statement_timeout на
+оставшееся время, и медленный запрос к базе не держит соединение дольше срока.
+"""
+import asyncio
+import math
+from collections import deque
+from contextvars import ContextVar
+from time import monotonic
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse
+
+from app.config import (
+    ADMISSION_CONCURRENCY,
+    ADMISSION_MAX_WAIT_SECONDS,
+    ADMISSION_QUEUE,
+    ADMISSION_RESERVED,
+    ADMISSION_RETRY_AFTER,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    REQUEST_DEADLINE_SECONDS,
+)
+
+
+# Код ошибки PostgreSQL query_canceled, в том числе по statement_timeout
+QUERY_CANCELED = "57014"
+
+# Не проходят через допуск: проверки здоровья, счётчики и файлы изображений
+EXEMPT_PREFIXES = ("/health/", "/metrics", "/images/")
+
+# Вход и обновление токенов: без них пользователь не может продолжить работу.
+# Оформления заказа в API пока нет; его маршрут добавляется сюда же
+CRITICAL_ROUTES = {
+    ("POST", "/users/token"),
+    ("POST", "/users/refresh-token"),
+    ("POST", "/users/access-token"),
+}
+# Выборки без ограничения размера, которые дольше всех держат соединение
+HEAVY_PATHS = {"/reviews/"}
+HEAVY_PREFIXES = ("/products/category/",)
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class RouteClass:
+    """
+    Класс маршрутов: приоритет (меньше — важнее), предел слотов, очередь и сроки.
+    """
+
+    def __init__(self, name: str, priority: int, limit: int, queue: int, max_wait: float, deadline: float):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.deadline = deadline
+        self.running = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.counters = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0, "deadline_exceeded": 0}
+
+    def stats(self) -> dict:
+        return {"running": self.running, "waiting": len(self.waiters), **self.counters}
+
+
+def default_classes(capacity: int, queue: int = ADMISSION_QUEUE, max_wait: float = ADMISSION_MAX_WAIT_SECONDS,
+                    deadline: float = REQUEST_DEADLINE_SECONDS) -> dict[str, RouteClass]:
+    """
+    Критичные маршруты ждут дольше и получают больший срок. Тяжёлым выборкам
+    достаётся не больше четверти слотов и короткая очередь.
+    """
+    return {
+        "critical": RouteClass("critical", 0, capacity, queue, max_wait * 4, deadline * 2),
+        "write": RouteClass("write", 1, capacity, queue, max_wait, deadline),
+        "read": RouteClass("read", 2, capacity, queue, max_wait, deadline),
+        "heavy": RouteClass("heavy", 3, max(1, capacity // 4), max(1, queue // 4), max_wait, deadline),
+    }
+
+
+def classify(method: str, path: str) -> str | None:
+    """
+    Класс запроса или None для маршрутов без допуска.
+    """
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    if (method, path) in CRITICAL_ROUTES:
+        return "critical"
+    if method not in ("GET", "HEAD"):
+        return "write"
+    if path in HEAVY_PATHS or path.startswith(HEAVY_PREFIXES):
+        return "heavy"
+    return "read"
+
+
+class AdmissionController:
+    """
+    Общие на процесс слоты выполнения с очередями по классам. Последние
+    reserved слотов достаются только самому приоритетному классу.
+    """
+
+    def __init__(self, capacity: int, classes: dict[str, RouteClass], reserved: int = ADMISSION_RESERVED):
+        self.capacity = capacity
+        self.classes = classes
+        self._by_priority = sorted(classes.values(), key=lambda route_class: route_class.priority)
+        self._top_priority = self._by_priority[0].priority
+        self.reserved = min(reserved, capacity - 1)
+        self.running = 0
+
+    def _can_run(self, route_class: RouteClass) -> bool:
+        available = self.capacity if route_class.priority == self._top_priority else self.capacity - self.reserved
+        return self.running < available and route_class.running < route_class.limit
+
+    def _grant(self, route_class: RouteClass) -> None:
+        self.running += 1
+        route_class.running += 1
+        route_class.counters["admitted"] += 1
+
+    def _wake(self) -> None:
+        for route_class in self._by_priority:
+            while route_class.waiters and self._can_run(route_class):
+                waiter = route_class.waiters.popleft()
+                if not waiter.done():
+                    self._grant(route_class)
+                    waiter.set_result(None)
+
+    async def acquire(self, route_class: RouteClass) -> bool:
+        """
+        Занимает слот. False — запрос нужно отклонить: очередь полна или ожидание истекло.
+        """
+        # Освободившийся слот сразу отдаётся ожидающим, поэтому новый запрос
+        # обходит очередь своего класса, только если она пуста
+        if not route_class.waiters and self._can_run(route_class):
+            self._grant(route_class)
+            return True
+        if len(route_class.waiters) >= route_class.queue:
+            route_class.counters["rejected"] += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        route_class.waiters.append(waiter)
+        route_class.counters["queued"] += 1
+        try:
+            await asyncio.wait_for(waiter, route_class.max_wait)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Слот выдан одновременно с отменой — возвращаем его
+                self.release(route_class)
+            elif waiter in route_class.waiters:
+                route_class.waiters.remove(waiter)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            route_class.counters["timed_out"] += 1
+            return False
+
+    def release(self, route_class: RouteClass) -> None:
+        self.running -= 1
+        route_class.running -= 1
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "running": self.running,
+            **{name: route_class.stats() for name, route_class in self.classes.items()},
+        }
+
+
+def _overloaded(detail: str, retry_after: int = ADMISSION_RETRY_AFTER) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": detail}, headers={"Retry-After": str(retry_after)})
+
+
+def _is_deadline_error(exc: BaseException) -> bool:
+    if isinstance(exc, DeadlineExceeded):
+        return True
+    return isinstance(exc, DBAPIError) and getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED
+
+
+class AdmissionMiddleware:
+    """
+    Допуск по классам маршрутов и срок запроса. Превышение срока в базе,
+    если ответ ещё не начат, превращается в 503 вместо 500.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        name = classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.controller.classes[name]
+        if not await self.controller.acquire(route_class):
+            await _overloaded("Server is overloaded")(scope, receive, send)
+            return
+
+        started = False
+
+        async def send_tracking(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        token = _deadline.set(monotonic() + route_class.deadline)
+        try:
+            await self.app(scope, receive, send_tracking)
+        except Exception as exc:
+            if started or not _is_deadline_error(exc):
+                raise
+            route_class.counters["deadline_exceeded"] += 1
+            await _overloaded("Request deadline exceeded")(scope, receive, send)
+        finally:
+            _deadline.reset(token)
+            self.controller.release(route_class)
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_deadline(session, transaction, connection):
+    """
+    Ограничивает запросы транзакции временем, оставшимся до срока HTTP-запроса.
+    Сессии вне запросов (фоновые задачи, CLI) срока не имеют.
+    """
+    deadline = _deadline.get()
+    if deadline is None or connection.dialect.name != "postgresql":
+        return
+    remaining_ms = math.floor((deadline - monotonic()) * 1000)
+    if remaining_ms <= 0:
+        raise DeadlineExceeded()
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {remaining_ms}")
+
+
+capacity = ADMISSION_CONCURRENCY or DB_POOL_SIZE + DB_MAX_OVERFLOW
+admission = AdmissionController(capacity, default_classes(capacity))
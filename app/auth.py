@@ -1,14 +1,19 @@
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
+from functools import cache
+import hashlib
+import hmac
+from uuid import uuid4
 import jwt
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from app.models.users import User as UserModel
 from app.config import SECRET_KEY, ALGORITHM
 from app.db_depends import get_async_db
+from app.statements import ACTIVE_USER_BY_EMAIL
+from app.revocation import revocations
 
 
 # Создаём контекст для хеширования с использованием bcrypt
@@ -32,32 +37,77 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+@cache
+def _dummy_hash() -> str:
+    return pwd_context.hash("dummy-password-for-unknown-users")
+
+
+def verify_dummy_password(plain_password: str) -> bool:
+    """
+    Проверка пароля для несуществующего пользователя: занимает столько же времени,
+    сколько настоящая, чтобы по времени ответа нельзя было перебирать email.
+    Хеш вычисляется один раз на процесс.
+    """
+    pwd_context.verify(plain_password, _dummy_hash())
+    return False
+
+
+def new_token_id() -> str:
+    return uuid4().hex
+
+
 def create_access_token(data: dict):
     """
-    Создаёт JWT с payload (sub, role, id, exp).
+    Создаёт JWT с payload (sub, role, id, exp, jti, fam).
+    fam — семейство токенов одного входа; если не передано в data, начинается новое.
     """
-    to_encode = data.copy()
+    to_encode = {"fam": new_token_id(), **data}
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": new_token_id()})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def create_refresh_token(data: dict):
     """
     Создаёт refresh-токен с длительным сроком действия и token_type="refresh".
     """
-    to_encode = data.copy()
+    to_encode = {"fam": new_token_id(), **data}
     expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({
         "exp": expire,
+        "jti": new_token_id(),
         "token_type": "refresh",
     })
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme),
-                           db: AsyncSession = Depends(get_async_db)):
+def successor_refresh_token(payload: dict, rotated_at: datetime) -> str:
     """
-    Проверяет JWT и возвращает пользователя из базы.
+    refresh-токен, который выдаётся в обмен на токен payload в момент rotated_at
+    (UTC без часового пояса). jti и срок зависят только от старого jti и времени
+    первого обмена, поэтому повторный обмен того же токена получает тот же самый
+    ответ, и хранить выданный токен не нужно.
+    """
+    to_encode = {key: payload.get(key) for key in ("sub", "role", "id", "fam")}
+    token_id = hmac.new(SECRET_KEY.encode(), payload["jti"].encode(), hashlib.sha256).hexdigest()[:32]
+    to_encode.update({
+        "exp": rotated_at.replace(tzinfo=timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        "jti": token_id,
+        "token_type": "refresh",
+    })
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def refresh_token_expiry() -> float:
+    """
+    Время истечения refresh-токена, выпущенного сейчас (unix time). Семейство
+    отзывается до этого момента: дольше его токены не живут.
+    """
+    return (datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)).timestamp()
+
+
+async def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    """
+    Проверяет подпись, срок и отзыв access-токена без обращения к базе.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,9 +116,6 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -77,9 +124,28 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
         )
     except jwt.PyJWTError:
         raise credentials_exception
-    result = await db.scalars(
-        select(UserModel).where(UserModel.email == email, UserModel.is_active == True))
+    if payload.get("sub") is None or payload.get("token_type") == "refresh":
+        raise credentials_exception
+    if revocations.is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+async def get_current_user(payload: dict = Depends(get_token_payload),
+                           db: AsyncSession = Depends(get_async_db)):
+    """
+    Проверяет JWT и возвращает пользователя из базы.
+    """
+    result = await db.scalars(ACTIVE_USER_BY_EMAIL, {"email": payload["sub"]})
     user = result.first()
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import math
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.config import CATALOG_SNAPSHOT, CATALOG_SNAPSHOT_REFRESH_SECONDS
+from app.database import async_session_maker
+from app.models import Product as ProductModel
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для режима снимка
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+
+PRODUCT_COLUMNS = (
+    ProductModel.id,
+    ProductModel.name,
+    ProductModel.description,
+    ProductModel.price,
+    ProductModel.image_url,
+    ProductModel.stock,
+    ProductModel.category_id,
+    ProductModel.seller_id,
+    ProductModel.rating,
+    ProductModel.review_count,
+    ProductModel.score,
+    ProductModel.created_at,
+    ProductModel.updated_at,
+    ProductModel.is_active,
+)
+
+# Запас при инкрементальном обновлении: строки, закоммиченные чуть позже
+# своей отметки updated_at, всё равно попадут в выборку
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+class CatalogSnapshot:
+    """
+    Колоночный снимок активных товаров в массивах numpy.
+
+    Фильтры GET /products/ вычисляются векторными масками, пагинация — в памяти.
+    Снимок обновляется инкрементально по products.updated_at.
+    """
+
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("Для CATALOG_SNAPSHOT=1 установите numpy")
+        self.ready = False
+        self._watermark = None
+        self._columns = self._to_columns([])
+
+    @staticmethod
+    def _to_columns(rows) -> dict:
+        count = len(rows)
+
+        def numeric(name, dtype):
+            return np.fromiter((getattr(row, name) for row in rows), dtype=dtype, count=count)
+
+        def objects(name):
+            column = np.empty(count, dtype=object)
+            column[:] = [getattr(row, name) for row in rows]
+            return column
+
+        def dates(name):
+            return np.array([getattr(row, name) or np.datetime64("NaT") for row in rows],
+                            dtype="datetime64[us]")
+
+        return {
+            "id": numeric("id", np.int64),
+            "name": objects("name"),
+            "description": objects("description"),
+            "price": np.fromiter((int(row.price * 100) for row in rows), dtype=np.int64, count=count),
+            "image_url": objects("image_url"),
+            "stock": numeric("stock", np.int64),
+            "category_id": numeric("category_id", np.int64),
+            "seller_id": numeric("seller_id", np.int64),
+            "rating": np.fromiter((math.nan if row.rating is None else row.rating for row in rows),
+                                  dtype=np.float64, count=count),
+            "review_count": numeric("review_count", np.int64),
+            "score": numeric("score", np.float64),
+            "created_at": dates("created_at"),
+            "updated_at": dates("updated_at"),
+        }
+
+    def __len__(self) -> int:
+        return len(self._columns["id"])
+
+    def nbytes(self) -> int:
+        """
+        Примерный объём снимка в памяти, включая строки в объектных колонках.
+        """
+        total = 0
+        for column in self._columns.values():
+            total += column.nbytes
+            if column.dtype == object:
+                total += sum(len(value) + 49 for value in column if value is not None)
+        return total
+
+    def _advance_watermark(self, rows) -> None:
+        stamps = [row.updated_at for row in rows if row.updated_at is not None]
+        if stamps:
+            latest = max(stamps)
+            if self._watermark is None or latest > self._watermark:
+                self._watermark = latest
+
+    def load(self, rows) -> None:
+        """
+        Полностью заменяет снимок активными строками rows.
+        """
+        rows = sorted((row for row in rows if row.is_active), key=lambda row: row.id)
+        self._columns = self._to_columns(rows)
+        self._advance_watermark(rows)
+        self.ready = True
+
+    def apply(self, rows) -> int:
+        """
+        Применяет изменённые строки (включая ставшие неактивными).
+        Возвращает количество реально изменившихся товаров.
+        """
+        columns = self._columns
+        ids = columns["id"]
+        keep = np.ones(len(ids), dtype=bool)
+        fresh = []
+        for row in rows:
+            pos = int(np.searchsorted(ids, row.id))
+            if pos < len(ids) and ids[pos] == row.id:
+                if row.is_active and columns["updated_at"][pos] == np.datetime64(row.updated_at, "us"):
+                    continue
+                keep[pos] = False
+            if row.is_active:
+                fresh.append(row)
+
+        changed = len(fresh) + int((~keep).sum())
+        if changed:
+            new = self._to_columns(fresh)
+            merged = {name: np.concatenate([column[keep], new[name]]) for name, column in columns.items()}
+            order = np.argsort(merged["id"], kind="stable")
+            self._columns = {name: column[order] for name, column in merged.items()}
+        self._advance_watermark(rows)
+        return changed
+
+    async def refresh(self) -> int:
+        async with async_session_maker() as db:
+            if not self.ready:
+                result = await db.execute(select(*PRODUCT_COLUMNS).where(ProductModel.is_active == True))
+                rows = result.all()
+                self.load(rows)
+                return len(rows)
+
+            stmt = select(*PRODUCT_COLUMNS).where(ProductModel.updated_at.isnot(None))
+            if self._watermark is not None:
+                stmt = stmt.where(ProductModel.updated_at >= self._watermark - REFRESH_OVERLAP)
+            result = await db.execute(stmt)
+            return self.apply(result.all())
+
+    async def run(self, interval: float = CATALOG_SNAPSHOT_REFRESH_SECONDS) -> None:
+        """
+        Фоновый цикл обновления снимка.
+        """
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Catalog snapshot refresh failed")
+            await asyncio.sleep(interval)
+
+    def _row(self, pos: int) -> dict:
+        columns = self._columns
+        rating = columns["rating"][pos]
+        return {
+            "id": int(columns["id"][pos]),
+            "name": columns["name"][pos],
+            "description": columns["description"][pos],
+            "price": Decimal(int(columns["price"][pos])).scaleb(-2),
+            "image_url": columns["image_url"][pos],
+            "stock": int(columns["stock"][pos]),
+            "category_id": int(columns["category_id"][pos]),
+            "is_active": True,
+            "rating": None if math.isnan(rating) else int(rating),
+            "review_count": int(columns["review_count"][pos]),
+            "score": float(columns["score"][pos]),
+            "created_at": columns["created_at"][pos].item(),
+            "updated_at": columns["updated_at"][pos].item(),
+        }
+
+    def list(
+            self,
+            page: int,
+            page_size: int,
+            category_id: int | None = None,
+            min_price: float | None = None,
+            max_price: float | None = None,
+            in_stock: bool | None = None,
+            seller_id: int | None = None,
+            created_at: date | None = None,
+            updated_at: date | None = None,
+            sort_key: str = "id",
+            descending: bool = False,
+    ) -> dict:
+        """
+        Возвращает страницу товаров и общее количество, как SQL-путь GET /products/.
+        """
+        columns = self._columns
+        mask = np.ones(len(columns["id"]), dtype=bool)
+
+        if category_id is not None:
+            mask &= columns["category_id"] == category_id
+        if min_price is not None:
+            mask &= columns["price"] >= math.ceil(round(min_price * 100, 6))
+        if max_price is not None:
+            mask &= columns["price"] <= math.floor(round(max_price * 100, 6))
+        if in_stock is not None:
+            mask &= columns["stock"] > 0 if in_stock else columns["stock"] == 0
+        if seller_id is not None:
+            mask &= columns["seller_id"] == seller_id
+        if created_at is not None:
+            mask &= columns["created_at"].astype("datetime64[D]") == np.datetime64(created_at)
+        if updated_at is not None:
+            mask &= columns["updated_at"].astype("datetime64[D]") == np.datetime64(updated_at)
+
+        positions = np.flatnonzero(mask)
+        if sort_key != "id":
+            # Как в SQL: (ключ, id) по возрастанию, NULL в конце; при DESC — всё наоборот
+            positions = positions[np.lexsort((columns["id"][positions], columns[sort_key][positions]))]
+        if descending:
+            positions = positions[::-1]
+
+        page_positions = positions[(page - 1) * page_size: page * page_size]
+        return {
+            "items": [self._row(pos) for pos in page_positions],
+            "total": len(positions),
+        }
+
+
+catalog = CatalogSnapshot() if CATALOG_SNAPSHOT else None
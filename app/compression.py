@@ -0,0 +1,185 @@
+"""
+Сжатие ответов по Accept-Encoding: zstd, br или gzip.
+
+zstd и br доступны, если установлены пакеты zstandard и brotli; gzip есть всегда.
+Ответы меньше COMPRESSION_MIN_SIZE не сжимаются, большие тела сжимаются
+в пуле потоков, чтобы не блокировать цикл событий. Сжатые тела кэшируются
+по хешу исходного тела: повторная отдача одного и того же ответа
+(микрокэши, снимок каталога) не тратит CPU на сжатие.
+"""
+import asyncio
+import gzip
+import hashlib
+from collections import OrderedDict
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_CACHE_ENTRIES,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_OFFLOAD_SIZE,
+    COMPRESSION_ZSTD_LEVEL,
+)
+
+try:
+    import brotli
+except ImportError:  # br предлагается, только если установлен brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstd предлагается, только если установлен zstandard
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def _gzip(body: bytes) -> bytes:
+    # mtime=0 — одинаковое тело всегда даёт одинаковый результат
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+
+
+def _zstd(body: bytes) -> bytes:
+    # ZstdCompressor не потокобезопасен, поэтому создаётся на каждый вызов
+    return zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(body)
+
+
+# Кодеки в порядке предпочтения сервера
+CODECS = {
+    name: codec
+    for name, codec, available in (
+        ("zstd", _zstd, zstandard is not None),
+        ("br", _brotli, brotli is not None),
+        ("gzip", _gzip, True),
+    )
+    if available
+}
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    Выбирает кодек из Accept-Encoding: наибольший q, при равенстве — порядок CODECS.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        weights[name] = quality
+
+    best, best_quality = None, 0.0
+    for name in CODECS:
+        quality = weights.get(name, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class CompressionCache:
+    """
+    LRU сжатых тел по (хеш исходного тела, кодек).
+    """
+
+    def __init__(self, max_entries: int = COMPRESSION_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[bytes, str], bytes] = OrderedDict()
+        self._stats = {"compressed": 0, "cache_hits": 0, "skipped": 0, "bytes_in": 0, "bytes_out": 0}
+
+    async def compress(self, body: bytes, encoding: str) -> bytes:
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        compressed = self._entries.get(key)
+        if compressed is not None:
+            self._entries.move_to_end(key)
+            self._stats["cache_hits"] += 1
+        else:
+            codec = CODECS[encoding]
+            if len(body) >= COMPRESSION_OFFLOAD_SIZE:
+                compressed = await asyncio.to_thread(codec, body)
+            else:
+                compressed = codec(body)
+            self._stats["compressed"] += 1
+            if self.max_entries:
+                self._entries[key] = compressed
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        self._stats["bytes_in"] += len(body)
+        self._stats["bytes_out"] += len(compressed)
+        return compressed
+
+    def record(self, event: str) -> None:
+        self._stats[event] += 1
+
+    def stats(self) -> dict:
+        return {**self._stats, "entries": len(self._entries), "codecs": list(CODECS)}
+
+
+class CompressionMiddleware:
+    """
+    Сжимает тела ответов, целиком отданные одним сообщением.
+    Потоковые ответы, уже сжатые и неподходящие по типу тела передаются как есть.
+    """
+
+    def __init__(self, app, cache: CompressionCache, min_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.cache = cache
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def compress_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            if (message.get("more_body", False)
+                    or len(body) < self.min_size
+                    or "content-encoding" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)):
+                self.cache.record("skipped")
+                await send(start)
+                await send(message)
+                return
+
+            compressed = await self.cache.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send({**start, "headers": headers.raw})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, compress_send)
+
+
+compression_cache = CompressionCache()
@@ -4,4 +4,156 @@ from dotenv import load_dotenv
 
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = "HS256"
\ No newline at end of file
+ALGORITHM = "HS256"
+
+# Окно микрокэша (в секундах) для объединённых чтений товаров и категорий.
+# 0 — только объединение одновременных запросов без кэширования результата.
+SINGLEFLIGHT_CACHE_TTL = float(os.getenv("SINGLEFLIGHT_CACHE_TTL", "0"))
+# Предел числа ключей микрокэша; при переполнении вытесняются давно не читавшиеся
+SINGLEFLIGHT_CACHE_MAX_ENTRIES = int(os.getenv("SINGLEFLIGHT_CACHE_MAX_ENTRIES", "10000"))
+
+# Байесовская оценка товара: (PRIOR_WEIGHT * PRIOR_MEAN + сумма оценок) / (PRIOR_WEIGHT + число оценок)
+RATING_PRIOR_MEAN = float(os.getenv("RATING_PRIOR_MEAN", "3.5"))
+RATING_PRIOR_WEIGHT = float(os.getenv("RATING_PRIOR_WEIGHT", "10"))
+
+# Режим чтения списка товаров из колоночного снимка в памяти (требует numpy)
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", "0") == "1"
+CATALOG_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("CATALOG_SNAPSHOT_REFRESH_SECONDS", "5"))
+
+# Хранение ответов для повторов запросов с заголовком Idempotency-Key
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# postgres — таблица idempotency_keys, общая для всех воркеров; memory — память процесса
+# (только для одного воркера: повтор на другом воркере выполнится заново)
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "postgres")
+# Через сколько секунд незавершённый запрос (например, упавшего воркера) перестаёт держать ключ
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+# Архивирование мягко удалённых товаров и отзывов
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+# Период фонового архивирования в секундах; 0 — только через CLI
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+
+# Сколько месяцев вперёд держать созданные секции таблицы reviews
+REVIEW_PARTITIONS_AHEAD = int(os.getenv("REVIEW_PARTITIONS_AHEAD", "3"))
+
+# Страница товара GET /products/{id}/page: число последних отзывов, время жизни
+# и предел числа страниц в кэше. Кэш у каждого процесса свой: запись сбрасывает
+# его только в том воркере, который её выполнил, остальные отдают старую
+# страницу до истечения TTL
+PRODUCT_PAGE_REVIEWS = int(os.getenv("PRODUCT_PAGE_REVIEWS", "10"))
+PRODUCT_PAGE_CACHE_TTL = float(os.getenv("PRODUCT_PAGE_CACHE_TTL", "10"))
+PRODUCT_PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_PAGE_CACHE_MAX_ENTRIES", "5000"))
+
+# Материализованная статистика продавцов и категорий: период пересчёта в секундах
+# (0 — только через CLI) и окно для числа отзывов в день
+STATS_REFRESH_SECONDS = float(os.getenv("STATS_REFRESH_SECONDS", "300"))
+SELLER_STATS_WINDOW_DAYS = int(os.getenv("SELLER_STATS_WINDOW_DAYS", "30"))
+
+# Ограничение попыток входа: лимиты в скользящем окне по email и по IP клиента
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_EMAIL_MAX_ATTEMPTS = int(os.getenv("LOGIN_EMAIL_MAX_ATTEMPTS", "5"))
+LOGIN_IP_MAX_ATTEMPTS = int(os.getenv("LOGIN_IP_MAX_ATTEMPTS", "50"))
+LOGIN_THROTTLE_MAX_KEYS = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))
+# Общий Redis для счётчиков всех воркеров; если не задан, счётчики хранятся по
+# LOGIN_THROTTLE_BACKEND: postgres — таблица login_attempts, memory — память процесса
+# (только для одного воркера: при N воркерах лимит фактически в N раз больше)
+LOGIN_THROTTLE_REDIS_URL = os.getenv("LOGIN_THROTTLE_REDIS_URL", "")
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "postgres")
+# Адреса и сети CDN и балансировщиков через запятую (например, 10.0.0.0/8): только от них
+# принимается X-Forwarded-For для адреса клиента; пусто — адрес соединения
+TRUSTED_PROXIES = os.getenv("TRUSTED_PROXIES", "")
+
+# Как часто каждый воркер подтягивает новые отзывы токенов из revoked_tokens
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "1"))
+# Сколько секунд после обмена refresh-токена его повторное предъявление (повтор
+# запроса клиентом, две вкладки) получает тот же новый токен, а не отзыв семейства
+REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "30"))
+
+# Сжатие ответов: минимальный размер тела, уровни кодеков, размер тела,
+# начиная с которого сжатие уходит в пул потоков, и размер кэша сжатых тел
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", "65536"))
+COMPRESSION_CACHE_ENTRIES = int(os.getenv("COMPRESSION_CACHE_ENTRIES", "512"))
+
+# Логирование: уровень, логи запросов, доля SQL-запросов в логе и порог медленного запроса
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+REQUEST_LOG = os.getenv("REQUEST_LOG", "1") == "1"
+SQL_LOG_SAMPLE_RATE = float(os.getenv("SQL_LOG_SAMPLE_RATE", "0"))
+SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "200"))
+# Вывод всех SQL-запросов движками (синхронно, только для отладки)
+SQL_ECHO = os.getenv("SQL_ECHO", "0") == "1"
+
+# Пул соединений асинхронного движка (на каждый процесс) и сколько из них
+# открыть при старте до готовности принимать трафик
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(DB_POOL_SIZE)))
+# Остановка по SIGTERM: сколько секунд после снятия готовности ещё принимать запросы,
+# пока балансировщик не исключит процесс, и сколько затем ждать завершения начатых
+SHUTDOWN_PRESTOP_SECONDS = float(os.getenv("SHUTDOWN_PRESTOP_SECONDS", "5"))
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+
+# Многопроцессный запуск (python -m app.server): адрес, число воркеров (0 — по числу ядер),
+# перезапуск воркера после WEB_MAX_REQUESTS запросов (0 — без перезапуска), SO_REUSEPORT
+# и импорт приложения до fork
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.getenv("WEB_PORT", "8000"))
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0"))
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "0"))
+WEB_REUSEPORT = os.getenv("WEB_REUSEPORT", "0") == "1"
+WEB_PRELOAD = os.getenv("WEB_PRELOAD", "1") == "1"
+# Общий лимит соединений с базой на все воркеры, включая соединение блокировки
+# фоновых задач (app.leader); 0 — DB_POOL_SIZE с переполнением на каждый воркер
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "40"))
+# Как часто процесс пробует стать исполнителем фоновых задач и проверяет блокировку
+JOB_LEADER_RETRY_SECONDS = float(os.getenv("JOB_LEADER_RETRY_SECONDS", "15"))
+
+# Изображения товаров: каталог хранилища, максимальный размер загрузки
+# и число процессов для построения уменьшенных копий
+IMAGE_STORAGE_DIR = os.getenv("IMAGE_STORAGE_DIR", "media/images")
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# Подсказки по началу названия товара: предел числа названий в памяти (около
+# 300 байт на название; сверх предела остаются товары с наибольшей оценкой),
+# длина хранимого префикса, число подсказок на тяжёлый префикс, длина диапазона,
+# начиная с которой лучшие товары префикса считаются заранее, и период
+# дочитывания изменений
+SUGGEST_MAX_NAMES = int(os.getenv("SUGGEST_MAX_NAMES", "1000000"))
+SUGGEST_KEY_LENGTH = int(os.getenv("SUGGEST_KEY_LENGTH", "32"))
+SUGGEST_TOP_K = int(os.getenv("SUGGEST_TOP_K", "20"))
+SUGGEST_SCAN_LIMIT = int(os.getenv("SUGGEST_SCAN_LIMIT", "2000"))
+SUGGEST_REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", "5"))
+
+# Сброс кэша CDN по суррогатным ключам: адрес API сброса (пусто — не сбрасывать),
+# токен, максимум ключей в одном запросе и период отправки накопленных ключей
+CDN_PURGE_URL = os.getenv("CDN_PURGE_URL")
+CDN_PURGE_TOKEN = os.getenv("CDN_PURGE_TOKEN")
+CDN_PURGE_BATCH = int(os.getenv("CDN_PURGE_BATCH", "30"))
+CDN_PURGE_INTERVAL_SECONDS = float(os.getenv("CDN_PURGE_INTERVAL_SECONDS", "1"))
+
+# Допуск запросов: одновременно выполняемых на процесс (0 — размер пула с переполнением),
+# слотов только для критичных маршрутов (вход), длина очереди класса, предельное
+# ожидание в очереди, Retry-After отклонённых и срок запроса для statement_timeout
+ADMISSION_CONCURRENCY = int(os.getenv("ADMISSION_CONCURRENCY", "0"))
+ADMISSION_RESERVED = int(os.getenv("ADMISSION_RESERVED", "2"))
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", "50"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "0.5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "5"))
+
+# Транзакционный outbox: запускать воркер в процессе приложения (0 — только
+# отдельным процессом python -m app.jobs.outbox), размер пачки, пауза между
+# опросами, число попыток и экспоненциальная задержка повторов
+OUTBOX_WORKER = os.getenv("OUTBOX_WORKER", "1") == "1"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "0.5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "1"))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "300"))
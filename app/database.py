@@ -1,17 +1,35 @@
 import os
+from datetime import datetime, timezone
+from functools import cache
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.config import DB_MAX_OVERFLOW, DB_POOL_SIZE, SQL_ECHO
+
 
 # Строка подключения для SQLite (sync)
 SYNC_DATABASE_URL = os.getenv("SYNC_DATABASE_URL", "sqlite:///ecommerce.db")
 
-# Создаём Engine
-engine = create_engine(SYNC_DATABASE_URL, echo=True)
 
-# Настраиваем фабрику сеансов
-SessionLocal = sessionmaker(bind=engine)
+@cache
+def get_sync_engine():
+    """
+    Синхронный Engine создаётся при первом обращении: основной путь приложения
+    асинхронный, и файл SQLite не нужен, пока им никто не пользуется.
+    """
+    return create_engine(SYNC_DATABASE_URL, echo=SQL_ECHO)
+
+
+# Настраиваем фабрику сеансов; Engine подставляется в get_db
+SessionLocal = sessionmaker()
+
+
+def __getattr__(name: str):
+    # Совместимость со старым app.database.engine без создания Engine при импорте
+    if name == "engine":
+        return get_sync_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # --------------- Асинхронное подключение к PostgreSQL -------------------------
@@ -26,7 +44,13 @@ ASYNC_DATABASE_URL = os.getenv(
 )
 
 # Создаём Engine
-async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=SQL_ECHO,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+)
 
 # Настраиваем фабрику сеансов
 async_session_maker = async_sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
@@ -34,3 +58,11 @@ async_session_maker = async_sessionmaker(async_engine, expire_on_commit=False, c
 
 class Base(DeclarativeBase):
     pass
+
+
+def utc_now() -> datetime:
+    """
+    Текущее время UTC без часового пояса: колонки DateTime моделей — timestamp
+    without time zone, и asyncpg не принимает для них aware datetime.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
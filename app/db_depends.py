@@ -1,10 +1,10 @@
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
+from app.database import SessionLocal, get_sync_engine
 
 
 async def get_db():
-    db: Session = SessionLocal()
+    db: Session = SessionLocal(bind=get_sync_engine())
     try:
         yield db
     finally:
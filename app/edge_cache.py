@@ -0,0 +1,207 @@
+"""
+Кэширование ответов каталога на CDN.
+
+GET-эндпоинты товаров, категорий и отзывов отдают Cache-Control по политике
+маршрута и перечисляют в Surrogate-Key (через пробел, Fastly) и Cache-Tag
+(через запятую, Cloudflare) ключи сущностей, попавших в ответ. Обработчики
+записи после commit() ставят в очередь сброс ровно изменившихся ключей;
+фоновый цикл отправляет их пачками через подключаемый Purger. Без
+CDN_PURGE_URL сброс не выполняется; в тестах подставляется FakePurger.
+
+Ответы, которые сбрасываются по ключам (товар, отзывы товара, категории),
+живут на CDN долго. Списки и подборки меняют состав при любой записи,
+поэтому на CDN живут недолго и обновляются через stale-while-revalidate.
+"""
+import abc
+import asyncio
+import json
+import logging
+from collections.abc import Iterable
+from urllib.request import Request, urlopen
+
+from fastapi import Response
+
+from app.config import CDN_PURGE_BATCH, CDN_PURGE_INTERVAL_SECONDS, CDN_PURGE_TOKEN, CDN_PURGE_URL
+
+
+logger = logging.getLogger(__name__)
+
+
+def _policy(max_age: int, s_maxage: int, stale_while_revalidate: int, stale_if_error: int) -> str:
+    # max-age — для браузеров, которые сбросить нельзя; s-maxage — для CDN
+    return (f"public, max-age={max_age}, s-maxage={s_maxage}, "
+            f"stale-while-revalidate={stale_while_revalidate}, stale-if-error={stale_if_error}")
+
+
+POLICIES = {
+    # Сбрасываются по ключам при каждом изменении
+    "product": _policy(15, 86400, 60, 86400),
+    "reviews": _policy(15, 86400, 60, 86400),
+    # Число товаров в категориях пересчитывается раз в STATS_REFRESH_SECONDS
+    "categories": _policy(60, 300, 300, 86400),
+    # Состав страницы меняется без сброса: новые товары, смена цены или оценки
+    "listing": _policy(15, 60, 60, 3600),
+    "suggest": _policy(60, 300, 300, 3600),
+}
+
+CATEGORIES_KEY = "categories"
+
+
+def product_key(product_id: int) -> str:
+    return f"product-{product_id}"
+
+
+def category_key(category_id: int) -> str:
+    return f"category-{category_id}"
+
+
+def reviews_key(product_id: int) -> str:
+    return f"reviews-{product_id}"
+
+
+class SurrogateKeys:
+    """
+    Ключи ответа; каждый add() обновляет заголовки Surrogate-Key и Cache-Tag.
+    """
+
+    def __init__(self, response: Response):
+        self._response = response
+        self._keys: dict[str, None] = {}
+
+    def add(self, *keys: str) -> None:
+        self._keys.update(dict.fromkeys(keys))
+        self._response.headers["Surrogate-Key"] = " ".join(self._keys)
+        self._response.headers["Cache-Tag"] = ",".join(self._keys)
+
+    def products(self, items: Iterable) -> None:
+        """
+        Ключи товаров списка: ORM-объектов или словарей снимка каталога.
+        """
+        self.add(*(product_key(item["id"] if isinstance(item, dict) else item.id) for item in items))
+
+
+def cache_policy(name: str):
+    """
+    Зависимость маршрута: ставит Cache-Control политики name и возвращает SurrogateKeys.
+    Ответы с ошибкой (HTTPException) заголовков не получают.
+    """
+    header = POLICIES[name]
+
+    def apply(response: Response) -> SurrogateKeys:
+        response.headers["Cache-Control"] = header
+        return SurrogateKeys(response)
+
+    return apply
+
+
+class Purger(abc.ABC):
+    """
+    Способ сброса кэша CDN по ключам.
+    """
+
+    @abc.abstractmethod
+    async def purge(self, keys: list[str]) -> None:
+        ...
+
+
+class HttpPurger(Purger):
+    """
+    POST {"tags": [...]} на API сброса CDN с токеном в Authorization.
+    """
+
+    def __init__(self, url: str, token: str | None = None, timeout: float = 10):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    def _send(self, keys: list[str]) -> None:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = Request(self.url, data=json.dumps({"tags": keys}).encode(), headers=headers, method="POST")
+        with urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def purge(self, keys: list[str]) -> None:
+        await asyncio.to_thread(self._send, keys)
+
+
+class FakePurger(Purger):
+    """
+    Запоминает сброшенные ключи вместо обращения к CDN. Для тестов.
+    """
+
+    def __init__(self):
+        self.batches: list[list[str]] = []
+
+    @property
+    def keys(self) -> set[str]:
+        return {key for batch in self.batches for key in batch}
+
+    async def purge(self, keys: list[str]) -> None:
+        self.batches.append(list(keys))
+
+    def clear(self) -> None:
+        self.batches.clear()
+
+
+class EdgeCache:
+    """
+    Очередь ключей на сброс. Повторы ключа между отправками схлопываются,
+    при ошибке CDN ключи возвращаются в очередь до следующей попытки.
+    """
+
+    def __init__(self, purger: Purger | None, batch_size: int = CDN_PURGE_BATCH):
+        self.purger = purger
+        self.batch_size = batch_size
+        self._pending: dict[str, None] = {}
+        self._stats = {"purged": 0, "requests": 0, "failures": 0}
+
+    def purge(self, *keys: str) -> None:
+        """
+        Ставит ключи в очередь на сброс. Вызывается после commit().
+        """
+        if self.purger is not None:
+            self._pending.update(dict.fromkeys(keys))
+
+    async def flush(self) -> int:
+        """
+        Отправляет накопленные ключи. Возвращает число сброшенных ключей.
+        """
+        keys, self._pending = list(self._pending), {}
+        sent = 0
+        try:
+            for start in range(0, len(keys), self.batch_size):
+                batch = keys[start:start + self.batch_size]
+                self._stats["requests"] += 1
+                await self.purger.purge(batch)
+                sent += len(batch)
+        except BaseException:
+            self._stats["failures"] += 1
+            self._pending = dict.fromkeys(keys[sent:]) | self._pending
+            raise
+        finally:
+            self._stats["purged"] += sent
+        return sent
+
+    async def run(self, interval: float = CDN_PURGE_INTERVAL_SECONDS) -> None:
+        """
+        Фоновый цикл отправки сбросов для lifespan приложения.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            if not self._pending:
+                continue
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("CDN purge failed")
+
+    def clear(self) -> None:
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), **self._stats}
+
+
+edge_cache = EdgeCache(HttpPurger(CDN_PURGE_URL, CDN_PURGE_TOKEN) if CDN_PURGE_URL else None)
@@ -0,0 +1,309 @@
+"""
+Повторы пишущих запросов с заголовком Idempotency-Key.
+
+Ответы хранятся в таблице idempotency_keys (IDEMPOTENCY_BACKEND=postgres), общей
+для всех воркеров: повтор после таймаута обычно попадает в другой процесс, а
+перезапуск воркера по max-requests не должен терять сохранённые ответы.
+IDEMPOTENCY_BACKEND=memory хранит их в памяти процесса и подходит только
+для запуска в одном воркере.
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import timedelta
+from time import monotonic
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+
+from app.config import (
+    IDEMPOTENCY_BACKEND,
+    IDEMPOTENCY_LOCK_SECONDS,
+    IDEMPOTENCY_MAX_ENTRIES,
+    IDEMPOTENCY_TTL_SECONDS,
+)
+from app.database import async_session_maker, utc_now
+from app.models import IdempotencyKey
+
+
+# Пишущие эндпоинты, которые клиенты повторяют при таймаутах
+IDEMPOTENT_PATHS = frozenset({"/products/", "/reviews/", "/users/"})
+# Как часто удалять из таблицы истёкшие ключи
+PURGE_INTERVAL_SECONDS = 60 * 60
+
+# Сохранённый ответ: (статус, заголовки, тело)
+StoredResponse = tuple[int, list, bytes]
+
+
+class _Entry:
+    def __init__(self, fingerprint: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.done = asyncio.Event()
+        self.response: tuple[int, list, bytes] | None = None
+
+
+class IdempotencyStore:
+    """
+    LRU-хранилище ответов в памяти процесса с ограничением по времени жизни.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._stats = {"stored": 0, "replayed": 0, "waited": 0, "mismatched": 0}
+
+    def get(self, key: tuple) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def start(self, key: tuple, fingerprint: str) -> _Entry:
+        entry = _Entry(fingerprint, monotonic() + self.ttl)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, key: tuple, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    async def begin(self, key: tuple, fingerprint: str) -> tuple[str, object]:
+        """
+        Занимает ключ для выполнения запроса. Возвращает ("run", claim) — выполнить
+        и передать claim в finish(); ("replay", ответ) или ("mismatch", None).
+        Если ключ занят таким же запросом, ждёт его завершения.
+        """
+        while True:
+            entry = self.get(key)
+            if entry is None:
+                return "run", self.start(key, fingerprint)
+            if entry.fingerprint != fingerprint:
+                self.record("mismatched")
+                return "mismatch", None
+            if entry.response is None:
+                self.record("waited")
+                await entry.done.wait()
+                continue
+            self.record("replayed")
+            return "replay", entry.response
+
+    async def finish(self, key: tuple, claim: _Entry, response: StoredResponse | None) -> None:
+        """
+        Сохраняет ответ или, если response is None, освобождает ключ для повтора.
+        """
+        if response is None:
+            self.discard(key, claim)
+        else:
+            claim.response = response
+            self.record("stored")
+        claim.done.set()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def record(self, event: str) -> None:
+        self._stats[event] += 1
+
+    def stats(self) -> dict:
+        return {**self._stats, "backend": "memory", "entries": len(self._entries)}
+
+
+class PostgresIdempotencyStore:
+    """
+    Хранилище ответов в таблице idempotency_keys, общее для всех процессов.
+
+    Ключ занимается вставкой строки без ответа; одновременный повтор в любом
+    воркере видит её и опрашивает таблицу, пока не появится ответ. Строку
+    без ответа старше lock_timeout (воркер упал во время запроса) можно
+    занять заново.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker = async_session_maker,
+                 ttl: float = IDEMPOTENCY_TTL_SECONDS, lock_timeout: float = IDEMPOTENCY_LOCK_SECONDS,
+                 poll: float = 0.05, max_poll: float = 1.0):
+        self.session_maker = session_maker
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.poll = poll
+        self.max_poll = max_poll
+        self._last_purge = monotonic()
+        self._stats = {"stored": 0, "replayed": 0, "waited": 0, "mismatched": 0}
+
+    @staticmethod
+    def _hash(key: tuple) -> str:
+        return hashlib.sha256("\0".join(key).encode()).hexdigest()
+
+    def _claim(self, key_hash: str, fingerprint: str, now):
+        stmt = insert(IdempotencyKey).values(
+            key=key_hash, fingerprint=fingerprint, created_at=now, expires_at=now + timedelta(seconds=self.ttl))
+        # Истёкший ключ или брошенный незавершённый запрос занимаются заново
+        return stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={"fingerprint": stmt.excluded.fingerprint, "created_at": stmt.excluded.created_at,
+                  "expires_at": stmt.excluded.expires_at, "status_code": None, "headers": None, "body": None},
+            where=or_(
+                IdempotencyKey.expires_at < now,
+                and_(IdempotencyKey.status_code.is_(None),
+                     IdempotencyKey.created_at < now - timedelta(seconds=self.lock_timeout)),
+            ),
+        ).returning(IdempotencyKey.created_at)
+
+    async def begin(self, key: tuple, fingerprint: str) -> tuple[str, object]:
+        """
+        То же, что IdempotencyStore.begin(); claim — (хеш ключа, время занятия).
+        """
+        key_hash = self._hash(key)
+        delay = self.poll
+        waited = False
+        while True:
+            now = utc_now()
+            async with self.session_maker() as db:
+                claimed_at = await db.scalar(self._claim(key_hash, fingerprint, now))
+                row = None
+                if claimed_at is None:
+                    row = (await db.execute(
+                        select(IdempotencyKey.fingerprint, IdempotencyKey.status_code,
+                               IdempotencyKey.headers, IdempotencyKey.body)
+                        .where(IdempotencyKey.key == key_hash)
+                    )).first()
+                if monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                    self._last_purge = monotonic()
+                    await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < now))
+                await db.commit()
+
+            if claimed_at is not None:
+                return "run", (key_hash, claimed_at)
+            if row is None:
+                # Владелец освободил ключ между запросами: пробуем занять снова
+                continue
+            if row.fingerprint != fingerprint:
+                self._stats["mismatched"] += 1
+                return "mismatch", None
+            if row.status_code is not None:
+                self._stats["replayed"] += 1
+                headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in row.headers]
+                return "replay", (row.status_code, headers, row.body)
+            if not waited:
+                waited = True
+                self._stats["waited"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_poll)
+
+    async def finish(self, key: tuple, claim: tuple, response: StoredResponse | None) -> None:
+        key_hash, claimed_at = claim
+        # Только своя незавершённая строка: после lock_timeout ключ мог занять другой запрос
+        mine = and_(IdempotencyKey.key == key_hash, IdempotencyKey.created_at == claimed_at,
+                    IdempotencyKey.status_code.is_(None))
+        async with self.session_maker() as db:
+            if response is None:
+                await db.execute(delete(IdempotencyKey).where(mine))
+            else:
+                status_code, headers, content = response
+                await db.execute(update(IdempotencyKey).where(mine).values(
+                    status_code=status_code,
+                    headers=[[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers],
+                    body=content,
+                ))
+                self._stats["stored"] += 1
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {**self._stats, "backend": "postgres"}
+
+
+class IdempotencyMiddleware:
+    """
+    Учитывает заголовок Idempotency-Key для POST-запросов к IDEMPOTENT_PATHS.
+
+    Первый запрос выполняется как обычно, и его ответ (кроме 5xx) сохраняется.
+    Одновременные повторы ждут завершения первого, поздние получают сохранённый
+    ответ без вызова обработчика. Ключ с другим телом запроса отклоняется с 422.
+    """
+
+    def __init__(self, app, store: IdempotencyStore | PostgresIdempotencyStore, paths=IDEMPOTENT_PATHS):
+        self.app = app
+        self.store = store
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get("idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        # Ключ действует в пределах пути и учётных данных клиента
+        key = (scope["path"], headers.get("authorization", ""), idempotency_key)
+
+        outcome, claim = await self.store.begin(key, fingerprint)
+        if outcome == "mismatch":
+            response = JSONResponse(status_code=422,
+                                    content={"detail": "Idempotency-Key reused with different payload"})
+            await response(scope, receive, send)
+            return
+        if outcome == "replay":
+            status_code, raw_headers, content = claim
+            response = Response(content=content, status_code=status_code)
+            response.raw_headers = [*raw_headers, (b"idempotent-replayed", b"true")]
+            await response(scope, receive, send)
+            return
+
+        captured = {"status": 500, "headers": [], "body": []}
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                captured["status"] = message["status"]
+                captured["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                captured["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self.store.finish(key, claim, None)
+            raise
+        if captured["status"] < 500:
+            await self.store.finish(key, claim, (captured["status"], captured["headers"], b"".join(captured["body"])))
+        else:
+            await self.store.finish(key, claim, None)
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+
+idempotency_store = IdempotencyStore() if IDEMPOTENCY_BACKEND == "memory" else PostgresIdempotencyStore()
@@ -0,0 +1,191 @@
+"""
+Загрузка изображений товаров и подготовка уменьшенных копий.
+
+Файлы хранятся по SHA-256 содержимого: IMAGE_STORAGE_DIR/ab/cd/<sha256>/.
+Одинаковые загрузки не обрабатываются повторно. Загрузка пишется на диск
+потоково с подсчётом хеша, копии WebP и JPEG нескольких размеров строятся
+в пуле процессов (нужен Pillow), чтобы не занимать цикл событий и GIL.
+Имя файла определяется содержимым и не меняется, поэтому копии
+отдаются с Cache-Control: immutable.
+"""
+import asyncio
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile, status
+
+from app.config import IMAGE_MAX_BYTES, IMAGE_STORAGE_DIR, IMAGE_WORKERS
+from app.singleflight import SingleFlight
+
+
+# Наибольшая сторона каждой копии в пикселях
+SIZES = {"thumb": 160, "medium": 480, "large": 1024}
+# Расширение -> (формат Pillow, Content-Type, параметры сохранения)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+VARIANTS = frozenset(f"{size}.{extension}" for size in SIZES for extension in FORMATS)
+# Копия, которая записывается в Product.image_url
+DEFAULT_VARIANT = "large.webp"
+
+CHUNK_SIZE = 1024 * 1024
+# Ограничение на распакованный размер, защищает от «бомб» сжатия
+MAX_PIXELS = 40_000_000
+
+
+def content_type(variant: str) -> str:
+    return FORMATS[variant.rsplit(".", 1)[1]][1]
+
+
+def image_url(digest: str, variant: str = DEFAULT_VARIANT) -> str:
+    return f"/images/{digest}/{variant}"
+
+
+def render_variants(source: str, directory: str) -> tuple[int, int]:
+    """
+    Строит все копии изображения source в directory. Выполняется в пуле процессов.
+    Возвращает размер исходного изображения; на повреждённом файле — ValueError.
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    try:
+        with Image.open(source) as image:
+            image.load()
+            image = ImageOps.exif_transpose(image).convert("RGB")
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise ValueError(str(exc)) from None
+
+    for size_name, size in SIZES.items():
+        copy = image.copy()
+        copy.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for extension, (image_format, _, options) in FORMATS.items():
+            target = os.path.join(directory, f"{size_name}.{extension}")
+            # Запись во временный файл и rename: читатели не увидят недописанную копию
+            temporary = f"{target}.tmp"
+            copy.save(temporary, image_format, **options)
+            os.replace(temporary, target)
+    return image.size
+
+
+class ImageStorage:
+    """
+    Локальное хранилище с адресацией по содержимому.
+    """
+
+    def __init__(self, root: str = IMAGE_STORAGE_DIR):
+        self.root = Path(root)
+
+    def directory(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def path(self, digest: str, variant: str) -> Path:
+        return self.directory(digest) / variant
+
+    def has(self, digest: str) -> bool:
+        directory = self.directory(digest)
+        return all((directory / variant).is_file() for variant in VARIANTS)
+
+    def temporary_file(self):
+        (self.root / "tmp").mkdir(parents=True, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.root / "tmp", delete=False)
+
+
+class ImageIngest:
+    """
+    Приём загрузок: потоковая запись с хешем, дедупликация и построение копий.
+    """
+
+    def __init__(self, storage: ImageStorage, workers: int = IMAGE_WORKERS, max_bytes: int = IMAGE_MAX_BYTES):
+        self.storage = storage
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self._pool: ProcessPoolExecutor | None = None
+        # Одновременные загрузки одного файла обрабатываются один раз
+        self._rendering = SingleFlight()
+        self._stats = {"ingested": 0, "deduplicated": 0, "rejected": 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: в процессе приложения работают потоки, fork с ними небезопасен
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def _receive(self, upload: UploadFile) -> tuple[str, str]:
+        """
+        Пишет загрузку во временный файл по частям. Возвращает (sha256, путь).
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with self.storage.temporary_file() as output:
+            try:
+                while chunk := await upload.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                            detail=f"Image is larger than {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    await asyncio.to_thread(output.write, chunk)
+            except BaseException:
+                os.unlink(output.name)
+                raise
+        return digest.hexdigest(), output.name
+
+    async def _render(self, digest: str, source: str) -> None:
+        if self.storage.has(digest):
+            return
+        directory = self.storage.directory(digest)
+        directory.mkdir(parents=True, exist_ok=True)
+        original = directory / "original"
+        os.replace(source, original)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._executor(), render_variants, str(original), str(directory))
+        except ValueError:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+
+    async def ingest(self, upload: UploadFile) -> str:
+        """
+        Сохраняет изображение и все его копии. Возвращает SHA-256 содержимого.
+        """
+        if importlib.util.find_spec("PIL") is None:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Image processing is not available")
+
+        digest, source = await self._receive(upload)
+        if self.storage.has(digest):
+            os.unlink(source)
+            self._stats["deduplicated"] += 1
+            return digest
+
+        try:
+            await self._rendering.do(digest, lambda: self._render(digest, source))
+        except ValueError:
+            self._stats["rejected"] += 1
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image")
+        finally:
+            # Файл остаётся, если его уже обработала одновременная загрузка
+            if os.path.exists(source):
+                os.unlink(source)
+        self._stats["ingested"] += 1
+        return digest
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+
+image_storage = ImageStorage()
+images = ImageIngest(image_storage)
@@ -0,0 +1,176 @@
+"""
+Перенос мягко удалённых товаров и отзывов в архивные таблицы.
+
+Товар архивируется, если он неактивен дольше срока хранения (по updated_at);
+вместе с ним переносятся все его отзывы и удаляются строки related_products.
+Отдельно архивируются отзывы, удалённые раньше срока хранения (по deactivated_at).
+Строки переносятся пачками, каждая пачка — своя короткая транзакция,
+заблокированные другими транзакциями строки пропускаются (SKIP LOCKED).
+
+Запуск:
+    python -m app.jobs.archive --retention-days 30 --batch-size 1000 [--vacuum]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, or_, select, text
+
+from app.config import ARCHIVE_BATCH_SIZE, ARCHIVE_INTERVAL_SECONDS, ARCHIVE_RETENTION_DAYS
+from app.database import async_engine, async_session_maker, utc_now
+from app.models import Product, ProductArchive, RelatedProduct, Review, ReviewArchive, ReviewClaim
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_TABLES = ("products", "reviews", "related_products")
+
+
+def _move(model, archive_model, condition):
+    """
+    INSERT INTO <архив> SELECT ... FROM (DELETE FROM <таблица> WHERE ... RETURNING *).
+    """
+    columns = list(model.__table__.c)
+    moved = delete(model.__table__).where(condition).returning(*columns).cte("moved")
+    return insert(archive_model.__table__).from_select([column.name for column in columns], select(moved))
+
+
+async def archive_products_batch(cutoff: datetime, batch_size: int) -> tuple[int, int]:
+    """
+    Переносит одну пачку товаров с их отзывами. Возвращает (товаров, отзывов).
+    """
+    async with async_session_maker() as db:
+        ids = (await db.scalars(
+            select(Product.id)
+            .where(Product.is_active == False,
+                   func.coalesce(Product.updated_at, Product.created_at, datetime.min) < cutoff)
+            .order_by(Product.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )).all()
+        if not ids:
+            return 0, 0
+
+        await db.execute(delete(RelatedProduct).where(or_(RelatedProduct.product_id.in_(ids),
+                                                          RelatedProduct.related_product_id.in_(ids))))
+        await db.execute(delete(ReviewClaim).where(ReviewClaim.product_id.in_(ids)))
+        reviews = await db.execute(_move(Review, ReviewArchive, Review.product_id.in_(ids)))
+        products = await db.execute(_move(Product, ProductArchive, Product.id.in_(ids)))
+        await db.commit()
+        return products.rowcount, reviews.rowcount
+
+
+async def archive_reviews_batch(cutoff: datetime, batch_size: int) -> int:
+    """
+    Переносит одну пачку неактивных отзывов. Возвращает число перенесённых строк.
+    """
+    ids = (
+        select(Review.id)
+        .where(Review.is_active.isnot(True), Review.deactivated_at < cutoff)
+        .order_by(Review.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    async with async_session_maker() as db:
+        result = await db.execute(_move(Review, ReviewArchive, Review.id.in_(ids)))
+        await db.commit()
+        return result.rowcount
+
+
+async def table_sizes() -> dict:
+    """
+    Размеры таблиц и их индексов в байтах. Для секционированной таблицы
+    (reviews) складываются размеры секций: у родителя своих данных нет.
+    """
+    sizes = {}
+    async with async_session_maker() as db:
+        for table in ARCHIVED_TABLES:
+            row = (await db.execute(
+                text("SELECT coalesce(sum(pg_table_size(relid)), 0)::bigint, "
+                     "coalesce(sum(pg_indexes_size(relid)), 0)::bigint "
+                     "FROM (SELECT CAST(:table AS regclass) AS relid "
+                     "UNION SELECT relid FROM pg_partition_tree(CAST(:table AS regclass))) AS tree"),
+                {"table": table},
+            )).one()
+            sizes[table] = {"table": row[0], "indexes": row[1]}
+    return sizes
+
+
+async def vacuum() -> None:
+    """
+    VACUUM делает место удалённых строк доступным для повторного использования.
+    """
+    async with async_engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ARCHIVED_TABLES:
+            await connection.execute(text(f"VACUUM (ANALYZE) {table}"))
+
+
+async def archive_inactive(retention_days: int = ARCHIVE_RETENTION_DAYS,
+                           batch_size: int = ARCHIVE_BATCH_SIZE) -> dict:
+    """
+    Архивирует всё, что старше срока хранения. Возвращает количество перенесённых строк.
+    """
+    cutoff = utc_now() - timedelta(days=retention_days)
+    moved = {"products": 0, "reviews": 0}
+
+    while True:
+        products, reviews = await archive_products_batch(cutoff, batch_size)
+        moved["products"] += products
+        moved["reviews"] += reviews
+        if products < batch_size:
+            break
+
+    while True:
+        reviews = await archive_reviews_batch(cutoff, batch_size)
+        moved["reviews"] += reviews
+        if reviews < batch_size:
+            break
+
+    return moved
+
+
+async def run_periodically(interval: float = ARCHIVE_INTERVAL_SECONDS) -> None:
+    """
+    Фоновый цикл архивирования для lifespan приложения.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            moved = await archive_inactive()
+            logger.info("Archived %s products and %s reviews", moved["products"], moved["reviews"])
+        except Exception:
+            logger.exception("Archive job failed")
+
+
+async def _run(retention_days: int, batch_size: int, run_vacuum: bool) -> None:
+    before = await table_sizes()
+    moved = await archive_inactive(retention_days, batch_size)
+    if run_vacuum:
+        await vacuum()
+    after = await table_sizes()
+    await async_engine.dispose()
+
+    print(f"moved: products={moved['products']} reviews={moved['reviews']}")
+    for table in ARCHIVED_TABLES:
+        table_delta = before[table]["table"] - after[table]["table"]
+        index_delta = before[table]["indexes"] - after[table]["indexes"]
+        print(f"{table}: table {after[table]['table']} B ({table_delta:+d} reclaimed), "
+              f"indexes {after[table]['indexes']} B ({index_delta:+d} reclaimed)")
+    if not run_vacuum:
+        print("Место удалённых строк станет доступно после VACUUM (флаг --vacuum или autovacuum)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Архивирование неактивных товаров и отзывов")
+    parser.add_argument("--retention-days", type=int, default=ARCHIVE_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--vacuum", action="store_true", help="Выполнить VACUUM (ANALYZE) после переноса")
+    args = parser.parse_args()
+    asyncio.run(_run(args.retention_days, args.batch_size, args.vacuum))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Обработчики событий outbox и запуск воркера.
+
+Воркер работает фоновой задачей приложения (OUTBOX_WORKER=1) или отдельным
+процессом; несколько воркеров одновременно не мешают друг другу.
+
+Отдельный процесс сам отправляет сброс CDN после каждой пачки, но кэши чтений
+(app.lookups) сбрасывает только у себя: веб-воркеры увидят новую оценку товара,
+когда истечёт PRODUCT_PAGE_CACHE_TTL (и SINGLEFLIGHT_CACHE_TTL, если включён).
+Снимок каталога и индекс подсказок подхватывают её по updated_at сами.
+Если такая задержка недопустима, воркер запускается внутри приложения.
+
+Запуск:
+    python -m app.jobs.outbox [--once]
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import OUTBOX_POLL_SECONDS, RATING_PRIOR_MEAN, RATING_PRIOR_WEIGHT
+from app.database import async_engine, utc_now
+from app.edge_cache import edge_cache, product_key
+from app.lookups import forget_product
+from app.models import Product
+from app.outbox import outbox
+
+
+logger = logging.getLogger(__name__)
+
+
+def _apply_grade(product_id: int, count: int, grade: int):
+    """
+    Инкрементально обновляет счётчики оценок, средний рейтинг и байесовскую оценку товара.
+    """
+    review_count = Product.review_count + count
+    grade_sum = Product.grade_sum + grade
+    return (
+        update(Product)
+        .where(Product.id == product_id)
+        .values(
+            review_count=review_count,
+            grade_sum=grade_sum,
+            rating=case((review_count > 0, grade_sum // review_count), else_=None),
+            score=(RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN + grade_sum) / (RATING_PRIOR_WEIGHT + review_count),
+            updated_at=utc_now(),
+        )
+    )
+
+
+def _forget_graded_product(payload: dict) -> None:
+    forget_product(payload["product_id"])
+    edge_cache.purge(product_key(payload["product_id"]))
+
+
+@outbox.handler("review.graded", after_commit=_forget_graded_product)
+async def apply_review_grade(db: AsyncSession, payload: dict) -> None:
+    """
+    Оценка добавлена (count=1) или снята (count=-1, grade с обратным знаком).
+    """
+    await db.execute(_apply_grade(payload["product_id"], payload["count"], payload["grade"]))
+
+
+async def run_periodically(interval: float = OUTBOX_POLL_SECONDS) -> None:
+    """
+    Фоновый цикл воркера для lifespan приложения.
+    """
+    await outbox.run(interval)
+
+
+async def _flush_purges() -> None:
+    # В отдельном процессе нет фонового цикла edge_cache.run()
+    try:
+        await edge_cache.flush()
+    except Exception:
+        logger.exception("CDN purge failed")
+
+
+async def _run(once: bool, interval: float) -> None:
+    try:
+        if not once:
+            await outbox.run(interval, after_batch=_flush_purges)
+        total = 0
+        while claimed := await outbox.process_batch():
+            total += claimed
+            await _flush_purges()
+        print(f"processed: {total}, {await outbox.backlog()}")
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Воркер транзакционного outbox")
+    parser.add_argument("--once", action="store_true", help="Разобрать готовые события и выйти")
+    parser.add_argument("--interval", type=float, default=OUTBOX_POLL_SECONDS)
+    args = parser.parse_args()
+    asyncio.run(_run(args.once, args.interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Создание месячных секций таблицы reviews заранее.
+
+Секция reviews_pYYYY_MM хранит отзывы с comment_date в этом месяце.
+Задача идемпотентна: существующие секции не трогаются. Отзывы, попавшие в
+reviews_default до создания секции своего месяца, переносятся в новую секцию.
+
+Запуск:
+    python -m app.jobs.partitions --months-ahead 3
+"""
+import argparse
+import asyncio
+import logging
+import re
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import REVIEW_PARTITIONS_AHEAD
+from app.database import async_engine
+
+
+logger = logging.getLogger(__name__)
+
+# Проверяем секции раз в сутки: этого достаточно при запасе в несколько месяцев
+CHECK_INTERVAL_SECONDS = 24 * 60 * 60
+# Секция для дат вне созданных месяцев (см. миграцию f3c61d8a9b24)
+DEFAULT_PARTITION = "reviews_default"
+PARTITION_NAME = re.compile(r"reviews_p\d{4}_\d{2}")
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"reviews_p{month:%Y_%m}"
+
+
+def is_review_partition(table: str) -> bool:
+    """
+    Секция reviews, созданная этой задачей или миграцией, а не моделью.
+    """
+    return table == DEFAULT_PARTITION or PARTITION_NAME.fullmatch(table) is not None
+
+
+async def _months_in_default(connection) -> list[date]:
+    """
+    Месяцы отзывов, попавших в секцию DEFAULT, потому что их секции не было.
+    """
+    if await connection.scalar(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}) is None:
+        return []
+    result = await connection.scalars(text(
+        f"SELECT DISTINCT date_trunc('month', comment_date)::date FROM {DEFAULT_PARTITION}"
+    ))
+    return list(result)
+
+
+async def _create_partition(connection, month: date, move_from_default: bool) -> None:
+    bounds = f"FROM ('{month}') TO ('{_add_months(month, 1)}')"
+    create = f"CREATE TABLE {partition_name(month)} PARTITION OF reviews FOR VALUES {bounds}"
+    if not move_from_default:
+        await connection.execute(text(create))
+        return
+    # Секцию нельзя создать, пока в DEFAULT есть строки её диапазона: DEFAULT
+    # отсоединяется, строки переносятся в новую секцию, DEFAULT присоединяется обратно.
+    # Всё в одной транзакции, таблица reviews заблокирована до её конца
+    await connection.execute(text(f"ALTER TABLE reviews DETACH PARTITION {DEFAULT_PARTITION}"))
+    await connection.execute(text(create))
+    await connection.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE comment_date >= '{month}' AND comment_date < '{_add_months(month, 1)}' RETURNING *) "
+        f"INSERT INTO reviews SELECT * FROM moved"
+    ))
+    await connection.execute(text(f"ALTER TABLE reviews ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+async def ensure_review_partitions(months_ahead: int = REVIEW_PARTITIONS_AHEAD,
+                                   engine: AsyncEngine = async_engine) -> list[str]:
+    """
+    Создаёт секции с текущего месяца на months_ahead месяцев вперёд, а также
+    секции месяцев, отзывы которых уже попали в DEFAULT, перенося эти отзывы.
+    Возвращает имена созданных секций.
+    """
+    current = date.today().replace(day=1)
+    created = []
+    async with engine.begin() as connection:
+        stray = set(await _months_in_default(connection))
+        if stray:
+            logger.warning("Reviews found in %s for months: %s", DEFAULT_PARTITION,
+                           ", ".join(f"{month:%Y-%m}" for month in sorted(stray)))
+        months = {_add_months(current, offset) for offset in range(months_ahead + 1)} | stray
+        for month in sorted(months):
+            name = partition_name(month)
+            exists = await connection.scalar(text("SELECT to_regclass(:name)"), {"name": name})
+            if exists is not None:
+                continue
+            await _create_partition(connection, month, move_from_default=month in stray)
+            created.append(name)
+    return created
+
+
+async def run_periodically(interval: float = CHECK_INTERVAL_SECONDS) -> None:
+    """
+    Фоновый цикл для lifespan приложения.
+    """
+    while True:
+        try:
+            created = await ensure_review_partitions()
+            if created:
+                logger.info("Created review partitions: %s", ", ".join(created))
+        except Exception:
+            logger.exception("Review partition maintenance failed")
+        await asyncio.sleep(interval)
+
+
+async def _run(months_ahead: int) -> None:
+    created = await ensure_review_partitions(months_ahead)
+    await async_engine.dispose()
+    print(f"created: {', '.join(created) or 'nothing'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Создание секций таблицы reviews")
+    parser.add_argument("--months-ahead", type=int, default=REVIEW_PARTITIONS_AHEAD)
+    args = parser.parse_args()
+    asyncio.run(_run(args.months_ahead))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Фоновая задача расчёта похожих товаров по совместным отзывам.
+
+Строит разреженную матрицу товар × пользователь из активных отзывов,
+считает косинусную близость товаров блоками и сохраняет top-K
+для каждого товара в таблицу related_products.
+
+Запуск:
+    python -m app.jobs.related_products --top-k 10 --chunk-size 1024
+
+Требует numpy и scipy (не входят в основные зависимости сервиса).
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import delete, insert, select
+
+from app.database import async_session_maker
+from app.models import Product, RelatedProduct, Review
+
+
+INSERT_BATCH_SIZE = 5000
+FETCH_BATCH_SIZE = 50000
+
+
+def _import_numeric():
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as exc:
+        raise RuntimeError("Для расчёта похожих товаров установите numpy и scipy") from exc
+    return np, sparse
+
+
+def compute_related(user_ids, product_ids, grades, top_k: int = 10, chunk_size: int = 1024):
+    """
+    Считает top-K похожих товаров по косинусной близости векторов оценок.
+
+    Принимает три массива одинаковой длины (по одному элементу на отзыв)
+    и возвращает массивы (product_id, related_product_id, score, rank).
+    """
+    np, sparse = _import_numeric()
+
+    products, item_index = np.unique(np.asarray(product_ids), return_inverse=True)
+    _, user_index = np.unique(np.asarray(user_ids), return_inverse=True)
+    n_items = len(products)
+    n_users = int(user_index.max()) + 1 if len(user_index) else 0
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(grades, dtype=np.float32), (item_index, user_index)),
+        shape=(n_items, n_users),
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    matrix = sparse.diags((1.0 / norms).astype(np.float32)).dot(matrix).tocsr()
+    matrix_t = matrix.T.tocsr()
+
+    sources, targets, scores, ranks = [], [], [], []
+    for start in range(0, n_items, chunk_size):
+        block = matrix[start:start + chunk_size].dot(matrix_t).tocsr()
+
+        # Убираем близость товара с самим собой
+        rows = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+        block.data[block.indices == rows + start] = 0
+        block.eliminate_zeros()
+
+        for row in range(block.shape[0]):
+            lo, hi = block.indptr[row], block.indptr[row + 1]
+            if lo == hi:
+                continue
+            values = block.data[lo:hi]
+            columns = block.indices[lo:hi]
+            if hi - lo > top_k:
+                best = np.argpartition(-values, top_k)[:top_k]
+                values, columns = values[best], columns[best]
+            order = np.argsort(-values, kind="stable")
+
+            sources.append(np.full(len(order), products[start + row]))
+            targets.append(products[columns[order]])
+            scores.append(values[order])
+            ranks.append(np.arange(1, len(order) + 1))
+
+    if not sources:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float32), empty
+    return (np.concatenate(sources), np.concatenate(targets),
+            np.concatenate(scores), np.concatenate(ranks))
+
+
+async def load_reviews():
+    """
+    Потоково читает активные оценки по активным товарам.
+    """
+    np, _ = _import_numeric()
+    stmt = (
+        select(Review.user_id, Review.product_id, Review.grade)
+        .join(Product, Product.id == Review.product_id)
+        .where(Review.is_active == True, Review.grade.isnot(None), Product.is_active == True)
+        .execution_options(yield_per=FETCH_BATCH_SIZE)
+    )
+    users, products, grades = [], [], []
+    async with async_session_maker() as db:
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            users.append(np.fromiter((row[0] for row in partition), dtype=np.int64))
+            products.append(np.fromiter((row[1] for row in partition), dtype=np.int64))
+            grades.append(np.fromiter((row[2] for row in partition), dtype=np.float32))
+
+    if not users:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+    return np.concatenate(users), np.concatenate(products), np.concatenate(grades)
+
+
+async def build_related_products(top_k: int = 10, chunk_size: int = 1024) -> int:
+    """
+    Пересчитывает таблицу related_products целиком в одной транзакции.
+    Возвращает количество записанных строк.
+    """
+    user_ids, product_ids, grades = await load_reviews()
+    sources, targets, scores, ranks = compute_related(user_ids, product_ids, grades,
+                                                      top_k=top_k, chunk_size=chunk_size)
+    rows = [
+        {"product_id": int(source), "related_product_id": int(target),
+         "score": float(score), "rank": int(rank)}
+        for source, target, score, rank in zip(sources, targets, scores, ranks)
+    ]
+
+    async with async_session_maker() as db:
+        await db.execute(delete(RelatedProduct))
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            await db.execute(insert(RelatedProduct), rows[start:start + INSERT_BATCH_SIZE])
+        await db.commit()
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пересчёт похожих товаров")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = asyncio.run(build_related_products(args.top_k, args.chunk_size))
+    print(f"related_products: {written} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
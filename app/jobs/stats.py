@@ -0,0 +1,139 @@
+"""
+Пересчёт материализованной статистики продавцов и категорий.
+
+Агрегаты по products и reviews считаются одним проходом и записываются
+в seller_stats и category_stats через INSERT ... ON CONFLICT DO UPDATE:
+читатели всё время видят либо старые, либо новые строки, без блокировок.
+refreshed_at у всех строк одного пересчёта одинаковый — это время
+транзакции; строки исчезнувших продавцов и категорий удаляются.
+
+Запуск:
+    python -m app.jobs.stats
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import Numeric, cast, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import SELLER_STATS_WINDOW_DAYS, STATS_REFRESH_SECONDS
+from app.database import async_engine, async_session_maker
+from app.models import Category, CategoryStats, Product, Review, SellerStats, User
+
+
+logger = logging.getLogger(__name__)
+
+
+def _upsert(model, key: str, rows):
+    """
+    INSERT INTO <таблица> SELECT ... ON CONFLICT (<ключ>) DO UPDATE по всем колонкам.
+    """
+    columns = [column.name for column in model.__table__.c]
+    stmt = insert(model).from_select(columns, rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={name: stmt.excluded[name] for name in columns if name != key},
+    )
+
+
+def seller_stats_rows(window_days: int = SELLER_STATS_WINDOW_DAYS):
+    """
+    Статистика всех активных продавцов в порядке колонок seller_stats.
+    """
+    products = (
+        select(
+            Product.seller_id,
+            func.count().label("product_count"),
+            func.sum(Product.stock).label("total_stock"),
+            func.sum(Product.price * Product.stock).label("stock_value"),
+            func.sum(Product.review_count).label("review_count"),
+            func.sum(Product.grade_sum).label("grade_sum"),
+        )
+        .where(Product.is_active == True)
+        .group_by(Product.seller_id)
+        .subquery()
+    )
+    # Секционирование reviews по comment_date ограничивает чтение последними секциями
+    recent = (
+        select(Product.seller_id, func.count().label("reviews"))
+        .join(Review, Review.product_id == Product.id)
+        .where(Review.is_active == True,
+               Review.comment_date >= datetime.now() - timedelta(days=window_days))
+        .group_by(Product.seller_id)
+        .subquery()
+    )
+    review_count = func.coalesce(products.c.review_count, 0)
+    return (
+        select(
+            User.id,
+            func.coalesce(products.c.product_count, 0),
+            func.coalesce(products.c.total_stock, 0),
+            func.coalesce(products.c.stock_value, 0),
+            review_count,
+            cast(products.c.grade_sum, Numeric) / func.nullif(review_count, 0),
+            func.coalesce(recent.c.reviews, 0) / literal(float(window_days)),
+            func.now(),
+        )
+        .outerjoin(products, products.c.seller_id == User.id)
+        .outerjoin(recent, recent.c.seller_id == User.id)
+        .where(User.role == "seller", User.is_active == True)
+    )
+
+
+def category_stats_rows():
+    """
+    Число активных товаров в каждой активной категории (без учёта подкатегорий).
+    """
+    return (
+        select(Category.id, func.count(Product.id), func.now())
+        .outerjoin(Product, (Product.category_id == Category.id) & (Product.is_active == True))
+        .where(Category.is_active == True)
+        .group_by(Category.id)
+    )
+
+
+async def refresh_stats(window_days: int = SELLER_STATS_WINDOW_DAYS) -> dict:
+    """
+    Пересчитывает обе таблицы в одной транзакции. Возвращает число записанных строк.
+    """
+    async with async_session_maker() as db:
+        sellers = await db.execute(_upsert(SellerStats, "seller_id", seller_stats_rows(window_days)))
+        categories = await db.execute(_upsert(CategoryStats, "category_id", category_stats_rows()))
+        # now() постоянен в транзакции: всё, что не обновлено сейчас, устарело
+        await db.execute(delete(SellerStats).where(SellerStats.refreshed_at < func.now()))
+        await db.execute(delete(CategoryStats).where(CategoryStats.refreshed_at < func.now()))
+        await db.commit()
+    return {"sellers": sellers.rowcount, "categories": categories.rowcount}
+
+
+async def run_periodically(interval: float = STATS_REFRESH_SECONDS) -> None:
+    """
+    Фоновый цикл пересчёта для lifespan приложения.
+    """
+    while True:
+        try:
+            await refresh_stats()
+        except Exception:
+            logger.exception("Stats refresh failed")
+        await asyncio.sleep(interval)
+
+
+async def _run(window_days: int) -> None:
+    started = datetime.now()
+    refreshed = await refresh_stats(window_days)
+    await async_engine.dispose()
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"refreshed: sellers={refreshed['sellers']} categories={refreshed['categories']} in {elapsed:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пересчёт статистики продавцов и категорий")
+    parser.add_argument("--window-days", type=int, default=SELLER_STATS_WINDOW_DAYS)
+    args = parser.parse_args()
+    asyncio.run(_run(args.window_days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Фоновые задачи, которые должны работать в одном процессе на всю базу.
+
+Секции reviews, архивация, пересчёт статистики и воркер outbox пишут в общие
+таблицы; при нескольких воркерах (python -m app.server) и репликах каждая
+копия делала бы ту же работу и конкурировала за блокировки. Такие задачи
+запускаются через JobLeader: процесс, взявший pg_try_advisory_lock, выполняет
+их, остальные раз в JOB_LEADER_RETRY_SECONDS пробуют взять блокировку снова.
+
+Блокировка сеансовая и держится на отдельном соединении вне пула, поэтому
+не занимает слот обработчиков запросов; app.server вычитает это соединение
+из DB_CONNECTION_BUDGET. Если соединение рвётся, PostgreSQL снимает
+блокировку, и лидер останавливает свои задачи до следующей попытки.
+
+Кэши в памяти процесса (снимок каталога, индекс подсказок, отозванные токены)
+обновляются в каждом воркере и через JobLeader не запускаются.
+"""
+import asyncio
+import logging
+import zlib
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import JOB_LEADER_RETRY_SECONDS
+from app.database import ASYNC_DATABASE_URL
+
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class JobLeader:
+    """
+    Выбор одного исполнителя фоновых задач через advisory lock PostgreSQL.
+    """
+
+    def __init__(self, name: str, retry: float = JOB_LEADER_RETRY_SECONDS):
+        self.name = name
+        self.key = zlib.crc32(name.encode())
+        self.retry = retry
+        self.leader = False
+        self._engine = None
+        self._stats = {"acquired": 0, "lost": 0}
+
+    def _lock_engine(self):
+        if self._engine is None:
+            self._engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+        return self._engine
+
+    async def _try_lock(self, connection: AsyncConnection) -> bool:
+        locked = await connection.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})
+        # Сеансовая блокировка переживает транзакцию; соединение не должно висеть idle in transaction
+        await connection.commit()
+        return bool(locked)
+
+    async def _lead(self, connection: AsyncConnection, jobs: list[Job]) -> None:
+        tasks = [asyncio.create_task(job()) for job in jobs]
+        try:
+            while True:
+                await asyncio.sleep(self.retry)
+                # Проверяем, что соединение с блокировкой живо
+                await connection.execute(text("SELECT 1"))
+                await connection.commit()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, jobs: list[Job]) -> None:
+        """
+        Бесконечный цикл для lifespan приложения: выполняет jobs, пока процесс держит блокировку.
+        """
+        while True:
+            try:
+                async with self._lock_engine().connect() as connection:
+                    if await self._try_lock(connection):
+                        self.leader = True
+                        self._stats["acquired"] += 1
+                        logger.info("Acquired job leadership", extra={"lock": self.name})
+                        await self._lead(connection, jobs)
+            except Exception:
+                if self.leader:
+                    self._stats["lost"] += 1
+                logger.exception("Job leader connection failed")
+            finally:
+                self.leader = False
+            await asyncio.sleep(self.retry)
+
+    async def dispose(self) -> None:
+        if self._engine is not None:
+            await self._engine.dispose()
+
+    def stats(self) -> dict:
+        return {"leader": self.leader, **self._stats}
+
+
+job_leader = JobLeader("shop-api:jobs")
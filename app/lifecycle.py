@@ -0,0 +1,98 @@
+"""
+Прогрев при старте, готовность к трафику и плавная остановка.
+
+Приложение сообщает о готовности (/health/ready) только после того, как
+открыло соединения пула и выполнило горячие запросы на каждом из них:
+так первые запросы после деплоя не ждут установки соединений и компиляции
+SQL.
+
+Остановку ведёт app.server: по SIGTERM готовность снимается сразу, а uvicorn
+ещё SHUTDOWN_PRESTOP_SECONDS принимает запросы, пока балансировщик не уберёт
+процесс из ротации. Затем uvicorn закрывает сокеты и ждёт начатые запросы не
+дольше SHUTDOWN_DRAIN_SECONDS; lifespan завершается уже после этого.
+"""
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from time import perf_counter
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import DB_POOL_WARMUP
+from app.database import async_engine
+from app.schemas.products import ProductSort
+from app.statements import (
+    ACTIVE_CATEGORIES_WITH_STATS,
+    ACTIVE_CATEGORY_ID,
+    ACTIVE_PRODUCT_BY_ID,
+    ACTIVE_REVIEWS_BY_PRODUCT,
+    ACTIVE_USER_BY_EMAIL,
+    PRODUCT_BY_ID,
+    PRODUCT_PAGE,
+    product_count_statement,
+    product_list_statement,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _hot_queries() -> list[tuple]:
+    """
+    Горячие запросы с параметрами, которые не находят строк, но проходят тот же план.
+    """
+    return [
+        (ACTIVE_USER_BY_EMAIL, {"email": ""}),
+        (ACTIVE_PRODUCT_BY_ID, {"product_id": 0}),
+        (PRODUCT_BY_ID, {"product_id": 0}),
+        (ACTIVE_CATEGORY_ID, {"category_id": 0}),
+        (ACTIVE_CATEGORIES_WITH_STATS, {}),
+        (ACTIVE_REVIEWS_BY_PRODUCT, {"product_id": 0}),
+        (PRODUCT_PAGE, {"product_id": 0, "reviews_limit": 0}),
+        (product_count_statement(()), {}),
+        (product_list_statement((), ProductSort.id, None), {"limit": 0, "offset": 0}),
+    ]
+
+
+class Lifecycle:
+    """
+    Состояние процесса для проверок здоровья.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+
+    async def warmup(self, connections: int = DB_POOL_WARMUP) -> float:
+        """
+        Открывает connections соединений одновременно и выполняет на каждом горячие
+        запросы через ORM-сессию, как обработчики: заполняется кэш компиляции
+        SQLAlchemy и кэш подготовленных запросов asyncpg каждого соединения.
+        Соединения возвращаются в пул открытыми. Возвращает длительность в секундах.
+        """
+        started = perf_counter()
+        # Соединения сверх pool_size при возврате закрываются, греть их бесполезно
+        connections = min(connections, async_engine.pool.size())
+        queries = _hot_queries()
+        async with AsyncExitStack() as stack:
+            opened = await asyncio.gather(*(stack.enter_async_context(async_engine.connect())
+                                            for _ in range(connections)))
+            for connection in opened:
+                async with AsyncSession(bind=connection) as session:
+                    for statement, params in queries:
+                        await session.execute(statement, params)
+                await connection.rollback()
+        elapsed = perf_counter() - started
+        logger.info("Warmup finished", extra={"connections": connections, "duration_ms": round(elapsed * 1000, 2)})
+        return elapsed
+
+    def begin_shutdown(self) -> None:
+        """
+        Снимает готовность: /health/ready отвечает 503, и балансировщик
+        перестаёт направлять сюда новые запросы.
+        """
+        self.ready = False
+        self.draining = True
+
+
+lifecycle = Lifecycle()
@@ -0,0 +1,156 @@
+"""
+Структурированное логирование без блокировки цикла событий.
+
+Записи попадают в очередь через QueueHandler, а форматирование в JSON и запись
+в stdout выполняет фоновый поток QueueListener. Дополнительно:
+
+- RequestLogMiddleware пишет по строке на запрос: маршрут, статус, время,
+  время в базе и число SQL-запросов;
+- SQL-запросы логируются выборочно (SQL_LOG_SAMPLE_RATE), а запросы дольше
+  SQL_SLOW_MS — всегда.
+"""
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from time import perf_counter
+
+from sqlalchemy import event
+
+from app.config import LOG_LEVEL, REQUEST_LOG, SQL_LOG_SAMPLE_RATE, SQL_SLOW_MS
+from app.database import async_engine
+
+
+logger = logging.getLogger("app.requests")
+sql_logger = logging.getLogger("app.sql")
+
+# Счётчики SQL текущего запроса; заполняются обработчиками событий движка
+_request_db: ContextVar[dict | None] = ContextVar("request_db", default=None)
+
+# Стандартные атрибуты LogRecord, которые не переносятся в JSON как поля
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Одна запись — один JSON-объект; поля из extra попадают в него как есть.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in record.__dict__.items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = LOG_LEVEL, stream=None) -> QueueListener:
+    """
+    Переключает корневой логгер на очередь и запускает поток записи.
+    Возвращённый listener нужно остановить при завершении (listener.stop()).
+    """
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(records))
+    root.setLevel(level)
+
+    listener = QueueListener(records, output, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append((context, perf_counter()))
+
+
+def _record_statement(statement: str, started: float) -> None:
+    elapsed_ms = (perf_counter() - started) * 1000
+
+    stats = _request_db.get()
+    if stats is not None:
+        stats["statements"] += 1
+        stats["db_ms"] += elapsed_ms
+
+    # Параметры не логируются: в них бывают пароли и персональные данные
+    if elapsed_ms >= SQL_SLOW_MS:
+        sql_logger.warning("slow query", extra={"statement": statement, "duration_ms": round(elapsed_ms, 2)})
+    elif SQL_LOG_SAMPLE_RATE and random.random() < SQL_LOG_SAMPLE_RATE:
+        sql_logger.info("query", extra={"statement": statement, "duration_ms": round(elapsed_ms, 2)})
+
+
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _log_statement(conn, cursor, statement, parameters, context, executemany):
+    _, started = conn.info["query_start"].pop()
+    _record_statement(statement, started)
+
+
+@event.listens_for(async_engine.sync_engine, "handle_error")
+def _log_failed_statement(exception_context):
+    """
+    after_cursor_execute при ошибке не вызывается: снимаем замер здесь, иначе
+    стек замеров соединения растёт, а время упавших запросов не учитывается.
+    """
+    connection = exception_context.connection
+    if connection is None:
+        return
+    starts = connection.info.get("query_start")
+    # Ошибки вне выполнения запроса (соединение, чтение результата) замера не имеют
+    if starts and starts[-1][0] is exception_context.execution_context:
+        _, started = starts.pop()
+        _record_statement(exception_context.statement, started)
+
+
+class RequestLogMiddleware:
+    """
+    Пишет структурированную строку лога для каждого HTTP-запроса.
+    """
+
+    def __init__(self, app, enabled: bool = REQUEST_LOG):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        stats = {"statements": 0, "db_ms": 0.0}
+        token = _request_db.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_db.reset(token)
+            route = scope.get("route")
+            logger.info("request", extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": status_code,
+                "latency_ms": round((perf_counter() - started) * 1000, 2),
+                "db_ms": round(stats["db_ms"], 2),
+                "statements": stats["statements"],
+            })
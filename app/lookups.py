@@ -0,0 +1,88 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import PRODUCT_PAGE_CACHE_MAX_ENTRIES, PRODUCT_PAGE_CACHE_TTL, PRODUCT_PAGE_REVIEWS
+
+from app.models.products import Product as ProductModel
+from app.models.reviews import Review as ReviewModel
+from app.singleflight import SingleFlight, reads
+from app.statements import (
+    ACTIVE_CATEGORY_ID,
+    ACTIVE_PRODUCT_BY_ID,
+    ACTIVE_REVIEWS_BY_PRODUCT,
+    PRODUCT_BY_ID,
+    PRODUCT_PAGE,
+)
+
+
+async def get_active_product(db: AsyncSession, product_id: int) -> ProductModel | None:
+    """
+    Возвращает активный товар по ID или None.
+    """
+    async def query():
+        return await db.scalar(ACTIVE_PRODUCT_BY_ID, {"product_id": product_id})
+
+    return await reads.do(("product", product_id), query)
+
+
+async def get_product(db: AsyncSession, product_id: int) -> ProductModel | None:
+    """
+    Возвращает товар по ID независимо от активности или None.
+    """
+    async def query():
+        return await db.scalar(PRODUCT_BY_ID, {"product_id": product_id})
+
+    return await reads.do(("product_any", product_id), query)
+
+
+async def is_category_active(db: AsyncSession, category_id: int) -> bool:
+    """
+    Проверяет, что категория существует и активна.
+    """
+    async def query():
+        found = await db.scalar(ACTIVE_CATEGORY_ID, {"category_id": category_id})
+        return found is not None
+
+    return await reads.do(("category_active", category_id), query)
+
+
+async def get_active_reviews(db: AsyncSession, product_id: int) -> list[ReviewModel]:
+    """
+    Возвращает активные отзывы товара.
+    """
+    async def query():
+        result = await db.scalars(ACTIVE_REVIEWS_BY_PRODUCT, {"product_id": product_id})
+        return result.all()
+
+    return await reads.do(("reviews", product_id), query)
+
+
+# Собранные страницы товаров кэшируются дольше, чем точечные чтения.
+# forget_* сбрасывают кэш только этого процесса: другие воркеры увидят
+# изменение не позже чем через PRODUCT_PAGE_CACHE_TTL
+page_cache = SingleFlight(ttl=PRODUCT_PAGE_CACHE_TTL, max_entries=PRODUCT_PAGE_CACHE_MAX_ENTRIES)
+
+
+async def get_product_page(db: AsyncSession, product_id: int) -> dict | None:
+    """
+    Возвращает данные страницы товара (см. PRODUCT_PAGE) или None, если товар не найден.
+    """
+    async def query():
+        return await db.scalar(PRODUCT_PAGE, {"product_id": product_id, "reviews_limit": PRODUCT_PAGE_REVIEWS})
+
+    return await page_cache.do(product_id, query)
+
+
+def forget_product(product_id: int) -> None:
+    reads.forget(("product", product_id), ("product_any", product_id))
+    page_cache.forget(product_id)
+
+
+def forget_category(category_id: int) -> None:
+    reads.forget(("category_active", category_id))
+    # Название и активность категории входят в страницы всех её товаров
+    page_cache.clear()
+
+
+def forget_reviews(product_id: int) -> None:
+    reads.forget(("reviews", product_id))
+    page_cache.forget(product_id)
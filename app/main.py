@@ -1,20 +1,99 @@
-import uvicorn
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from functools import partial
+
 from fastapi import FastAPI
 
-from app.routers import categories, products, users, reviews
+from app.routers import categories, health, images as images_router, products, users, reviews
+from app.catalog_snapshot import catalog
+from app.config import ARCHIVE_INTERVAL_SECONDS, OUTBOX_WORKER, STATS_REFRESH_SECONDS
+from app.admission import AdmissionMiddleware, admission
+from app.edge_cache import edge_cache
+from app.compression import CompressionMiddleware, compression_cache
+from app.idempotency import IdempotencyMiddleware, idempotency_store
+from app.logs import RequestLogMiddleware, setup_logging
+from app.proxies import ProxyHeadersMiddleware, trusted_proxies
+from app.lifecycle import lifecycle
+from app.leader import job_leader
+from app.database import async_engine
+from app.images import images
+from app.jobs import archive, outbox as outbox_worker, partitions, stats
+from app.outbox import outbox
+from app.singleflight import reads
+from app.lookups import page_cache
+from app.throttling import login_throttle
+from app.revocation import revocations
+from app.suggest import suggestions
+from app import statements
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Прогревает пул и кэши, запускает фоновые задачи и только затем сообщает
+    о готовности. При остановке (начатые запросы uvicorn к этому моменту уже
+    дождался) останавливает задачи и закрывает пул.
+    """
+    log_listener = setup_logging()
+    await lifecycle.warmup()
+    await revocations.sync()
+    await suggestions.refresh()
+    tasks = [
+        asyncio.create_task(revocations.run()),
+        asyncio.create_task(suggestions.run()),
+        asyncio.create_task(edge_cache.run()),
+    ]
+    if catalog is not None:
+        await catalog.refresh()
+        tasks.append(asyncio.create_task(catalog.run()))
+    # Задачи, которые пишут в общие таблицы, выполняет один процесс из всех
+    singleton_jobs = [partitions.run_periodically]
+    if ARCHIVE_INTERVAL_SECONDS > 0:
+        singleton_jobs.append(partial(archive.run_periodically, ARCHIVE_INTERVAL_SECONDS))
+    if STATS_REFRESH_SECONDS > 0:
+        singleton_jobs.append(partial(stats.run_periodically, STATS_REFRESH_SECONDS))
+    if OUTBOX_WORKER:
+        singleton_jobs.append(outbox_worker.run_periodically)
+    tasks.append(asyncio.create_task(job_leader.run(singleton_jobs)))
+    lifecycle.ready = True
+    yield
+    lifecycle.begin_shutdown()
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    # Сбросы от последних запросов не должны потеряться вместе с процессом
+    with suppress(Exception):
+        await edge_cache.flush()
+    images.shutdown()
+    await job_leader.dispose()
+    await async_engine.dispose()
+    log_listener.stop()
 
 
 # Создаём приложение FastAPI
 app = FastAPI(
     title="FastAPI Интернет-магазин",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+# Внешний слой: сохранённые для идемпотентности ответы тоже сжимаются
+app.add_middleware(CompressionMiddleware, cache=compression_cache)
+# Внутри лога запросов: отклонённые под нагрузкой запросы тоже попадают в лог
+app.add_middleware(AdmissionMiddleware, controller=admission)
+app.add_middleware(RequestLogMiddleware)
+# Самый внешний слой: все остальные видят адрес клиента, а не прокси
+app.add_middleware(ProxyHeadersMiddleware, proxies=trusted_proxies)
+
 # Подключаем маршруты категорий и товаров
+app.include_router(health.router)
 app.include_router(categories.router)
 app.include_router(products.router)
 app.include_router(users.router)
 app.include_router(reviews.router)
+app.include_router(images_router.router)
 
 
 # Корневой эндпоинт для проверки
@@ -25,5 +104,36 @@ async def root():
     """
     return {"message": "Добро пожаловать в API интернет-магазина!"}
 
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Внутренние счётчики сервиса.
+    """
+    result = {
+        "singleflight": reads.stats(),
+        "product_page_cache": page_cache.stats(),
+        "statements": statements.stats(),
+        "idempotency": idempotency_store.stats(),
+        "login_throttle": login_throttle.stats(),
+        "revocations": revocations.stats(),
+        "compression": compression_cache.stats(),
+        "images": images.stats(),
+        "suggest": suggestions.stats(),
+        "edge_cache": edge_cache.stats(),
+        "admission": admission.stats(),
+        "outbox": {**outbox.stats(), **await outbox.backlog()},
+        "job_leader": job_leader.stats(),
+    }
+    if catalog is not None:
+        result["catalog_snapshot"] = {"products": len(catalog)}
+    return result
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Здесь app.main уже загружен как __main__ с пулом по умолчанию. Лаунчер
+    # запускается заново в этом же процессе: размер пулов выставляется до
+    # импорта приложения, и при предзагрузке оно импортируется один раз
+    import os
+    import sys
+
+    os.execv(sys.executable, [sys.executable, "-m", "app.server", *sys.argv[1:]])
@@ -10,6 +10,7 @@ from alembic import context
 
 from app.database import Base
 from app import models
+from app.jobs.partitions import is_review_partition
 
 
 # this is the Alembic Config object, which provides
@@ -27,6 +28,15 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Секции reviews создаются SQL-запросами миграций и app.jobs.partitions,
+    в моделях их нет; autogenerate не должен предлагать их удалить.
+    """
+    table = name if type_ == "table" else getattr(getattr(object, "table", None), "name", None)
+    return table is None or not is_review_partition(table)
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -51,6 +61,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -58,7 +69,7 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
     with context.begin_transaction():
         context.run_migrations()
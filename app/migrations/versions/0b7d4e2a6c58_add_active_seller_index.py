@@ -0,0 +1,30 @@
+"""Add active seller index
+
+Revision ID: 0b7d4e2a6c58
+Revises: f3c61d8a9b24
+Create Date: 2026-10-19 14:52:10.337461
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7d4e2a6c58'
+down_revision: Union[str, Sequence[str], None] = 'f3c61d8a9b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_products_active_seller_id', 'products', ['seller_id'],
+                    unique=False, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_active_seller_id', table_name='products',
+                  postgresql_where=sa.text('is_active'))
@@ -0,0 +1,39 @@
+"""Add review deactivated_at
+
+Revision ID: 4b6d8f0a2c35
+Revises: 3e5a7c9b1d24
+Create Date: 2026-10-19 21:04:18.730512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b6d8f0a2c35'
+down_revision: Union[str, Sequence[str], None] = '3e5a7c9b1d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('reviews', sa.Column('deactivated_at', sa.DateTime(), nullable=True))
+    op.add_column('reviews_archive', sa.Column('deactivated_at', sa.DateTime(), nullable=True))
+    # Время удаления уже неактивных отзывов неизвестно: срок хранения отсчитывается от миграции
+    op.execute(
+        "UPDATE reviews SET deactivated_at = timezone('utc', now()) "
+        "WHERE is_active IS NOT TRUE"
+    )
+    op.create_index('ix_reviews_deactivated_at', 'reviews', ['deactivated_at'], unique=False,
+                    postgresql_where=sa.text('deactivated_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reviews_deactivated_at', table_name='reviews',
+                  postgresql_where=sa.text('deactivated_at IS NOT NULL'))
+    op.drop_column('reviews_archive', 'deactivated_at')
+    op.drop_column('reviews', 'deactivated_at')
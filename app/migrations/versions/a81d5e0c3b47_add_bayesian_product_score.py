@@ -0,0 +1,58 @@
+"""Add bayesian product score
+
+Revision ID: a81d5e0c3b47
+Revises: 4f1c2a9d7e30
+Create Date: 2026-10-19 11:03:17.240551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a81d5e0c3b47'
+down_revision: Union[str, Sequence[str], None] = '4f1c2a9d7e30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Значения по умолчанию из app.config на момент миграции
+PRIOR_MEAN = 3.5
+PRIOR_WEIGHT = 10.0
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('review_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('products', sa.Column('grade_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('products', sa.Column('score', sa.Float(), server_default=str(PRIOR_MEAN), nullable=False))
+    op.execute(f"""
+        UPDATE products AS p
+        SET review_count = s.cnt,
+            grade_sum = s.total,
+            rating = s.total / s.cnt,
+            score = ({PRIOR_WEIGHT * PRIOR_MEAN} + s.total) / ({PRIOR_WEIGHT} + s.cnt)
+        FROM (
+            SELECT product_id, count(*) AS cnt, sum(grade) AS total
+            FROM reviews
+            WHERE is_active AND grade IS NOT NULL
+            GROUP BY product_id
+        ) AS s
+        WHERE s.product_id = p.id
+    """)
+    op.create_index('ix_products_active_score', 'products', ['score', 'id'],
+                    unique=False, postgresql_where=sa.text('is_active'))
+    op.create_index('ix_products_active_category_score', 'products', ['category_id', 'score', 'id'],
+                    unique=False, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_active_category_score', table_name='products',
+                  postgresql_where=sa.text('is_active'))
+    op.drop_index('ix_products_active_score', table_name='products',
+                  postgresql_where=sa.text('is_active'))
+    op.drop_column('products', 'score')
+    op.drop_column('products', 'grade_sum')
+    op.drop_column('products', 'review_count')
@@ -0,0 +1,38 @@
+"""Add product sort indexes
+
+Revision ID: c5e7f9a21d06
+Revises: a81d5e0c3b47
+Create Date: 2026-10-19 11:48:52.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e7f9a21d06'
+down_revision: Union[str, Sequence[str], None] = 'a81d5e0c3b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SORT_COLUMNS = ('price', 'created_at', 'stock')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in SORT_COLUMNS:
+        op.create_index(f'ix_products_active_{column}', 'products', [column, 'id'],
+                        unique=False, postgresql_where=sa.text('is_active'))
+        op.create_index(f'ix_products_active_category_{column}', 'products', ['category_id', column, 'id'],
+                        unique=False, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(SORT_COLUMNS):
+        op.drop_index(f'ix_products_active_category_{column}', table_name='products',
+                      postgresql_where=sa.text('is_active'))
+        op.drop_index(f'ix_products_active_{column}', table_name='products',
+                      postgresql_where=sa.text('is_active'))
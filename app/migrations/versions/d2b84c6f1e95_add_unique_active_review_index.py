@@ -0,0 +1,61 @@
+"""Add unique active review index
+
+Revision ID: d2b84c6f1e95
+Revises: c5e7f9a21d06
+Create Date: 2026-10-19 12:37:05.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b84c6f1e95'
+down_revision: Union[str, Sequence[str], None] = 'c5e7f9a21d06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Значения по умолчанию из app.config на момент миграции
+PRIOR_MEAN = 3.5
+PRIOR_WEIGHT = 10.0
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Оставляем активным только последний отзыв пользователя на товар
+    op.execute("""
+        UPDATE reviews SET is_active = false
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY user_id, product_id ORDER BY id DESC) AS rn
+                FROM reviews
+                WHERE is_active
+            ) AS ranked
+            WHERE ranked.rn > 1
+        )
+    """)
+    # Пересчитываем счётчики оценок после отключения дубликатов
+    op.execute(f"""
+        UPDATE products AS p
+        SET review_count = s.cnt,
+            grade_sum = s.total,
+            rating = s.total / s.cnt,
+            score = ({PRIOR_WEIGHT * PRIOR_MEAN} + s.total) / ({PRIOR_WEIGHT} + s.cnt)
+        FROM (
+            SELECT product_id, count(*) AS cnt, sum(grade) AS total
+            FROM reviews
+            WHERE is_active AND grade IS NOT NULL
+            GROUP BY product_id
+        ) AS s
+        WHERE s.product_id = p.id
+    """)
+    op.create_index('uq_reviews_user_product_active', 'reviews', ['user_id', 'product_id'],
+                    unique=True, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_reviews_user_product_active', table_name='reviews',
+                  postgresql_where=sa.text('is_active'))
@@ -0,0 +1,105 @@
+"""Partition reviews by month
+
+Revision ID: f3c61d8a9b24
+Revises: e9a3f07b5c12
+Create Date: 2026-10-19 14:05:33.871902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c61d8a9b24'
+down_revision: Union[str, Sequence[str], None] = 'e9a3f07b5c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сколько месяцев вперёд создать секции сразу (дальше их создаёт app.jobs.partitions)
+MONTHS_AHEAD = 3
+
+REVIEW_COLUMNS = "id, user_id, product_id, comment, comment_date, grade, is_active"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE reviews RENAME TO reviews_old")
+    op.execute("ALTER TABLE reviews_old RENAME CONSTRAINT reviews_pkey TO reviews_old_pkey")
+    op.drop_index('uq_reviews_user_product_active', table_name='reviews_old',
+                  postgresql_where=sa.text('is_active'))
+
+    op.execute("""
+        CREATE TABLE reviews (
+            id integer NOT NULL DEFAULT nextval('reviews_id_seq'),
+            user_id integer NOT NULL REFERENCES users (id),
+            product_id integer NOT NULL REFERENCES products (id),
+            comment varchar,
+            comment_date timestamp without time zone NOT NULL,
+            grade integer,
+            is_active boolean,
+            PRIMARY KEY (id, comment_date)
+        ) PARTITION BY RANGE (comment_date)
+    """)
+    op.execute("ALTER SEQUENCE reviews_id_seq OWNED BY reviews.id")
+
+    # Месячные секции от самого старого отзыва до MONTHS_AHEAD месяцев вперёд
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month_start date := date_trunc('month', COALESCE((SELECT min(comment_date) FROM reviews_old), now()))::date;
+            last_month date := (date_trunc('month', now()) + interval '{MONTHS_AHEAD} months')::date;
+        BEGIN
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF reviews FOR VALUES FROM (%L) TO (%L)',
+                    'reviews_p' || to_char(month_start, 'YYYY_MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+    # Страховка для дат вне созданных секций
+    op.execute("CREATE TABLE reviews_default PARTITION OF reviews DEFAULT")
+
+    op.execute(f"INSERT INTO reviews ({REVIEW_COLUMNS}) SELECT {REVIEW_COLUMNS} FROM reviews_old")
+    op.create_index('ix_reviews_product_id_is_active', 'reviews', ['product_id', 'is_active'], unique=False)
+
+    op.create_table('review_claims',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'product_id')
+    )
+    op.execute("INSERT INTO review_claims (user_id, product_id) "
+               "SELECT DISTINCT user_id, product_id FROM reviews WHERE is_active")
+
+    op.execute("DROP TABLE reviews_old")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('review_claims')
+
+    op.execute("ALTER TABLE reviews RENAME TO reviews_partitioned")
+    op.execute("""
+        CREATE TABLE reviews (
+            id integer NOT NULL DEFAULT nextval('reviews_id_seq'),
+            user_id integer NOT NULL REFERENCES users (id),
+            product_id integer NOT NULL REFERENCES products (id),
+            comment varchar,
+            comment_date timestamp without time zone NOT NULL,
+            grade integer,
+            is_active boolean
+        )
+    """)
+    op.execute("ALTER SEQUENCE reviews_id_seq OWNED BY reviews.id")
+    op.execute(f"INSERT INTO reviews ({REVIEW_COLUMNS}) SELECT {REVIEW_COLUMNS} FROM reviews_partitioned")
+    op.execute("DROP TABLE reviews_partitioned")
+    op.execute("ALTER TABLE reviews ADD CONSTRAINT reviews_pkey PRIMARY KEY (id)")
+    op.create_index('uq_reviews_user_product_active', 'reviews', ['user_id', 'product_id'],
+                    unique=True, postgresql_where=sa.text('is_active'))
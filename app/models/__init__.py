@@ -1,6 +1,28 @@
 from .categories import Category
 from .products import Product
 from .users import User
-from .reviews import Review
+from .reviews import Review, ReviewClaim
+from .related_products import RelatedProduct
+from .archive import ProductArchive, ReviewArchive
+from .stats import SellerStats, CategoryStats
+from .tokens import RevokedToken
+from .outbox import OutboxEvent
+from .idempotency import IdempotencyKey
+from .throttling import LoginAttempt
 
-__all__ = ["Category", "Product", "User", "Review"]
\ No newline at end of file
+__all__ = [
+    "Category",
+    "Product",
+    "User",
+    "Review",
+    "ReviewClaim",
+    "RelatedProduct",
+    "ProductArchive",
+    "ReviewArchive",
+    "SellerStats",
+    "CategoryStats",
+    "RevokedToken",
+    "OutboxEvent",
+    "IdempotencyKey",
+    "LoginAttempt",
+]
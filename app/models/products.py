@@ -1,14 +1,30 @@
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import String, Boolean, Integer, Numeric, DateTime
+from sqlalchemy import String, Boolean, Integer, Numeric, DateTime, Float, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import ForeignKey
 
+from app.config import RATING_PRIOR_MEAN
 from app.database import Base
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_active_score", "score", "id", postgresql_where="is_active"),
+        Index("ix_products_active_category_score", "category_id", "score", "id",
+              postgresql_where="is_active"),
+        Index("ix_products_active_price", "price", "id", postgresql_where="is_active"),
+        Index("ix_products_active_category_price", "category_id", "price", "id",
+              postgresql_where="is_active"),
+        Index("ix_products_active_created_at", "created_at", "id", postgresql_where="is_active"),
+        Index("ix_products_active_category_created_at", "category_id", "created_at", "id",
+              postgresql_where="is_active"),
+        Index("ix_products_active_stock", "stock", "id", postgresql_where="is_active"),
+        Index("ix_products_active_seller_id", "seller_id", postgresql_where="is_active"),
+        Index("ix_products_active_category_stock", "category_id", "stock", "id",
+              postgresql_where="is_active"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -20,6 +36,10 @@ class Product(Base):
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), nullable=False)
     seller_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)  # New
     rating: Mapped[float | None] = mapped_column(Integer, nullable=True, default=None)
+    review_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    grade_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    score: Mapped[float] = mapped_column(Float, nullable=False, default=RATING_PRIOR_MEAN,
+                                         server_default=str(RATING_PRIOR_MEAN))
     created_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     updated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
@@ -0,0 +1,17 @@
+from sqlalchemy import Float, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class RelatedProduct(Base):
+    """
+    Предрасчитанные похожие товары по совместным отзывам покупателей.
+    Заполняется фоновой задачей app.jobs.related_products.
+    """
+    __tablename__ = "related_products"
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    related_product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
@@ -1,17 +1,41 @@
 from datetime import datetime
 from app.database import Base
 
-from sqlalchemy import ForeignKey, String, DateTime, Integer, Boolean
+from sqlalchemy import ForeignKey, String, DateTime, Integer, Boolean, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 
 class Review(Base):
+    """
+    Отзывы хранятся в таблице, секционированной по месяцам comment_date.
+    Секции создаются заранее задачей app.jobs.partitions.
+    """
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index("ix_reviews_product_id_is_active", "product_id", "is_active"),
+        Index("ix_reviews_deactivated_at", "deactivated_at", postgresql_where=text("deactivated_at IS NOT NULL")),
+        {"postgresql_partition_by": "RANGE (comment_date)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    # В составном ключе id не получает SERIAL сам; в миграциях это reviews_id_seq
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
     comment: Mapped[str] = mapped_column(String, nullable=True)
-    comment_date: Mapped[datetime] = mapped_column(DateTime, default=datetime.now())
+    comment_date: Mapped[datetime] = mapped_column(DateTime, primary_key=True, default=datetime.now)
     grade: Mapped[int] = mapped_column(Integer, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=True, default=True)
+    # Когда отзыв удалён (UTC); от этого момента app.jobs.archive отсчитывает срок хранения
+    deactivated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class ReviewClaim(Base):
+    """
+    Не более одного активного отзыва пользователя на товар.
+    На секционированной таблице reviews такой уникальный индекс не построить,
+    поэтому пара (user_id, product_id) занимается здесь при создании отзыва.
+    """
+    __tablename__ = "review_claims"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
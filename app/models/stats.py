@@ -0,0 +1,36 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class SellerStats(Base):
+    """
+    Предрасчитанная статистика продавца по активным товарам.
+    Пересчитывается фоновой задачей app.jobs.stats.
+    """
+    __tablename__ = "seller_stats"
+
+    seller_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    product_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    total_stock: Mapped[int] = mapped_column(Integer, nullable=False)
+    stock_value: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False)
+    review_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    avg_rating: Mapped[float | None] = mapped_column(Float, nullable=True)
+    reviews_per_day: Mapped[float] = mapped_column(Float, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class CategoryStats(Base):
+    """
+    Предрасчитанное число активных товаров в категории.
+    Пересчитывается фоновой задачей app.jobs.stats.
+    """
+    __tablename__ = "category_stats"
+
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), primary_key=True)
+    product_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
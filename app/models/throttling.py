@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class LoginAttempt(Base):
+    """
+    Попытка входа в скользящем окне ограничения (app.throttling.PostgresBackend).
+    Ключ — email или IP клиента; строки старше окна удаляются.
+    """
+    __tablename__ = "login_attempts"
+    __table_args__ = (
+        Index("ix_login_attempts_key_attempted_at", "key", "attempted_at"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    key: Mapped[str] = mapped_column(Text, nullable=False)
+    attempted_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
@@ -0,0 +1,180 @@
+"""
+Транзакционный outbox для отложенных побочных действий.
+
+Обработчик записи добавляет событие через outbox.enqueue(db, topic, payload)
+в той же транзакции, что и основное изменение, и отвечает сразу после commit():
+событие существует тогда и только тогда, когда зафиксировано изменение.
+Воркер (фоновая задача lifespan или отдельный процесс python -m app.jobs.outbox)
+забирает пачки событий через FOR UPDATE SKIP LOCKED, поэтому несколько
+воркеров не берут одно событие дважды. Каждое событие обрабатывается в своём
+SAVEPOINT той же транзакции, что удаляет его строку: изменения обработчика
+в базе фиксируются ровно один раз. Неудачное событие откладывается с
+экспоненциальной задержкой, после OUTBOX_MAX_ATTEMPTS попыток остаётся в
+таблице с failed_at.
+"""
+import asyncio
+import logging
+import random
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import (
+    OUTBOX_BACKOFF_SECONDS,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_MAX_BACKOFF_SECONDS,
+    OUTBOX_POLL_SECONDS,
+)
+from app.database import async_session_maker
+from app.models import OutboxEvent
+
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[AsyncSession, dict], Awaitable[None]]
+AfterCommit = Callable[[dict], None]
+
+
+class Outbox:
+    """
+    Реестр обработчиков по теме события и воркер, который их выполняет.
+    """
+
+    def __init__(
+            self,
+            batch_size: int = OUTBOX_BATCH_SIZE,
+            max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+            backoff: float = OUTBOX_BACKOFF_SECONDS,
+            max_backoff: float = OUTBOX_MAX_BACKOFF_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._handlers: dict[str, tuple[Handler, AfterCommit | None]] = {}
+        self._stats = {"processed": 0, "retried": 0, "failed": 0, "batches": 0}
+
+    def handler(self, topic: str, after_commit: AfterCommit | None = None):
+        """
+        Регистрирует обработчик темы. after_commit(payload) вызывается после
+        фиксации транзакции обработчика — для сброса кэшей процесса.
+        """
+        def register(handler: Handler) -> Handler:
+            self._handlers[topic] = (handler, after_commit)
+            return handler
+
+        return register
+
+    def enqueue(self, db: AsyncSession, topic: str, payload: dict) -> None:
+        """
+        Добавляет событие в транзакцию db. Фиксируется вызывающим кодом через db.commit().
+        """
+        db.add(OutboxEvent(topic=topic, payload=payload))
+
+    def _delay(self, attempts: int) -> timedelta:
+        # Случайная точка в верхней половине интервала: повторы разных событий расходятся
+        seconds = min(self.max_backoff, self.backoff * 2 ** attempts)
+        return timedelta(seconds=seconds * random.uniform(0.5, 1))
+
+    async def process_batch(self, db: AsyncSession | None = None) -> int:
+        """
+        Обрабатывает одну пачку готовых событий. Возвращает число взятых событий.
+        db — сессия для тестов; по умолчанию открывается своя.
+        """
+        if db is None:
+            async with async_session_maker() as db:
+                return await self.process_batch(db)
+
+        events = (await db.execute(
+            select(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.payload, OutboxEvent.attempts)
+            .where(OutboxEvent.failed_at.is_(None), OutboxEvent.available_at <= func.now())
+            .order_by(OutboxEvent.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )).all()
+
+        done = []
+        for event in events:
+            handler, after_commit = self._handlers.get(event.topic, (None, None))
+            try:
+                if handler is None:
+                    raise LookupError(f"No outbox handler for topic {event.topic!r}")
+                async with db.begin_nested():
+                    await handler(db, event.payload)
+            except Exception as exc:
+                await self._fail(db, event, exc)
+            else:
+                done.append((event.id, after_commit, event.payload))
+
+        if done:
+            await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([event_id for event_id, _, _ in done])))
+        await db.commit()
+
+        self._stats["batches"] += 1
+        self._stats["processed"] += len(done)
+        for _, after_commit, payload in done:
+            if after_commit is not None:
+                try:
+                    after_commit(payload)
+                except Exception:
+                    logger.exception("Outbox after-commit hook failed")
+        return len(events)
+
+    async def _fail(self, db: AsyncSession, event, exc: Exception) -> None:
+        attempts = event.attempts + 1
+        failed = attempts >= self.max_attempts
+        self._stats["failed" if failed else "retried"] += 1
+        logger.warning("Outbox event %s (%s) failed, attempt %s", event.id, event.topic, attempts,
+                       exc_info=exc)
+        await db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id == event.id)
+            .values(
+                attempts=attempts,
+                last_error=repr(exc)[:1000],
+                available_at=func.now() + self._delay(attempts - 1),
+                failed_at=func.now() if failed else None,
+            )
+        )
+
+    async def run(
+            self,
+            interval: float = OUTBOX_POLL_SECONDS,
+            after_batch: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        """
+        Бесконечный цикл воркера: полные пачки разбираются подряд, между неполными — пауза.
+        after_batch() вызывается после каждой пачки.
+        """
+        while True:
+            try:
+                claimed = await self.process_batch()
+                if after_batch is not None:
+                    await after_batch()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                await asyncio.sleep(interval)
+
+    async def backlog(self) -> dict:
+        """
+        Глубина очереди, возраст самого старого необработанного события и число отказов.
+        """
+        pending = OutboxEvent.failed_at.is_(None)
+        async with async_session_maker() as db:
+            depth, oldest, dead = (await db.execute(select(
+                func.count().filter(pending),
+                func.extract("epoch", func.now() - func.min(OutboxEvent.created_at).filter(pending)),
+                func.count().filter(OutboxEvent.failed_at.isnot(None)),
+            ))).one()
+        return {"depth": depth, "lag_seconds": float(oldest or 0), "dead": dead}
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+
+outbox = Outbox()
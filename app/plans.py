@@ -0,0 +1,73 @@
+"""
+Проверка планов запросов списка товаров по EXPLAIN.
+
+Для ключа сортировки GET /products/ строится запрос первой страницы и каждого
+продолжения по курсору (все режимы seek_segments); план не должен содержать
+Seq Scan или отдельный узел Sort вместо чтения по индексу, а для запросов
+по курсору условие seek должно быть в Index Cond: иначе индекс читается
+с начала, а условие проверяется фильтром по строкам.
+
+Перед EXPLAIN выполняются PLANNER_SETTINGS: на маленькой таблице планировщик
+и так выбрал бы Seq Scan, Bitmap Scan или Sort, а запрещённый узел остаётся
+в плане, только если без него запрос не выполнить. Поэтому проверка
+не зависит от размера таблицы.
+
+Используется тестами (tests/test_sort_plans.py) и benchmarks/sort_plans.py.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy.dialects import postgresql
+
+from app.models import Product
+from app.statements import SORT_KEYS, product_list_statement, seek_segments
+
+PLANNER_SETTINGS = ("SET enable_seqscan = off", "SET enable_bitmapscan = off", "SET enable_sort = off")
+
+# Значение курсора для каждой колонки сортировки
+CURSOR_VALUES = {
+    Product.id: 100,
+    Product.price: Decimal("100.00"),
+    Product.created_at: datetime(2024, 1, 1),
+    Product.score: 4.0,
+    Product.stock: 5,
+}
+
+
+def seek_modes(sort) -> list[str | None]:
+    """
+    Первая страница (None) и все режимы продолжения по курсору для ключа сортировки.
+    """
+    column, descending = SORT_KEYS[sort]
+    modes = seek_segments(column, descending, CURSOR_VALUES[column]) + seek_segments(column, descending, None)
+    return [None, *dict.fromkeys(modes)]
+
+
+def build_statement(sort, category_id: int | None, seek: str | None = None):
+    filter_names = ("category_id",) if category_id is not None else ()
+    column, _ = SORT_KEYS[sort]
+    return product_list_statement(filter_names, sort, seek).params(
+        category_id=category_id, limit=21, offset=0, last_value=CURSOR_VALUES[column], last_id=100)
+
+
+def explain_sql(stmt) -> str:
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    return f"EXPLAIN (FORMAT JSON) {sql}"
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def plan_problems(plan: dict, sort, seek: str | None) -> list[str]:
+    """
+    Нарушения плана: пустой список, если страница читается по индексу без сортировки.
+    """
+    nodes = list(plan_nodes(plan))
+    problems = [node["Node Type"] for node in nodes if node["Node Type"] in ("Seq Scan", "Sort")]
+    column, _ = SORT_KEYS[sort]
+    if seek is not None and not any(column.key in node.get("Index Cond", "") for node in nodes):
+        problems.append("seek not in Index Cond")
+    return problems
@@ -0,0 +1,73 @@
+"""
+Адрес клиента за CDN и балансировщиком.
+
+За прокси scope["client"] — адрес последнего прокси, и все запросы через
+один узел CDN выглядят как запросы одного клиента. ProxyHeadersMiddleware
+берёт адрес из X-Forwarded-For, но только если соединение пришло от
+доверенного прокси (TRUSTED_PROXIES — адреса и сети через запятую).
+Цепочка читается справа налево: доверенные прокси пропускаются, первый
+недоверенный адрес считается клиентом. Адреса левее него клиент мог
+подставить сам, поэтому они не используются.
+
+uvicorn 0.29 доверяет только последнему адресу заголовка, поэтому app.server
+отключает его обработку proxy_headers и полагается на этот middleware.
+"""
+import ipaddress
+from collections.abc import Iterable
+
+from starlette.datastructures import Headers
+
+from app.config import TRUSTED_PROXIES
+
+
+class TrustedProxies:
+    """
+    Список доверенных прокси и разбор цепочки X-Forwarded-For.
+    """
+
+    def __init__(self, networks: Iterable[str]):
+        self.networks = [ipaddress.ip_network(network.strip(), strict=False)
+                         for network in networks if network.strip()]
+
+    def trusts(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def client(self, peer: str, forwarded_for: str) -> str:
+        """
+        Адрес клиента для соединения от peer с заголовком forwarded_for.
+        """
+        if not self.trusts(peer):
+            return peer
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not self.trusts(hop):
+                return hop
+        # Вся цепочка из доверенных прокси: клиент — самый левый адрес
+        return hops[0] if hops else peer
+
+
+class ProxyHeadersMiddleware:
+    """
+    Подставляет в scope["client"] адрес клиента из X-Forwarded-For доверенного прокси.
+    """
+
+    def __init__(self, app, proxies: TrustedProxies):
+        self.app = app
+        self.proxies = proxies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.proxies.networks and scope.get("client"):
+            forwarded_for = ",".join(Headers(scope=scope).getlist("x-forwarded-for"))
+            if forwarded_for:
+                peer = scope["client"][0]
+                client = self.proxies.client(peer, forwarded_for)
+                if client != peer:
+                    scope = {**scope, "client": (client, 0)}
+        await self.app(scope, receive, send)
+
+
+trusted_proxies = TrustedProxies(TRUSTED_PROXIES.split(","))
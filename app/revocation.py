@@ -0,0 +1,158 @@
+"""
+Отзыв JWT без запроса к базе на каждый аутентифицированный запрос.
+
+Отозванные jti и семейства токенов (fam) записываются в revoked_tokens.
+Каждый воркер держит их копию в словаре в памяти и раз в
+REVOCATION_SYNC_SECONDS дочитывает новые строки по revoked_at, поэтому
+проверка токена — две операции поиска в словаре. Собственные отзывы воркер
+видит сразу после commit(), отзывы других воркеров — с задержкой не больше
+периода синхронизации.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from time import monotonic, time
+
+from sqlalchemy import delete, event, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import REVOCATION_SYNC_SECONDS
+from app.database import async_session_maker, utc_now
+from app.models import RevokedToken
+
+
+logger = logging.getLogger(__name__)
+
+# Запас при дочитывании: строки, закоммиченные позже своей отметки revoked_at
+SYNC_OVERLAP = timedelta(seconds=5)
+# Как часто удалять из таблицы строки истёкших токенов
+PURGE_INTERVAL_SECONDS = 60 * 60
+# Ключ session.info с отзывами, которые попадут в память после commit()
+PENDING_KEY = "pending_revocations"
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class RevocationList:
+    """
+    Копия revoked_tokens в памяти процесса: token_id -> время истечения (unix time).
+    """
+
+    def __init__(self):
+        self._expires: dict[str, float] = {}
+        self._watermark: datetime | None = None
+        self._last_purge = monotonic()
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def is_revoked(self, payload: dict) -> bool:
+        """
+        Отозван ли сам токен или всё его семейство.
+        """
+        return payload.get("jti") in self._expires or payload.get("fam") in self._expires
+
+    def _insert(self, token_id: str, expires_at: float):
+        return (
+            insert(RevokedToken)
+            .values(token_id=token_id, expires_at=_utc(expires_at), revoked_at=utc_now())
+            .on_conflict_do_nothing(index_elements=[RevokedToken.token_id])
+            .returning(RevokedToken.revoked_at)
+        )
+
+    def _defer(self, db: AsyncSession, token_id: str, expires_at: float) -> None:
+        # Если транзакция откатится, отзыв не должен остаться в памяти
+        db.info.setdefault(PENDING_KEY, []).append((self, token_id, expires_at))
+
+    def _apply(self, token_id: str, expires_at: float) -> None:
+        self._expires[token_id] = max(expires_at, self._expires.get(token_id, 0))
+
+    async def revoke(self, db: AsyncSession, token_id: str, expires_at: float) -> bool:
+        """
+        Отзывает jti или семейство. Возвращает False, если идентификатор уже был отозван.
+        Изменения фиксируются вызывающим кодом через db.commit(); в память
+        процесса отзыв попадает только после успешного commit().
+        """
+        revoked_at = await db.scalar(self._insert(token_id, expires_at))
+        self._defer(db, token_id, expires_at)
+        return revoked_at is not None
+
+    async def rotate(self, db: AsyncSession, token_id: str, expires_at: float) -> tuple[datetime, bool]:
+        """
+        Отзывает jti обмениваемого refresh-токена. Возвращает время первого
+        обмена (UTC без часового пояса) и True, если этот обмен первый.
+        """
+        revoked_at = await db.scalar(self._insert(token_id, expires_at))
+        self._defer(db, token_id, expires_at)
+        if revoked_at is not None:
+            return revoked_at, True
+        # Вставка ждёт commit() одновременного обмена, поэтому его строка уже видна
+        revoked_at = await db.scalar(select(RevokedToken.revoked_at).where(RevokedToken.token_id == token_id))
+        return revoked_at, False
+
+    def clear(self) -> None:
+        """
+        Забывает все отзывы и позицию синхронизации; следующий sync() перечитает таблицу.
+        """
+        self._expires.clear()
+        self._watermark = None
+
+    def _prune(self) -> None:
+        now = time()
+        self._expires = {token_id: expires for token_id, expires in self._expires.items() if expires > now}
+
+    async def sync(self) -> int:
+        """
+        Дочитывает новые отзывы из базы. Возвращает число прочитанных строк.
+        """
+        stmt = select(RevokedToken.token_id, RevokedToken.expires_at, RevokedToken.revoked_at)
+        if self._watermark is not None:
+            stmt = stmt.where(RevokedToken.revoked_at >= self._watermark - SYNC_OVERLAP)
+        else:
+            stmt = stmt.where(RevokedToken.expires_at > _utc(time()))
+
+        async with async_session_maker() as db:
+            rows = (await db.execute(stmt)).all()
+            if monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                await db.execute(delete(RevokedToken).where(RevokedToken.expires_at < _utc(time())))
+                await db.commit()
+                self._last_purge = monotonic()
+                self._prune()
+
+        for token_id, expires_at, revoked_at in rows:
+            self._expires[token_id] = expires_at.replace(tzinfo=timezone.utc).timestamp()
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+        return len(rows)
+
+    async def run(self, interval: float = REVOCATION_SYNC_SECONDS) -> None:
+        """
+        Фоновый цикл синхронизации для lifespan приложения.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Revocation list sync failed")
+
+    def stats(self) -> dict:
+        return {"revoked": len(self._expires)}
+
+
+revocations = RevocationList()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    for revocation_list, token_id, expires_at in session.info.pop(PENDING_KEY, ()):
+        revocation_list._apply(token_id, expires_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(PENDING_KEY, None)
@@ -9,6 +9,9 @@ from sqlalchemy.orm import Session
 from app.models.categories import Category as CategoryModel
 from app.schemas.categories import Category as CategorySchema, CategoryCreate
 from app.db_depends import get_db
+from app.edge_cache import CATEGORIES_KEY, SurrogateKeys, cache_policy, category_key, edge_cache
+from app.lookups import is_category_active, forget_category
+from app.statements import ACTIVE_CATEGORIES_WITH_STATS, CATEGORY_ANCESTOR_IDS
 
 
 router = APIRouter(
@@ -18,12 +21,21 @@ router = APIRouter(
 
 
 @router.get("/", response_model=list[CategorySchema])
-async def get_all_categories(db: AsyncSession = Depends(get_async_db)):
+async def get_all_categories(
+        db: AsyncSession = Depends(get_async_db),
+        keys: SurrogateKeys = Depends(cache_policy("categories")),
+):
     """
-    Возвращает список всех активных категорий.
+    Возвращает список всех активных категорий с числом активных товаров.
     """
-    result = await db.scalars(select(CategoryModel).where(CategoryModel.is_active==True))
-    categories = result.all()
+    result = await db.execute(ACTIVE_CATEGORIES_WITH_STATS)
+    categories = [
+        CategorySchema.model_validate(category).model_copy(
+            update={"product_count": product_count, "stats_refreshed_at": refreshed_at}
+        )
+        for category, product_count, refreshed_at in result.all()
+    ]
+    keys.add(CATEGORIES_KEY, *(category_key(category.id) for category in categories))
     return categories
 
 
@@ -34,17 +46,14 @@ async def create_category(category: CategoryCreate, db: AsyncSession = Depends(g
     """
     # Проверка существования parent_id, если указан
     if category.parent_id is not None:
-        stmt = select(CategoryModel).where(CategoryModel.id == category.parent_id,
-                                           CategoryModel.is_active == True)
-        result = await db.scalars(stmt)
-        parent = result.first()
-        if parent is None:
+        if not await is_category_active(db, category.parent_id):
             raise HTTPException(status_code=400, detail="Parent category not found")
 
     # Создание новой категории
     db_category = CategoryModel(**category.model_dump())
     db.add(db_category)
     await db.commit()
+    edge_cache.purge(CATEGORIES_KEY)
     return db_category
 
 @router.delete("/{category_id}", response_model=CategorySchema)
@@ -65,6 +74,8 @@ async def delete_category(category_id: int, db: AsyncSession = Depends(get_async
         .values(is_active=False)
     )
     await db.commit()
+    forget_category(category_id)
+    edge_cache.purge(category_key(category_id))
     return db_category
 
 
@@ -84,14 +95,15 @@ async def update_category(category_id: int, category: CategoryCreate, db: AsyncS
 
     # Проверяем parent_id, если указан
     if category.parent_id is not None:
-        parent_stmt = select(CategoryModel).where(CategoryModel.id == category.parent_id,
-                                                  CategoryModel.is_active == True)
-        parent_result = await db.scalars(parent_stmt)
-        parent = parent_result.first()
-        if not parent:
+        if not await is_category_active(db, category.parent_id):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Parent category not found")
-        if parent.id == category_id:
+        if category.parent_id == category_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Category cannot be its own parent")
+        # Новый родитель не должен быть потомком категории, иначе в дереве появится цикл
+        ancestors = (await db.scalars(CATEGORY_ANCESTOR_IDS, {"category_id": category.parent_id})).all()
+        if category_id in ancestors:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="Category cannot be a descendant of itself")
 
     # Обновляем категорию
     update_data = category.model_dump(exclude_unset=True)
@@ -101,4 +113,6 @@ async def update_category(category_id: int, category: CategoryCreate, db: AsyncS
         .values(**update_data)
     )
     await db.commit()
+    forget_category(category_id)
+    edge_cache.purge(category_key(category_id))
     return db_category
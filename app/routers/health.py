@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.lifecycle import lifecycle
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+)
+
+
+@router.get("/live")
+async def live():
+    """
+    Процесс жив и обслуживает цикл событий.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def ready():
+    """
+    Процесс прогрет и принимает трафик; 503 до окончания прогрева и во время остановки.
+    """
+    if not lifecycle.ready:
+        status = "draining" if lifecycle.draining else "starting"
+        return JSONResponse(status_code=503, content={"status": status})
+    return {"status": "ready"}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, Path, Request, Response
+from fastapi.responses import FileResponse
+
+from app.images import VARIANTS, content_type, image_storage
+
+router = APIRouter(
+    prefix="/images",
+    tags=["images"],
+)
+
+# Имя файла определяется его содержимым, поэтому кэшировать можно бессрочно
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/{digest}/{variant}")
+async def get_image(request: Request, variant: str,
+                    digest: str = Path(..., pattern="^[0-9a-f]{64}$")):
+    """
+    Отдаёт копию изображения товара. Файл передаётся FileResponse без чтения
+    в память (через sendfile, если ASGI-сервер его поддерживает).
+    """
+    if variant not in VARIANTS:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{digest}-{variant}"'
+    headers = {"Cache-Control": CACHE_CONTROL, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    path = image_storage.path(digest, variant)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(path, media_type=content_type(variant), headers=headers)
@@ -1,23 +1,41 @@
-from datetime import date, datetime, timezone
+from datetime import date
 
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, File, HTTPException, status, Query, UploadFile
 from fastapi.params import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_user
-from app.schemas.products import ProductCreate, Product as ProductSchema, ProductList
-from sqlalchemy import select, func, update
-from app.models import Product as ProductModel
+from app.catalog_snapshot import catalog
+from app.config import SUGGEST_TOP_K
+from app.images import image_url, images
+from app.schemas.products import (
+    ProductCreate,
+    Product as ProductSchema,
+    ProductList,
+    ProductBatch,
+    ProductBatchRequest,
+    ProductTopList,
+    ProductSort,
+    ProductPage,
+    ProductSuggestion,
+)
+from sqlalchemy import func, select, update, tuple_
+from app.models import Product as ProductModel, RelatedProduct as RelatedProductModel
 from app.models.users import User as UserModel
 from app.models.categories import Category as CategoryModel
+from app.database import utc_now
 from app.db_depends import get_async_db
+from app.edge_cache import SurrogateKeys, cache_policy, category_key, edge_cache, product_key, reviews_key
+from app.pagination import encode_cursor, decode_cursor
+from app.lookups import get_active_product, get_product_page, is_category_active, forget_product
+from app.statements import SORT_KEYS, product_count_statement, product_list_statement, seek_segments
+from app.suggest import normalize, suggestions
 
 router = APIRouter(
     prefix="/products",
     tags=["products"],
 )
 
-
 @router.get("/", response_model=ProductList)
 async def get_all_products(
         page: int = Query(1, ge=1),
@@ -36,7 +54,12 @@ async def get_all_products(
             None, description="Дата создания товара в формате YYYY-MM-DD для фильтрации"),
         updated_at: date | None = Query(
             None, description="Дата последнего обновления товара в формате YYYY-MM-DD для фильтрации"),
+        sort: ProductSort = Query(
+            ProductSort.id, description="Сортировка: price, created_at, rating, stock; '-' — по убыванию"),
+        cursor: str | None = Query(
+            None, description="Курсор из next_cursor; при его наличии page не используется"),
         db: AsyncSession = Depends(get_async_db),
+        keys: SurrogateKeys = Depends(cache_policy("listing")),
 ):
     """
     Возвращает список всех активных товаров с поддержкой фильтров.
@@ -48,43 +71,75 @@ async def get_all_products(
             detail="min_price не может быть больше max_price",
         )
 
-    # Формируем список фильтров
-    filters = [ProductModel.is_active == True]
+    column, descending = SORT_KEYS[sort]
 
-    if category_id is not None:
-        filters.append(ProductModel.category_id == category_id)
-    if min_price is not None:
-        filters.append(ProductModel.price >= min_price)
-    if max_price is not None:
-        filters.append(ProductModel.price <= max_price)
+    # Режим снимка в памяти: без обращения к базе, только для постраничной выдачи
+    if catalog is not None and catalog.ready and cursor is None:
+        result = catalog.list(
+            page, page_size,
+            category_id=category_id, min_price=min_price, max_price=max_price,
+            in_stock=in_stock, seller_id=seller_id, created_at=created_at, updated_at=updated_at,
+            sort_key=column.key, descending=descending,
+        )
+        keys.products(result["items"])
+        return {**result, "page": page, "page_size": page_size, "next_cursor": None}
+
+    # Формируем параметры фильтров; набор имён фильтров — ключ готового запроса
+    params = {
+        "category_id": category_id,
+        "min_price": min_price,
+        "max_price": max_price,
+        "seller_id": seller_id,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+    params = {name: value for name, value in params.items() if value is not None}
+    filter_names = list(params)
     if in_stock is not None:
-        filters.append(ProductModel.stock > 0 if in_stock else ProductModel.stock == 0)
-    if seller_id is not None:
-        filters.append(ProductModel.seller_id == seller_id)
-    if created_at is not None:
-        filters.append(func.date(ProductModel.created_at) == created_at)
-    if updated_at is not None:
-        filters.append(func.date(ProductModel.updated_at) == updated_at)
+        filter_names.append("in_stock" if in_stock else "out_of_stock")
+    filter_names = tuple(sorted(filter_names))
 
     # Подсчёт общего количества с учётом фильтров
-    total_stmt = select(func.count()).select_from(ProductModel).where(*filters)
-    total = await db.scalar(total_stmt) or 0
-
-    # Выборка товаров с фильтрами и пагинацией
-    products_stmt = (
-        select(ProductModel)
-        .where(*filters)
-        .order_by(ProductModel.id)
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-    )
-    items = (await db.scalars(products_stmt)).all()
-
+    total = await db.scalar(product_count_statement(filter_names), params) or 0
+
+    # Выборка товаров с фильтрами, сортировкой и пагинацией
+    list_params = dict(params)
+    if cursor is not None:
+        if column is ProductModel.id:
+            (last_id,) = decode_cursor(cursor, ProductModel.id)
+            value = last_id
+        else:
+            value, last_id = decode_cursor(cursor, column, ProductModel.id)
+        segments = seek_segments(column, descending, value)
+        list_params.update(last_value=value, last_id=last_id)
+    else:
+        segments = [None]
+        list_params["offset"] = (page - 1) * page_size
+
+    # Продолжение по курсору может занять несколько запросов: значения, затем строки с NULL
+    items = []
+    for seek in segments:
+        list_params["limit"] = page_size + 1 - len(items)
+        items += (await db.scalars(product_list_statement(filter_names, sort, seek), list_params)).all()
+        if len(items) > page_size:
+            break
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        if column is ProductModel.id:
+            next_cursor = encode_cursor(last.id)
+        else:
+            next_cursor = encode_cursor(getattr(last, column.key), last.id)
+
+    keys.products(items)
     return {
         "items": items,
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
     }
 
 @router.post("/", response_model=ProductSchema)
@@ -92,13 +147,10 @@ async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_
     if current_user.role != "seller":
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    result = await db.scalars(select(CategoryModel).where(CategoryModel.id == product.category_id, CategoryModel.is_active == True))
-    category = result.first()
-
-    if category is None:
+    if not await is_category_active(db, product.category_id):
         raise HTTPException(status_code=400, detail="Category not found")
 
-    now = datetime.now(timezone.utc)
+    now = utc_now()
     product = ProductModel(
         name=product.name,
         description=product.description,
@@ -113,44 +165,235 @@ async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_
     db.add(product)
     await db.commit()
     await db.refresh(product)
+    # Новый ID мог попасть в закэшированный ответ GET /products/batch как ненайденный
+    edge_cache.purge(product_key(product.id))
+    suggestions.upsert(product.id, product.name, product.score)
 
     return product
 
 
 @router.get("/category/{category_id}")
-async def get_products_by_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
-    result_category = await db.scalars(select(CategoryModel).where(CategoryModel.id == category_id, CategoryModel.is_active == True))
-    category = result_category.first()
-
-    if category is None:
+async def get_products_by_category(
+        category_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        keys: SurrogateKeys = Depends(cache_policy("listing")),
+):
+    if not await is_category_active(db, category_id):
         raise HTTPException(status_code=400, detail="Category not found or inactive")
 
     result_products = await db.scalars(select(ProductModel).where(ProductModel.category_id == category_id))
     products = result_products.all()
 
+    keys.add(category_key(category_id))
+    keys.products(products)
     return products
 
 
+async def _get_products_by_ids(ids: list[int], db: AsyncSession) -> dict:
+    """
+    Загружает активные товары из активных категорий по списку ID одним запросом.
+    Сохраняет порядок запроса, ненайденные ID возвращает отдельно.
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    stmt = (
+        select(ProductModel)
+        .join(CategoryModel, CategoryModel.id == ProductModel.category_id)
+        .where(ProductModel.id.in_(unique_ids),
+               ProductModel.is_active == True,
+               CategoryModel.is_active == True)
+    )
+    found = {product.id: product for product in (await db.scalars(stmt)).all()}
+
+    return {
+        "items": [found[product_id] for product_id in unique_ids if product_id in found],
+        "missing": [product_id for product_id in unique_ids if product_id not in found],
+    }
+
+
+@router.get("/batch", response_model=ProductBatch)
+async def get_products_batch(
+        ids: list[int] = Query(..., min_length=1, max_length=100,
+                               description="Список ID товаров: ?ids=1&ids=2"),
+        db: AsyncSession = Depends(get_async_db),
+        keys: SurrogateKeys = Depends(cache_policy("product")),
+):
+    """
+    Возвращает несколько товаров по списку ID за один запрос к базе.
+    """
+    # Ключи и ненайденных товаров: ответ устареет, если какой-то из них изменится
+    keys.add(*map(product_key, dict.fromkeys(ids)))
+    return await _get_products_by_ids(ids, db)
+
+
+@router.post("/batch", response_model=ProductBatch)
+async def post_products_batch(body: ProductBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    То же, что GET /products/batch, но список ID передаётся в теле запроса.
+    """
+    return await _get_products_by_ids(body.ids, db)
+
+
+@router.get("/top", response_model=ProductTopList)
+async def get_top_products(
+        category_id: int | None = Query(None, description="ID категории для фильтрации"),
+        limit: int = Query(20, ge=1, le=100),
+        cursor: str | None = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+        db: AsyncSession = Depends(get_async_db),
+        keys: SurrogateKeys = Depends(cache_policy("listing")),
+):
+    """
+    Возвращает активные товары по убыванию байесовской оценки с курсорной пагинацией.
+    """
+    filters = [ProductModel.is_active == True]
+    if category_id is not None:
+        filters.append(ProductModel.category_id == category_id)
+    if cursor is not None:
+        last_score, last_id = decode_cursor(cursor, ProductModel.score, ProductModel.id)
+        filters.append(tuple_(ProductModel.score, ProductModel.id) < (last_score, last_id))
+
+    stmt = (
+        select(ProductModel)
+        .where(*filters)
+        .order_by(ProductModel.score.desc(), ProductModel.id.desc())
+        .limit(limit + 1)
+    )
+    items = (await db.scalars(stmt)).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].score, items[-1].id)
+
+    keys.products(items)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/suggest", response_model=list[ProductSuggestion])
+async def suggest_products(
+        q: str = Query(..., min_length=1, max_length=100, description="Начало названия товара"),
+        limit: int = Query(10, ge=1, le=SUGGEST_TOP_K),
+        db: AsyncSession = Depends(get_async_db),
+        keys: SurrogateKeys = Depends(cache_policy("suggest")),
+):
+    """
+    Подсказки для строки поиска: активные товары, название которых начинается с q,
+    по убыванию оценки. Отвечает из индекса в памяти без запроса к базе.
+    """
+    if suggestions.ready:
+        items = suggestions.suggest(q, limit)
+        keys.products(items)
+        return items
+
+    # Индекс ещё не построен (приложение без lifespan, например в тестах)
+    stmt = (
+        select(ProductModel.id, ProductModel.name)
+        .where(ProductModel.is_active == True,
+               func.lower(ProductModel.name).startswith(normalize(q), autoescape=True))
+        .order_by(ProductModel.score.desc())
+        .limit(limit)
+    )
+    items = [{"id": row.id, "name": row.name} for row in await db.execute(stmt)]
+    keys.products(items)
+    return items
+
+
 @router.get("/{product_id}")
-async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
-    result = await db.scalars(select(ProductModel).where(ProductModel.id == product_id, ProductModel.is_active == True))
-    product = result.first()
+async def get_product(
+        product_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        keys: SurrogateKeys = Depends(cache_policy("product")),
+):
+    product = await get_active_product(db, product_id)
 
     if product is None:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    category_result = await db.scalars(
-        select(CategoryModel).where(CategoryModel.id == product.category_id,
-                                    CategoryModel.is_active == True)
-    )
-    category = category_result.first()
-    if not category:
+    if not await is_category_active(db, product.category_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Category not found or inactive")
 
+    keys.add(product_key(product.id), category_key(product.category_id))
     return product
 
 
+@router.get("/{product_id}/related", response_model=list[ProductSchema])
+async def get_related_products(
+        product_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        keys: SurrogateKeys = Depends(cache_policy("listing")),
+):
+    """
+    Возвращает похожие товары («покупатели, оценившие этот товар, также оценили»).
+    Данные предрасчитаны задачей app.jobs.related_products.
+    """
+    stmt = (
+        select(ProductModel)
+        .join(RelatedProductModel, RelatedProductModel.related_product_id == ProductModel.id)
+        .where(RelatedProductModel.product_id == product_id, ProductModel.is_active == True)
+        .order_by(RelatedProductModel.rank)
+    )
+    items = (await db.scalars(stmt)).all()
+    keys.add(product_key(product_id))
+    keys.products(items)
+    return items
+
+
+@router.get("/{product_id}/page", response_model=ProductPage)
+async def get_product_page_view(
+        product_id: int,
+        db: AsyncSession = Depends(get_async_db),
+        keys: SurrogateKeys = Depends(cache_policy("product")),
+):
+    """
+    Возвращает всё для страницы товара одним запросом к базе: товар, путь категорий,
+    продавца, число оценок и последние отзывы. Результат кэшируется до изменения товара.
+    """
+    page = await get_product_page(db, product_id)
+
+    if page is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if not page["category_active"]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Category not found or inactive")
+
+    keys.add(product_key(product_id), reviews_key(product_id),
+             *(category_key(category["id"]) for category in page["category_path"] or ()))
+    return page
+
+
+@router.post("/{product_id}/image", response_model=ProductSchema)
+async def upload_product_image(
+        product_id: int,
+        file: UploadFile = File(..., description="Изображение товара"),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: UserModel = Depends(get_current_user),
+):
+    """
+    Загружает изображение товара и делает его image_url. Готовятся копии
+    WebP и JPEG нескольких размеров; повторная загрузка того же файла не обрабатывается заново.
+    """
+    product = await get_active_product(db, product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if current_user.role != "seller" or product.seller_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    digest = await images.ingest(file)
+
+    await db.execute(
+        update(ProductModel)
+        .where(ProductModel.id == product_id)
+        .values(image_url=image_url(digest), updated_at=utc_now())
+    )
+    await db.commit()
+    forget_product(product_id)
+    edge_cache.purge(product_key(product_id))
+
+    return await db.scalar(
+        select(ProductModel).where(ProductModel.id == product_id).execution_options(populate_existing=True)
+    )
+
+
 @router.put("/{product_id}")
 async def update_product(product_id: int, new_product: ProductCreate, db: AsyncSession = Depends(get_async_db)):
     result = await db.scalars(select(ProductModel).where(ProductModel.id == product_id))
@@ -169,10 +412,13 @@ async def update_product(product_id: int, new_product: ProductCreate, db: AsyncS
     await db.execute(
         update(ProductModel)
         .where(ProductModel.id == product_id)
-        .values(**new_product.model_dump(), updated_at=datetime.now(timezone.utc))
+        .values(**new_product.model_dump(), updated_at=utc_now())
     )
     await db.commit()
+    forget_product(product_id)
+    edge_cache.purge(product_key(product_id))
     await db.refresh(product)
+    suggestions.upsert(product.id, product.name, product.score, product.is_active)
 
     return product
 
@@ -185,7 +431,10 @@ async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_d
     if product is None:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    await db.execute(update(ProductModel).where(ProductModel.id == product_id).values(is_active=False))
+    await db.execute(update(ProductModel).where(ProductModel.id == product_id).values(is_active=False, updated_at=utc_now()))
     await db.commit()
+    forget_product(product_id)
+    edge_cache.purge(product_key(product_id))
+    suggestions.remove(product_id)
 
     return {"status": "success", "message": "Product marked as inactive"}
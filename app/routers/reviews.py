@@ -1,12 +1,18 @@
+from datetime import date, datetime, time, timedelta
 from typing import List
 
-from fastapi import Depends, APIRouter, HTTPException
-from sqlalchemy import select
+from fastapi import Depends, APIRouter, HTTPException, Query
+from sqlalchemy import select, delete, literal, true, String, DateTime
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_user
+from app.database import utc_now
 from app.db_depends import get_async_db
-from app.models import Review, Product
+from app.edge_cache import SurrogateKeys, cache_policy, edge_cache, reviews_key
+from app.lookups import get_product, get_active_reviews, forget_reviews
+from app.outbox import outbox
+from app.models import Review, ReviewClaim, Product
 from app.models.users import User as UserModel
 from app.schemas import Review as ReviewSchema
 from app.schemas.reviews import ReviewCreate
@@ -16,23 +22,40 @@ router = APIRouter(
     tags=["reviews"],
 )
 
+
 @router.get("/", response_model=List[ReviewSchema])
-async def get_reviews(db: AsyncSession = Depends(get_async_db)):
-    result = await db.scalars(select(Review).where(Review.is_active == True))
+async def get_reviews(
+    date_from: date | None = Query(None, description="Отзывы начиная с даты (YYYY-MM-DD)"),
+    date_to: date | None = Query(None, description="Отзывы по дату включительно (YYYY-MM-DD)"),
+    db: AsyncSession = Depends(get_async_db),
+    keys: SurrogateKeys = Depends(cache_policy("listing")),
+):
+    # Границы по comment_date позволяют PostgreSQL читать только нужные месячные секции
+    filters = [Review.is_active == True]
+    if date_from is not None:
+        filters.append(Review.comment_date >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        filters.append(Review.comment_date < datetime.combine(date_to + timedelta(days=1), time.min))
+
+    result = await db.scalars(select(Review).where(*filters))
     reviews = result.all()
 
+    keys.add(*dict.fromkeys(reviews_key(review.product_id) for review in reviews))
     return reviews
 
 @router.get("/{products_id}", response_model=List[ReviewSchema])
-async def get_review(products_id: int, db: AsyncSession = Depends(get_async_db)):
-    product = await db.scalar(select(Product).where(Product.id == products_id))
+async def get_review(
+    products_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    keys: SurrogateKeys = Depends(cache_policy("reviews")),
+):
+    product = await get_product(db, products_id)
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    reviews = await db.scalars(select(Review).where(Review.is_active == True, Review.product_id == products_id))
-
-    return reviews
+    keys.add(reviews_key(products_id))
+    return await get_active_reviews(db, products_id)
 
 @router.post("/", response_model=ReviewSchema)
 async def create_review(
@@ -43,48 +66,49 @@ async def create_review(
     if current_user.role != "buyer":
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    product = await db.scalar(
-        select(Product).where(
-            Product.id == payload.product_id,
-            Product.is_active.is_(True),
+    # Один запрос: пара (user_id, product_id) занимается в review_claims, только
+    # если товар активен и активного отзыва ещё нет; отзыв вставляется из занятой пары
+    claim = (
+        insert(ReviewClaim.__table__)
+        .from_select(
+            ["user_id", "product_id"],
+            select(literal(current_user.id), Product.id)
+            .where(Product.id == payload.product_id, Product.is_active == True),
         )
+        .on_conflict_do_nothing()
+        .returning(ReviewClaim.__table__.c.user_id, ReviewClaim.__table__.c.product_id)
+        .cte("claim")
     )
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    old_review = await db.scalar(
-        select(Review).where(
-            Review.user_id == current_user.id,
-            Review.product_id == payload.product_id,
-            Review.is_active.is_(True),
+    stmt = (
+        insert(Review.__table__)
+        .from_select(
+            ["user_id", "product_id", "comment", "comment_date", "grade", "is_active"],
+            select(
+                claim.c.user_id,
+                claim.c.product_id,
+                literal(payload.comment, String),
+                literal(datetime.now(), DateTime),
+                literal(payload.grade),
+                true(),
+            ),
         )
+        .returning(*Review.__table__.c)
     )
-    if old_review:
-        raise HTTPException(status_code=403, detail="Already have review")
+    review = (await db.execute(stmt)).mappings().first()
 
-    review = Review(
-        user_id=current_user.id,
-        product_id=payload.product_id,
-        comment=payload.comment,
-        grade=payload.grade,
-    )
-    db.add(review)
-    await db.flush()
-
-    grades = (
-        await db.scalars(
-            select(Review.grade).where(
-                Review.is_active.is_(True),
-                Review.product_id == product.id,
-                Review.grade.isnot(None),
-            )
-        )
-    ).all()
+    if review is None:
+        product = await db.scalar(
+            select(Product.id).where(Product.id == payload.product_id, Product.is_active == True))
+        if product is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        raise HTTPException(status_code=403, detail="Already have review")
 
-    product.rating = (sum(grades) / len(grades)) if grades else None
+    # Рейтинг и оценка товара пересчитываются воркером outbox после ответа
+    outbox.enqueue(db, "review.graded", {"product_id": payload.product_id, "count": 1, "grade": payload.grade})
 
     await db.commit()
-    await db.refresh(review)
+    forget_reviews(payload.product_id)
+    edge_cache.purge(reviews_key(payload.product_id))
     return review
 
 @router.delete("/{review_id}")
@@ -100,15 +124,15 @@ async def delete_review(review_id: int, db: AsyncSession = Depends(get_async_db)
     if not old_review.user_id == current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-
-    review = Review(
-        user_id = current_user.id,
-        product_id = old_review.product_id,
-        comment = old_review.comment,
-        grade = old_review.grade,
-        is_active = False
-    )
+    old_review.is_active = False
+    old_review.deactivated_at = utc_now()
+    await db.execute(delete(ReviewClaim).where(ReviewClaim.user_id == old_review.user_id,
+                                               ReviewClaim.product_id == old_review.product_id))
+    if old_review.grade is not None:
+        outbox.enqueue(db, "review.graded",
+                       {"product_id": old_review.product_id, "count": -1, "grade": -old_review.grade})
 
     await db.commit()
-    await db.refresh(review)
+    forget_reviews(old_review.product_id)
+    edge_cache.purge(reviews_key(old_review.product_id))
     return { "message": f"Review {review_id} deleted" }
@@ -1,15 +1,33 @@
+from datetime import timedelta
+
 import jwt
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.models.users import User as UserModel
-from app.config import SECRET_KEY, ALGORITHM
-from app.schemas.users import UserCreate, User as UserSchema
+from app.models.stats import SellerStats as SellerStatsModel
+from app.config import SECRET_KEY, ALGORITHM, REFRESH_REUSE_GRACE_SECONDS
+from app.schemas.users import UserCreate, User as UserSchema, SellerStats as SellerStatsSchema
 from app.schemas.tokens import RefreshTokenRequest
+from app.database import utc_now
 from app.db_depends import get_async_db
-from app.auth import hash_password, verify_password, create_access_token, create_refresh_token
+from app.statements import ACTIVE_USER_BY_EMAIL
+from app.auth import (
+    hash_password,
+    verify_password,
+    verify_dummy_password,
+    create_access_token,
+    create_refresh_token,
+    get_current_user,
+    get_token_payload,
+    new_token_id,
+    refresh_token_expiry,
+    successor_refresh_token,
+)
+from app.revocation import revocations
+from app.throttling import login_throttle
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -38,31 +56,60 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)
     return db_user
 
 
+@router.get("/me/stats", response_model=SellerStatsSchema)
+async def get_my_stats(
+    current_user: UserModel = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Возвращает предрасчитанную статистику текущего продавца.
+    Данные обновляются фоновой задачей app.jobs.stats, время пересчёта — в refreshed_at.
+    """
+    if current_user.role != "seller":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Only sellers can view seller stats")
+
+    stats = await db.get(SellerStatsModel, current_user.id)
+    if stats is None:
+        # Продавец появился после последнего пересчёта
+        return SellerStatsSchema(seller_id=current_user.id)
+    return stats
+
+
 @router.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(),
+                db: AsyncSession = Depends(get_async_db)):
     """
     Аутентифицирует пользователя и возвращает access_token и refresh_token.
+    Частые попытки по одному email или с одного IP отклоняются с 429 до проверки пароля.
     """
-    result = await db.scalars(
-        select(UserModel).where(UserModel.email == form_data.username, UserModel.is_active == True))
+    # За CDN адрес клиента из X-Forwarded-For подставляет app.proxies
+    client_ip = request.client.host if request.client else None
+    await login_throttle.check(form_data.username, client_ip)
+
+    result = await db.scalars(ACTIVE_USER_BY_EMAIL, {"email": form_data.username})
     user = result.first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if user is None:
+        verified = verify_dummy_password(form_data.password)
+    else:
+        verified = verify_password(form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.email, "role": user.role, "id": user.id})
-    refresh_token = create_refresh_token(data={"sub": user.email, "role": user.role, "id": user.id})
+    await login_throttle.succeeded(form_data.username)
+    # Оба токена входа относятся к одному семейству: выход отзывает их вместе
+    claims = {"sub": user.email, "role": user.role, "id": user.id, "fam": new_token_id()}
+    access_token = create_access_token(data=claims)
+    refresh_token = create_refresh_token(data=claims)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
-@router.post("/refresh-token")
-async def refresh_token(
-    body: RefreshTokenRequest,
-    db: AsyncSession = Depends(get_async_db),
-):
+
+def _decode_refresh_token(token: str) -> dict:
     """
-    Обновляет refresh-токен, принимая старый refresh-токен в теле запроса.
+    Проверяет подпись и срок refresh-токена и возвращает его payload.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -70,16 +117,8 @@ async def refresh_token(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    old_refresh_token = body.refresh_token
-
     try:
-        payload = jwt.decode(old_refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str | None = payload.get("sub")
-        token_type: str | None = payload.get("token_type")
-
-        if email is None or token_type != "refresh":
-            raise credentials_exception
-
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         # refresh-токен истёк
         raise credentials_exception
@@ -87,67 +126,88 @@ async def refresh_token(
         # подпись неверна или токен повреждён
         raise credentials_exception
 
-    # Проверяем, что пользователь существует и активен
-    result = await db.scalars(
-        select(UserModel).where(
-            UserModel.email == email,
-            UserModel.is_active == True
-        )
-    )
-    user = result.first()
-    if user is None:
+    # Токены, выпущенные до появления jti, отозвать нельзя — требуем новый вход
+    if (payload.get("sub") is None or payload.get("token_type") != "refresh"
+            or payload.get("jti") is None or payload.get("fam") is None):
         raise credentials_exception
+    if revocations.is_revoked({"fam": payload["fam"]}):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
 
-    # Генерируем новый refresh-токен
-    new_refresh_token = create_refresh_token(
-        data={"sub": user.email, "role": user.role, "id": user.id}
-    )
 
-    return {
-        "refresh_token": new_refresh_token,
-        "token_type": "bearer",
-    }
+def _token_claims(payload: dict) -> dict:
+    return {key: payload.get(key) for key in ("sub", "role", "id", "fam")}
 
-@router.post("/access-token")
-async def access_token(
+
+@router.post("/refresh-token")
+async def refresh_token(
     body: RefreshTokenRequest,
     db: AsyncSession = Depends(get_async_db),
 ):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate refresh token",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    try:
-        payload = jwt.decode(body.refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str | None = payload.get("sub")
-        token_type: str | None = payload.get("token_type")
+    """
+    Обновляет refresh-токен, принимая старый refresh-токен в теле запроса.
 
-        if email is None or token_type != "refresh":
-            raise credentials_exception
-    except jwt.ExpiredSignatureError:
-        raise credentials_exception
-    except jwt.PyJWTError:
-        raise credentials_exception
+    Каждый refresh-токен одноразовый: при обмене его jti отзывается. Повторное
+    предъявление в течение REFRESH_REUSE_GRACE_SECONDS после обмена (повтор
+    запроса, потерянный ответ) возвращает тот же новый токен. Более позднее
+    повторное предъявление означает, что токен утёк, — тогда отзывается всё
+    семейство, включая выданные по нему access-токены.
+    """
+    payload = _decode_refresh_token(body.refresh_token)
 
-    result = await db.scalars(
-        select(UserModel).where(
-            UserModel.email == email,
-            UserModel.is_active == True
+    # Вставка jti атомарна: из двух одновременных обменов одного токена первым будет один
+    rotated_at, first = await revocations.rotate(db, payload["jti"], payload["exp"])
+    if not first and utc_now() - rotated_at > timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS):
+        await revocations.revoke(db, payload["fam"], refresh_token_expiry())
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token reuse detected",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-    )
+    await db.commit()
 
-    user = result.first()
-    if user is None:
-        raise credentials_exception
+    # Неактивный пользователь не пройдёт get_current_user, поэтому пользователя не перечитываем
+    new_refresh_token = successor_refresh_token(payload, rotated_at)
 
-    new_access_token = create_access_token(
-        data={"sub": user.email, "role": user.role, "id": user.id}
-    )
+    return {
+        "refresh_token": new_refresh_token,
+        "token_type": "bearer",
+    }
+
+@router.post("/access-token")
+async def access_token(body: RefreshTokenRequest):
+    """
+    Выдаёт новый access-токен по действующему refresh-токену без обращения к базе.
+    """
+    payload = _decode_refresh_token(body.refresh_token)
+    if revocations.is_revoked(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    new_access_token = create_access_token(data=_token_claims(payload))
 
     return {
         "access_token": new_access_token,
-        "refresh_token": new_access_token,
+        "refresh_token": body.refresh_token,
         "token_type": "bearer",
     }
+
+
+@router.post("/logout")
+async def logout(payload: dict = Depends(get_token_payload), db: AsyncSession = Depends(get_async_db)):
+    """
+    Отзывает access- и refresh-токены текущего входа.
+    """
+    # У токенов, выпущенных до появления семейств, fam нет: они истекут сами
+    if payload.get("fam") is not None:
+        await revocations.revoke(db, payload["fam"], refresh_token_expiry())
+        await db.commit()
+    return {"status": "success", "message": "Logged out"}
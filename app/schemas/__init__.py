@@ -2,7 +2,7 @@ from .categories import Category, CategoryCreate
 from .products import Product, ProductCreate
 from .reviews import Review
 from .tokens import RefreshTokenRequest
-from .users import User, UserCreate
+from .users import User, UserCreate, SellerStats
 
 __all__ = [
     "Category",
@@ -13,4 +13,5 @@ __all__ = [
     "RefreshTokenRequest",
     "User",
     "UserCreate",
+    "SellerStats",
 ]
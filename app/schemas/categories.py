@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -20,5 +22,7 @@ class Category(BaseModel):
     name: str = Field(..., description="Название категории")
     parent_id: int | None = Field(None, description="ID родительской категории, если есть")
     is_active: bool = Field(..., description="Активность категории")
+    product_count: int | None = Field(None, description="Число активных товаров (из предрасчитанной статистики)")
+    stats_refreshed_at: datetime | None = Field(None, description="Время пересчёта product_count")
 
     model_config = ConfigDict(from_attributes=True)
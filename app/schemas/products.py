@@ -1,8 +1,26 @@
 from datetime import datetime
 from decimal import Decimal
+from enum import Enum
 
 from pydantic import BaseModel, Field, ConfigDict
 
+from app.schemas.reviews import Review
+
+
+class ProductSort(str, Enum):
+    """
+    Допустимые ключи сортировки списка товаров. Префикс "-" — по убыванию.
+    """
+    id = "id"
+    price = "price"
+    price_desc = "-price"
+    created_at = "created_at"
+    created_at_desc = "-created_at"
+    rating = "rating"
+    rating_desc = "-rating"
+    stock = "stock"
+    stock_desc = "-stock"
+
 
 class ProductCreate(BaseModel):
     """
@@ -33,6 +51,8 @@ class Product(BaseModel):
     category_id: int = Field(..., description="ID категории")
     is_active: bool = Field(..., description="Активность товара")
     rating: int | None = Field(None, description="Средний рейтинг по отзывам")
+    review_count: int = Field(0, description="Количество оценок в отзывах")
+    score: float | None = Field(None, description="Байесовская оценка товара для ранжирования")
     created_at: datetime | None = Field(None, description="Дата и время создания товара (UTC)")
     updated_at: datetime | None = Field(None, description="Дата и время последнего обновления товара (UTC)")
 
@@ -46,5 +66,70 @@ class ProductList(BaseModel):
     total: int = Field(ge=0, description="Общее количество товаров")
     page: int = Field(ge=1, description="Номер текущей страницы")
     page_size: int = Field(ge=1, description="Количество элементов на странице")
+    next_cursor: str | None = Field(None, description="Курсор следующей страницы для пагинации по ключу")
     
     model_config = ConfigDict(from_attributes=True)
+
+class ProductBatchRequest(BaseModel):
+    """
+    Модель запроса для пакетного получения товаров по списку ID.
+    Используется в POST /products/batch.
+    """
+    ids: list[int] = Field(..., min_length=1, max_length=100,
+                           description="Список ID товаров (1-100 элементов)")
+
+
+class ProductBatch(BaseModel):
+    """
+    Ответ пакетного получения товаров.
+    Товары идут в порядке запроса, отсутствующие ID перечислены отдельно.
+    """
+    items: list[Product] = Field(description="Найденные активные товары в порядке запроса")
+    missing: list[int] = Field(description="ID товаров, которые не найдены, неактивны "
+                                           "или относятся к неактивной категории")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProductTopList(BaseModel):
+    """
+    Страница рейтинга товаров с курсорной пагинацией.
+    """
+    items: list[Product] = Field(description="Товары, отсортированные по убыванию оценки")
+    next_cursor: str | None = Field(None, description="Курсор следующей страницы, если она есть")
+
+
+class ProductSuggestion(BaseModel):
+    """
+    Подсказка строки поиска: товар, название которого начинается с введённого текста.
+    """
+    id: int = Field(..., description="ID товара")
+    name: str = Field(..., description="Название товара")
+
+
+class CategoryRef(BaseModel):
+    """
+    Элемент пути категорий от корня к категории товара.
+    """
+    id: int = Field(..., description="ID категории")
+    name: str = Field(..., description="Название категории")
+
+
+class SellerSummary(BaseModel):
+    """
+    Краткие сведения о продавце для страницы товара.
+    """
+    id: int = Field(..., description="ID продавца")
+    product_count: int = Field(..., description="Количество активных товаров продавца")
+
+
+class ProductPage(BaseModel):
+    """
+    Все данные для страницы товара, собранные одним запросом.
+    """
+    product: Product = Field(description="Товар")
+    category_path: list[CategoryRef] = Field(description="Путь категорий от корня")
+    seller: SellerSummary = Field(description="Продавец")
+    review_count: int = Field(description="Количество оценок")
+    score: float = Field(description="Байесовская оценка товара")
+    reviews: list[Review] = Field(description="Последние отзывы")
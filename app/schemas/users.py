@@ -1,3 +1,6 @@
+from datetime import datetime
+from decimal import Decimal
+
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 
 
@@ -13,3 +16,18 @@ class User(BaseModel):
     is_active: bool
     role: str
     model_config = ConfigDict(from_attributes=True)
+
+
+class SellerStats(BaseModel):
+    """
+    Статистика продавца по активным товарам для GET /users/me/stats.
+    """
+    seller_id: int
+    product_count: int = Field(0, description="Количество активных товаров")
+    total_stock: int = Field(0, description="Суммарный остаток на складе")
+    stock_value: Decimal = Field(Decimal(0), description="Стоимость остатков по текущим ценам")
+    review_count: int = Field(0, description="Количество оценок товаров продавца")
+    avg_rating: float | None = Field(None, description="Средняя оценка, None без отзывов")
+    reviews_per_day: float = Field(0, description="Отзывов в день за последние SELLER_STATS_WINDOW_DAYS дней")
+    refreshed_at: datetime | None = Field(None, description="Время пересчёта статистики, None — ещё не считалась")
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,235 @@
+"""
+Многопроцессный запуск приложения для продакшена.
+
+Родительский процесс слушает порт (или, с SO_REUSEPORT, каждый воркер
+открывает свой сокет), запускает N воркеров uvicorn через fork и
+перезапускает завершившиеся. Воркер завершается сам после max_requests
+запросов (с разбросом jitter), чтобы не накапливать память.
+
+Остановка по SIGTERM: воркер сразу снимает готовность (/health/ready → 503),
+ещё SHUTDOWN_PRESTOP_SECONDS обслуживает запросы, пока балансировщик не
+исключит его, и только затем uvicorn закрывает сокет и ждёт начатые запросы
+не дольше SHUTDOWN_DRAIN_SECONDS. Повторный сигнал останавливает сразу.
+
+Пул соединений с базой делится между воркерами: при DB_CONNECTION_BUDGET > 0
+(по умолчанию 40) одно соединение остаётся блокировке фоновых задач
+(app.leader), остальные делятся поровну без переполнения, так что все
+процессы вместе не превышают лимит базы.
+
+Состояние, которое должно быть общим для воркеров, хранится в базе: ответы
+Idempotency-Key (app.idempotency) и счётчики попыток входа (app.throttling).
+Режимы IDEMPOTENCY_BACKEND=memory и LOGIN_THROTTLE_BACKEND=memory годятся
+только для --workers 1.
+
+    python -m app.server --workers 4 --max-requests 10000 --preload
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import time
+
+import uvicorn
+
+from app import config
+
+
+logger = logging.getLogger(__name__)
+
+APP = "app.main:app"
+
+
+def default_workers() -> int:
+    """
+    Число доступных процессу ядер (с учётом привязки к CPU).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def size_pools(workers: int, budget: int = config.DB_CONNECTION_BUDGET) -> tuple[int, int]:
+    """
+    Размер пула и переполнения на воркер. Значения записываются в app.config
+    и окружение до импорта app.database, поэтому их видят все воркеры.
+    """
+    if budget <= 0:
+        return config.DB_POOL_SIZE, config.DB_MAX_OVERFLOW
+    # Одно соединение держит лидер фоновых задач
+    budget -= 1
+    pool_size = max(1, budget // workers)
+    if pool_size * workers > budget:
+        logger.warning("DB_CONNECTION_BUDGET=%s is less than the number of workers (%s)", budget, workers)
+    config.DB_POOL_SIZE, config.DB_MAX_OVERFLOW = pool_size, 0
+    os.environ["DB_POOL_SIZE"], os.environ["DB_MAX_OVERFLOW"] = str(pool_size), "0"
+    return pool_size, 0
+
+
+def _bind(host: str, port: int, reuseport: bool) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuseport:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class GracefulServer(uvicorn.Server):
+    """
+    uvicorn.Server, который по сигналу остановки сначала снимает готовность
+    и выдерживает паузу prestop, а затем запускает обычную остановку uvicorn.
+    """
+
+    def __init__(self, server_config: uvicorn.Config, prestop: float = config.SHUTDOWN_PRESTOP_SECONDS):
+        super().__init__(server_config)
+        self.prestop = prestop
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._prestop_timer: asyncio.TimerHandle | None = None
+
+    async def serve(self, sockets=None) -> None:
+        self._loop = asyncio.get_running_loop()
+        await super().serve(sockets)
+
+    def handle_exit(self, sig, frame) -> None:
+        # Вызывается из обработчика signal.signal, поэтому работа переносится в цикл событий
+        if self._loop is None:
+            super().handle_exit(sig, frame)
+            return
+        self._loop.call_soon_threadsafe(self._begin_exit, sig, frame)
+
+    def _begin_exit(self, sig, frame) -> None:
+        if self._prestop_timer is not None:
+            # Повторный сигнал: останавливаемся, не дожидаясь конца паузы
+            self._prestop_timer.cancel()
+        elif self.prestop > 0 and not self.should_exit:
+            # Модуль уже загружен вместе с приложением
+            from app.lifecycle import lifecycle
+
+            lifecycle.begin_shutdown()
+            logger.info("Readiness withdrawn, stopping in %ss", self.prestop)
+            self._prestop_timer = self._loop.call_later(self.prestop, super().handle_exit, sig, frame)
+            return
+        super().handle_exit(sig, frame)
+
+
+def _serve(app, sock: socket.socket | None, host: str, port: int, max_requests: int) -> None:
+    """
+    Тело воркера: один uvicorn.Server на унаследованном или собственном сокете.
+    """
+    if sock is None:
+        sock = _bind(host, port, reuseport=True)
+    server_config = uvicorn.Config(
+        app,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        lifespan="on",
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=config.SHUTDOWN_DRAIN_SECONDS,
+        # X-Forwarded-For разбирает app.proxies по TRUSTED_PROXIES
+        proxy_headers=False,
+        # Логирование настраивает lifespan приложения (app.logs)
+        log_config=None,
+        access_log=False,
+    )
+    GracefulServer(server_config).run(sockets=[sock])
+
+
+class Supervisor:
+    """
+    Запускает воркеры через fork и поддерживает их число до остановки.
+    """
+
+    def __init__(self, workers: int, host: str, port: int, reuseport: bool, preload: bool,
+                 max_requests: int, max_requests_jitter: int):
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.reuseport = reuseport
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.stopping = False
+        self._context = multiprocessing.get_context("fork")
+        self._processes: list[multiprocessing.Process] = []
+        # Предзагрузка: приложение импортируется один раз, воркеры получают его копией при fork
+        self.app = importlib.import_module("app.main").app if preload else APP
+        # Без SO_REUSEPORT все воркеры принимают соединения с одного сокета родителя
+        self.sock = None if reuseport else _bind(host, port, reuseport=False)
+
+    def _spawn(self) -> multiprocessing.Process:
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            # Разброс, чтобы воркеры не перезапускались одновременно
+            max_requests += random.randint(0, self.max_requests_jitter)
+        process = self._context.Process(
+            target=_serve,
+            args=(self.app, self.sock, self.host, self.port, max_requests),
+            daemon=False,
+        )
+        process.start()
+        return process
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        self._processes = [self._spawn() for _ in range(self.workers)]
+
+        while not self.stopping:
+            time.sleep(0.5)
+            for index, process in enumerate(self._processes):
+                if not process.is_alive() and not self.stopping:
+                    logger.info("Worker %s exited with code %s, restarting", process.pid, process.exitcode)
+                    self._processes[index] = self._spawn()
+
+        # Воркеры сами выдерживают паузу и дожидаются начатых запросов (GracefulServer)
+        for process in self._processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + config.SHUTDOWN_PRESTOP_SECONDS + config.SHUTDOWN_DRAIN_SECONDS + 5
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Запуск API в нескольких процессах")
+    parser.add_argument("--host", default=config.WEB_HOST)
+    parser.add_argument("--port", type=int, default=config.WEB_PORT)
+    parser.add_argument("--workers", type=int, default=config.WEB_WORKERS,
+                        help="Число воркеров; 0 — по числу доступных ядер")
+    parser.add_argument("--max-requests", type=int, default=config.WEB_MAX_REQUESTS,
+                        help="Перезапуск воркера после стольких запросов; 0 — без перезапуска")
+    parser.add_argument("--max-requests-jitter", type=int, default=config.WEB_MAX_REQUESTS_JITTER)
+    parser.add_argument("--reuseport", action=argparse.BooleanOptionalAction, default=config.WEB_REUSEPORT,
+                        help="Свой сокет с SO_REUSEPORT у каждого воркера")
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=config.WEB_PRELOAD,
+                        help="Импортировать приложение до fork")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=config.LOG_LEVEL)
+    workers = args.workers or default_workers()
+    if workers > 1:
+        for setting in ("IDEMPOTENCY_BACKEND", "LOGIN_THROTTLE_BACKEND"):
+            if getattr(config, setting) == "memory" and not (
+                    setting == "LOGIN_THROTTLE_BACKEND" and config.LOGIN_THROTTLE_REDIS_URL):
+                logger.warning("%s=memory is per process and is not shared by %s workers", setting, workers)
+    pool_size, max_overflow = size_pools(workers)
+    logger.info("Starting %s workers on %s:%s (pool %s+%s per worker)",
+                workers, args.host, args.port, pool_size, max_overflow)
+
+    Supervisor(workers, args.host, args.port, args.reuseport, args.preload,
+               args.max_requests, args.max_requests_jitter).run()
+
+
+if __name__ == "__main__":
+    main()
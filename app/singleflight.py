@@ -0,0 +1,110 @@
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from time import monotonic
+from typing import Any
+
+from app.config import SINGLEFLIGHT_CACHE_MAX_ENTRIES, SINGLEFLIGHT_CACHE_TTL
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные одинаковые чтения в один запрос к базе.
+
+    Первый вызов с ключом выполняет запрос, остальные ждут его результат.
+    При ttl > 0 результат дополнительно хранится в микрокэше — LRU не больше
+    max_entries ключей; истёкшие записи удаляются при обращении.
+
+    forget() действует только в текущем процессе. Запрос, начатый до forget(),
+    мог прочитать старые данные: его результат получат уже ждущие его вызовы,
+    но в кэш он не попадёт, а новые вызовы выполнят запрос заново.
+    """
+
+    def __init__(self, ttl: float = 0.0, max_entries: int = SINGLEFLIGHT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._cache: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._stats = {"executed": 0, "coalesced": 0, "cache_hits": 0, "evicted": 0}
+
+    def _cached(self, key: Hashable) -> tuple[float, Any] | None:
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        if cached[0] <= monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return cached
+
+    def _store(self, key: Hashable, result: Any) -> None:
+        self._cache[key] = (monotonic() + self.ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self._stats["evicted"] += 1
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            if self.ttl:
+                cached = self._cached(key)
+                if cached is not None:
+                    self._stats["cache_hits"] += 1
+                    return cached[1]
+
+            future = self._inflight.get(key)
+            if future is None:
+                break
+
+            self._stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Отменён ведущий запрос, а не текущий — пробуем снова
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._stats["executed"] += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Помечаем исключение как прочитанное, если ожидающих нет
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            # После forget() ключ уже не указывает на этот запрос — результат мог устареть
+            if self.ttl and self._inflight.get(key) is future:
+                self._store(key, result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def forget(self, *keys: Hashable) -> None:
+        """
+        Сбрасывает микрокэш для ключей после записи. Выполняющиеся запросы
+        по этим ключам отвязываются: их результат не кэшируется.
+        """
+        for key in keys:
+            self._cache.pop(key, None)
+            self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Сбрасывает весь микрокэш и отвязывает выполняющиеся запросы.
+        """
+        self._cache.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        return {**self._stats, "inflight": len(self._inflight), "cached": len(self._cache)}
+
+
+reads = SingleFlight(ttl=SINGLEFLIGHT_CACHE_TTL)
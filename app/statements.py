@@ -0,0 +1,235 @@
+"""
+Заранее построенные параметризованные запросы для горячих путей.
+
+Конструкции select(...) создаются один раз, значения передаются через bindparam,
+поэтому на запрос не тратится время на построение выражений, а ключ кэша
+скомпилированных запросов SQLAlchemy всегда один и тот же.
+"""
+from functools import lru_cache
+
+from sqlalchemy import JSON, Date, Integer, bindparam, event, func, and_, select, text, tuple_
+from sqlalchemy.engine import default
+
+from app.database import async_engine
+from app.models import Category as CategoryModel, Product as ProductModel, Review as ReviewModel
+from app.models.stats import CategoryStats as CategoryStatsModel
+from app.models.users import User as UserModel
+from app.schemas.products import ProductSort
+
+
+ACTIVE_USER_BY_EMAIL = select(UserModel).where(UserModel.email == bindparam("email"),
+                                               UserModel.is_active == True)
+
+ACTIVE_PRODUCT_BY_ID = select(ProductModel).where(ProductModel.id == bindparam("product_id"),
+                                                  ProductModel.is_active == True)
+
+PRODUCT_BY_ID = select(ProductModel).where(ProductModel.id == bindparam("product_id"))
+
+ACTIVE_CATEGORY_ID = select(CategoryModel.id).where(CategoryModel.id == bindparam("category_id"),
+                                                    CategoryModel.is_active == True)
+
+ACTIVE_CATEGORIES_WITH_STATS = (
+    select(CategoryModel, CategoryStatsModel.product_count, CategoryStatsModel.refreshed_at)
+    .outerjoin(CategoryStatsModel, CategoryStatsModel.category_id == CategoryModel.id)
+    .where(CategoryModel.is_active == True)
+)
+
+ACTIVE_REVIEWS_BY_PRODUCT = select(ReviewModel).where(ReviewModel.is_active == True,
+                                                      ReviewModel.product_id == bindparam("product_id"))
+
+
+# Цепочка предков категории, включая её саму; по ней PUT /categories/ проверяет циклы
+CATEGORY_ANCESTOR_IDS = text("""
+    WITH RECURSIVE ancestors AS (
+        SELECT id, parent_id FROM categories WHERE id = :category_id
+        UNION ALL
+        SELECT c.id, c.parent_id
+        FROM categories AS c
+        JOIN ancestors ON c.id = ancestors.parent_id
+    ) CYCLE id SET is_cycle USING visited
+    SELECT id FROM ancestors WHERE NOT is_cycle
+""").columns(id=Integer)
+
+
+# Страница товара одним запросом: товар, путь категорий, продавец и последние отзывы.
+# category_active = false соответствует ответу 400 в GET /products/{id}.
+# CYCLE останавливает обход, если в дереве категорий всё же окажется цикл
+PRODUCT_PAGE = text("""
+    WITH RECURSIVE path AS (
+        SELECT c.id, c.name, c.parent_id, 0 AS depth
+        FROM categories AS c
+        JOIN products AS p ON p.category_id = c.id
+        WHERE p.id = :product_id
+        UNION ALL
+        SELECT c.id, c.name, c.parent_id, path.depth + 1
+        FROM categories AS c
+        JOIN path ON c.id = path.parent_id
+    ) CYCLE id SET is_cycle USING visited
+    SELECT json_build_object(
+        'category_active', c.is_active,
+        'product', to_json(p),
+        'category_path', (
+            SELECT json_agg(json_build_object('id', path.id, 'name', path.name) ORDER BY path.depth DESC)
+            FROM path
+            WHERE NOT path.is_cycle
+        ),
+        'seller', json_build_object(
+            'id', p.seller_id,
+            'product_count', (
+                SELECT count(*) FROM products AS sp WHERE sp.seller_id = p.seller_id AND sp.is_active
+            )
+        ),
+        'review_count', p.review_count,
+        'score', p.score,
+        'reviews', (
+            SELECT coalesce(json_agg(r ORDER BY r.comment_date DESC, r.id DESC), '[]'::json)
+            FROM (
+                SELECT id, user_id, product_id, comment, comment_date, grade
+                FROM reviews
+                WHERE product_id = p.id AND is_active
+                ORDER BY comment_date DESC, id DESC
+                LIMIT :reviews_limit
+            ) AS r
+        )
+    ) AS page
+    FROM products AS p
+    JOIN categories AS c ON c.id = p.category_id
+    WHERE p.id = :product_id AND p.is_active
+""").columns(page=JSON)
+
+
+# Ключ сортировки -> (колонка, по убыванию). Для каждой колонки, кроме id, есть
+# частичные индексы (колонка, id) и (category_id, колонка, id) по активным товарам.
+SORT_KEYS = {
+    ProductSort.id: (ProductModel.id, False),
+    ProductSort.price: (ProductModel.price, False),
+    ProductSort.price_desc: (ProductModel.price, True),
+    ProductSort.created_at: (ProductModel.created_at, False),
+    ProductSort.created_at_desc: (ProductModel.created_at, True),
+    ProductSort.rating: (ProductModel.score, False),
+    ProductSort.rating_desc: (ProductModel.score, True),
+    ProductSort.stock: (ProductModel.stock, False),
+    ProductSort.stock_desc: (ProductModel.stock, True),
+}
+
+# Фильтры GET /products/; имя фильтра совпадает с именем его параметра
+PRODUCT_FILTERS = {
+    "category_id": lambda: ProductModel.category_id == bindparam("category_id"),
+    "min_price": lambda: ProductModel.price >= bindparam("min_price"),
+    "max_price": lambda: ProductModel.price <= bindparam("max_price"),
+    "in_stock": lambda: ProductModel.stock > 0,
+    "out_of_stock": lambda: ProductModel.stock == 0,
+    "seller_id": lambda: ProductModel.seller_id == bindparam("seller_id"),
+    "created_at": lambda: func.date(ProductModel.created_at) == bindparam("created_at", type_=Date),
+    "updated_at": lambda: func.date(ProductModel.updated_at) == bindparam("updated_at", type_=Date),
+}
+
+
+def _nullable(column) -> bool:
+    return column is not ProductModel.id and ProductModel.__table__.c[column.key].nullable
+
+
+def seek_segments(column, descending: bool, last_value) -> list[str]:
+    """
+    Режимы seek для продолжения страницы после (last_value, last_id), по порядку.
+
+    Строки с NULL в колонке сортировки PostgreSQL ставит в конец при ASC и в начало
+    при DESC. Условие «после ключа» с OR ... IS NULL не читается по индексу
+    (колонка, id), поэтому хвост из NULL выбирается отдельным запросом: роутер
+    выполняет запросы по очереди, пока не наберёт страницу.
+    """
+    if not _nullable(column):
+        return ["after"]
+    if descending:
+        return ["after"] if last_value is not None else ["after_null", "not_null"]
+    return ["after", "nulls"] if last_value is not None else ["after_null"]
+
+
+def _seek_filter(column, descending: bool, seek: str):
+    """
+    Условие для режима seek; каждое читается диапазоном индекса (колонка, id).
+
+    "after" — строки после (:last_value, :last_id) с непустым значением,
+    "after_null" — строки с NULL после :last_id, "nulls" и "not_null" — все строки
+    с NULL или без него.
+    """
+    last_id = bindparam("last_id", type_=Integer)
+    if column is ProductModel.id:
+        return ProductModel.id < last_id if descending else ProductModel.id > last_id
+
+    if seek == "nulls":
+        return column.is_(None)
+    if seek == "not_null":
+        return column.isnot(None)
+    if seek == "after_null":
+        return and_(column.is_(None), ProductModel.id < last_id if descending else ProductModel.id > last_id)
+
+    # Сравнение строк с NULL даёт NULL, поэтому строки с NULL сюда не попадают
+    key = tuple_(column, ProductModel.id)
+    last_key = tuple_(bindparam("last_value", type_=column.type), last_id)
+    return key < last_key if descending else key > last_key
+
+
+def _product_filters(filter_names: tuple[str, ...]) -> list:
+    return [ProductModel.is_active == True, *(PRODUCT_FILTERS[name]() for name in filter_names)]
+
+
+@lru_cache(maxsize=256)
+def product_count_statement(filter_names: tuple[str, ...]):
+    """
+    Запрос количества товаров для отсортированного набора имён фильтров.
+    """
+    return select(func.count()).select_from(ProductModel).where(*_product_filters(filter_names))
+
+
+@lru_cache(maxsize=1024)
+def product_list_statement(filter_names: tuple[str, ...], sort: ProductSort, seek: str | None):
+    """
+    Запрос страницы товаров.
+
+    seek: None — пагинация через :offset, иначе режим из seek_segments().
+    Размер страницы — :limit.
+    """
+    column, descending = SORT_KEYS[sort]
+    if column is ProductModel.id:
+        order_by = [ProductModel.id.desc() if descending else ProductModel.id]
+    else:
+        order_by = [column.desc(), ProductModel.id.desc()] if descending else [column, ProductModel.id]
+
+    stmt = (
+        select(ProductModel)
+        .where(*_product_filters(filter_names))
+        .order_by(*order_by)
+        .limit(bindparam("limit", type_=Integer))
+    )
+    if seek is None:
+        return stmt.offset(bindparam("offset", type_=Integer))
+    return stmt.where(_seek_filter(column, descending, seek))
+
+
+_compiled_cache_stats = {"hits": 0, "misses": 0, "uncached": 0}
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count_compiled_cache(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+    if context.cache_hit == default.CACHE_HIT:
+        _compiled_cache_stats["hits"] += 1
+    elif context.cache_hit == default.CACHE_MISS:
+        _compiled_cache_stats["misses"] += 1
+    else:
+        _compiled_cache_stats["uncached"] += 1
+
+
+def stats() -> dict:
+    count_info = product_count_statement.cache_info()
+    list_info = product_list_statement.cache_info()
+    return {
+        "compiled_cache": dict(_compiled_cache_stats),
+        "product_statements": {
+            "hits": count_info.hits + list_info.hits,
+            "misses": count_info.misses + list_info.misses,
+            "size": count_info.currsize + list_info.currsize,
+        },
+    }
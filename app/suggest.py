@@ -0,0 +1,285 @@
+"""
+Подсказки по началу названия товара для строки поиска: GET /products/suggest?q=.
+
+Названия активных товаров лежат в памяти процесса в отсортированном массиве
+нормализованных ключей (casefold, схлопнутые пробелы, первые SUGGEST_KEY_LENGTH
+символов). Товары с общим префиксом занимают непрерывный диапазон, который
+находится двумя bisect. Короткие диапазоны ранжируются по оценке на лету,
+для «тяжёлых» префиксов (длиннее SUGGEST_SCAN_LIMIT — обычно первые буквы)
+лучшие товары посчитаны заранее. Индекс строится при старте, обработчики
+записи товаров обновляют его сразу, изменения из других воркеров
+дочитываются по products.updated_at, как в снимке каталога.
+"""
+import asyncio
+import heapq
+import logging
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+from sqlalchemy import select
+
+from app.catalog_snapshot import REFRESH_OVERLAP
+from app.config import (
+    SUGGEST_KEY_LENGTH,
+    SUGGEST_MAX_NAMES,
+    SUGGEST_REFRESH_SECONDS,
+    SUGGEST_SCAN_LIMIT,
+    SUGGEST_TOP_K,
+)
+from app.database import async_session_maker
+from app.models import Product as ProductModel
+
+
+logger = logging.getLogger(__name__)
+
+# Больше любого символа: ключи с префиксом p лежат в [p, p + MAX_CHAR)
+MAX_CHAR = "\U0010ffff"
+
+SUGGEST_COLUMNS = (
+    ProductModel.id,
+    ProductModel.name,
+    ProductModel.score,
+    ProductModel.is_active,
+    ProductModel.updated_at,
+)
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class SuggestIndex:
+    """
+    Отсортированные ключи названий с параллельными массивами ID, оценок и названий.
+
+    Для тяжёлого префикса хранится список (оценка, ID, название) по убыванию
+    оценки — точные лучшие товары диапазона, от top_k до 2 * top_k штук.
+    Удаление из списка не требует пересчёта, пока в нём остаётся top_k записей.
+    """
+
+    def __init__(
+            self,
+            max_names: int = SUGGEST_MAX_NAMES,
+            key_length: int = SUGGEST_KEY_LENGTH,
+            top_k: int = SUGGEST_TOP_K,
+            scan_limit: int = SUGGEST_SCAN_LIMIT,
+    ):
+        self.max_names = max_names
+        self.key_length = key_length
+        self.top_k = top_k
+        self.scan_limit = scan_limit
+        self.ready = False
+        self._watermark = None
+        self._stats = {"queries": 0, "dropped": 0}
+        self._reset()
+
+    def _reset(self) -> None:
+        self._keys: list[str] = []
+        self._ids = array("q")
+        self._scores = array("d")
+        self._names: list[str] = []
+        self._key_by_id: dict[int, str] = {}
+        self._top: dict[str, list[tuple[float, int, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def nbytes(self) -> int:
+        """
+        Примерный объём индекса в памяти: массивы, строки ключей и названий, словарь ID.
+        """
+        total = sum(sys.getsizeof(column) for column in (self._keys, self._ids, self._scores, self._names))
+        total += sum(sys.getsizeof(key) for key in self._keys) + sum(sys.getsizeof(name) for name in self._names)
+        total += sys.getsizeof(self._key_by_id)
+        total += sum(sys.getsizeof(top) + sys.getsizeof(prefix) for prefix, top in self._top.items())
+        return total
+
+    def _key(self, name: str) -> str:
+        return normalize(name)[:self.key_length]
+
+    def _range(self, prefix: str) -> range:
+        lo = bisect_left(self._keys, prefix)
+        return range(lo, bisect_left(self._keys, prefix + MAX_CHAR, lo))
+
+    def _rank(self, positions, limit: int) -> list[tuple[float, int, str]]:
+        best = heapq.nlargest(limit, positions, key=self._scores.__getitem__)
+        return [(self._scores[pos], self._ids[pos], self._names[pos]) for pos in best]
+
+    def _heavy_prefixes(self, key: str):
+        # Префикс тяжёлого префикса тоже тяжёлый, поэтому первый промах завершает обход
+        for length in range(1, len(key) + 1):
+            prefix = key[:length]
+            if prefix not in self._top:
+                return
+            yield prefix
+
+    def _build_top(self) -> None:
+        keys = self._keys
+        self._top = {}
+        stack = [("", 0, len(keys))]
+        while stack:
+            prefix, lo, hi = stack.pop()
+            depth = len(prefix)
+            if prefix:
+                self._top[prefix] = self._rank(range(lo, hi), 2 * self.top_k)
+            pos = lo
+            while pos < hi:
+                key = keys[pos]
+                if len(key) == depth:
+                    pos += 1
+                    continue
+                child = key[:depth + 1]
+                end = bisect_left(keys, child + MAX_CHAR, pos, hi)
+                if end - pos > self.scan_limit:
+                    stack.append((child, pos, end))
+                pos = end
+
+    def _advance_watermark(self, rows) -> None:
+        stamps = [row.updated_at for row in rows if row.updated_at is not None]
+        if stamps:
+            latest = max(stamps)
+            if self._watermark is None or latest > self._watermark:
+                self._watermark = latest
+
+    def load(self, rows) -> None:
+        """
+        Полностью перестраивает индекс по строкам (id, name, score, is_active, updated_at).
+        Сверх max_names остаются товары с наибольшей оценкой.
+        """
+        active = [row for row in rows if row.is_active]
+        if len(active) > self.max_names:
+            self._stats["dropped"] += len(active) - self.max_names
+            active = heapq.nlargest(self.max_names, active, key=lambda row: row.score)
+        entries = sorted((self._key(row.name), row.id, row.score, row.name) for row in active)
+
+        self._reset()
+        self._keys = [entry[0] for entry in entries]
+        self._ids = array("q", (entry[1] for entry in entries))
+        self._scores = array("d", (entry[2] for entry in entries))
+        self._names = [entry[3] for entry in entries]
+        self._key_by_id = dict(zip(self._ids, self._keys))
+        self._build_top()
+        self._advance_watermark(rows)
+        self.ready = True
+
+    def _position(self, product_id: int, key: str) -> int:
+        pos = bisect_left(self._keys, key)
+        while self._ids[pos] != product_id:
+            pos += 1
+        return pos
+
+    def _remove(self, product_id: int) -> None:
+        key = self._key_by_id.pop(product_id, None)
+        if key is None:
+            return
+        pos = self._position(product_id, key)
+        del self._keys[pos], self._ids[pos], self._scores[pos], self._names[pos]
+
+        for prefix in self._heavy_prefixes(key):
+            top = self._top[prefix]
+            kept = [entry for entry in top if entry[1] != product_id]
+            if len(kept) < self.top_k:
+                kept = self._rank(self._range(prefix), 2 * self.top_k)
+            self._top[prefix] = kept
+
+    def _insert(self, product_id: int, name: str, score: float) -> None:
+        if len(self._ids) >= self.max_names:
+            self._stats["dropped"] += 1
+            return
+        key = self._key(name)
+        pos = bisect_right(self._keys, key)
+        self._keys.insert(pos, key)
+        self._ids.insert(pos, product_id)
+        self._scores.insert(pos, score)
+        self._names.insert(pos, name)
+        self._key_by_id[product_id] = key
+
+        for prefix in self._heavy_prefixes(key):
+            top = self._top[prefix]
+            # Список точен только для своих записей: товар хуже последней в него не входит
+            if len(top) < self.top_k or score > top[-1][0]:
+                top.append((score, product_id, name))
+                top.sort(key=itemgetter(0), reverse=True)
+                del top[2 * self.top_k:]
+
+    def upsert(self, product_id: int, name: str, score: float, is_active: bool = True) -> None:
+        """
+        Добавляет, обновляет или (для неактивного) убирает товар из индекса.
+        """
+        key = self._key_by_id.get(product_id)
+        if key is not None and is_active and key == self._key(name):
+            pos = self._position(product_id, key)
+            if self._scores[pos] == score and self._names[pos] == name:
+                return
+        self._remove(product_id)
+        if is_active:
+            self._insert(product_id, name, score)
+
+    def remove(self, product_id: int) -> None:
+        self._remove(product_id)
+
+    def clear(self) -> None:
+        """
+        Очищает индекс; следующий refresh() построит его заново.
+        """
+        self._reset()
+        self._watermark = None
+        self.ready = False
+
+    async def refresh(self) -> int:
+        async with async_session_maker() as db:
+            if not self.ready:
+                rows = (await db.execute(select(*SUGGEST_COLUMNS).where(ProductModel.is_active == True))).all()
+                self.load(rows)
+                return len(rows)
+
+            stmt = select(*SUGGEST_COLUMNS).where(ProductModel.updated_at.isnot(None))
+            if self._watermark is not None:
+                stmt = stmt.where(ProductModel.updated_at >= self._watermark - REFRESH_OVERLAP)
+            rows = (await db.execute(stmt)).all()
+
+        for row in rows:
+            self.upsert(row.id, row.name, row.score, row.is_active)
+        self._advance_watermark(rows)
+        return len(rows)
+
+    async def run(self, interval: float = SUGGEST_REFRESH_SECONDS) -> None:
+        """
+        Фоновый цикл дочитывания изменений товаров.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Suggest index refresh failed")
+
+    def suggest(self, query: str, limit: int = 10) -> list[dict]:
+        """
+        До limit (не больше top_k) товаров, название которых начинается с query,
+        по убыванию оценки.
+        """
+        needle = normalize(query)
+        if not needle:
+            return []
+        self._stats["queries"] += 1
+
+        prefix = needle[:self.key_length]
+        top = self._top.get(prefix)
+        if top is not None and len(needle) <= self.key_length:
+            best = top[:limit]
+        else:
+            positions = self._range(prefix)
+            if len(needle) > self.key_length:
+                # Ключ хранит только начало названия, остаток сверяется по полному
+                positions = [pos for pos in positions if normalize(self._names[pos]).startswith(needle)]
+            best = self._rank(positions, limit)
+        return [{"id": product_id, "name": name} for _, product_id, name in best]
+
+    def stats(self) -> dict:
+        return {"names": len(self), "heavy_prefixes": len(self._top), **self._stats}
+
+
+suggestions = SuggestIndex()
@@ -0,0 +1,169 @@
+"""
+Изолированная база для тестов эндпоинтов.
+
+Схема создаётся один раз на процесс из Base.metadata в отдельной базе
+(для pytest-xdist — своя база на каждого воркера). Каждый тест получает
+сессию внутри внешней транзакции соединения: commit() в обработчиках
+фиксирует только SAVEPOINT, а в конце теста внешняя транзакция
+откатывается. Пересоздавать схему или чистить таблицы между тестами не нужно.
+
+SQLite (aiosqlite) не подходит: запросы используют секционированную таблицу
+reviews, INSERT ... ON CONFLICT диалекта PostgreSQL и json_build_object.
+
+Пример для pytest и httpx:
+
+    harness = RollbackHarness(await create_test_engine(worker_database_url(URL)))
+
+    async with harness.override(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            ...
+
+События outbox остаются в транзакции теста; обработать их можно вызовом
+await outbox.process_batch(session) с сессией из override().
+
+Сбросы кэша CDN можно проверять, подставив edge_cache.purger = FakePurger()
+и вызвав await edge_cache.flush() после запроса.
+
+Конкурентные запросы на одной сессии выполнялись бы по очереди; для них
+committed_sessions(engine, app) выдаёт каждому запросу своё соединение
+с настоящими commit() и очищает таблицы на выходе.
+
+Обход get_async_db (фоновые задачи, снимок каталога, синхронизация отзывов
+токенов) работает с основным движком и в откат не попадает.
+"""
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import app.models  # noqa: F401  регистрирует все таблицы в Base.metadata
+from app.database import Base
+from app.db_depends import get_async_db
+from app.edge_cache import FakePurger, edge_cache
+from app.idempotency import IdempotencyStore, idempotency_store
+from app.jobs.partitions import ensure_review_partitions
+from app.lookups import page_cache
+from app.revocation import revocations
+from app.singleflight import reads
+from app.suggest import suggestions
+from app.throttling import MemoryBackend, login_throttle
+
+
+def worker_database_url(url: str, worker_id: str | None = None) -> str:
+    """
+    URL отдельной базы для процесса тестов: shop_test -> shop_test_gw0 под pytest-xdist.
+    """
+    worker_id = worker_id or os.getenv("PYTEST_XDIST_WORKER")
+    parsed = make_url(url)
+    if worker_id:
+        parsed = parsed.set(database=f"{parsed.database}_{worker_id}")
+    return parsed.render_as_string(hide_password=False)
+
+
+async def create_test_engine(url: str, recreate: bool = True) -> AsyncEngine:
+    """
+    Создаёт базу (если её нет) и схему из моделей. Возвращает движок для RollbackHarness.
+    """
+    parsed = make_url(url)
+    # CREATE DATABASE нельзя выполнить в транзакции и в самой создаваемой базе
+    admin = create_async_engine(parsed.set(database="postgres"), poolclass=NullPool,
+                                isolation_level="AUTOCOMMIT")
+    async with admin.connect() as connection:
+        exists = await connection.scalar(text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                                         {"name": parsed.database})
+        if not exists:
+            await connection.execute(text(f'CREATE DATABASE "{parsed.database}"'))
+    await admin.dispose()
+
+    engine = create_async_engine(url)
+    async with engine.begin() as connection:
+        if recreate:
+            await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    await ensure_review_partitions(engine=engine)
+    return engine
+
+
+def reset_process_state() -> None:
+    """
+    Сбрасывает кэши и счётчики в памяти процесса, чтобы тесты не видели данных
+    друг друга, уже откатанных в базе.
+    """
+    reads.clear()
+    page_cache.clear()
+    if isinstance(idempotency_store, IdempotencyStore):
+        idempotency_store.clear()
+    revocations.clear()
+    suggestions.clear()
+    edge_cache.clear()
+    if isinstance(edge_cache.purger, FakePurger):
+        edge_cache.purger.clear()
+    if isinstance(login_throttle.backend, MemoryBackend):
+        login_throttle.backend.clear()
+
+
+class RollbackHarness:
+    """
+    Сессии с откатом всех изменений теста, включая зафиксированные через commit().
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        async with self.engine.connect() as connection:
+            transaction = await connection.begin()
+            session = AsyncSession(
+                bind=connection,
+                expire_on_commit=False,
+                join_transaction_mode="create_savepoint",
+            )
+            try:
+                yield session
+            finally:
+                await session.close()
+                await transaction.rollback()
+
+    @asynccontextmanager
+    async def override(self, app) -> AsyncIterator[AsyncSession]:
+        """
+        Подменяет get_async_db в приложении на сессию теста на время блока.
+        """
+        async with self.session() as session:
+            async def get_test_db():
+                yield session
+
+            app.dependency_overrides[get_async_db] = get_test_db
+            try:
+                yield session
+            finally:
+                app.dependency_overrides.pop(get_async_db, None)
+                reset_process_state()
+
+
+@asynccontextmanager
+async def committed_sessions(engine: AsyncEngine, app) -> AsyncIterator[async_sessionmaker]:
+    """
+    Подменяет get_async_db на независимые сессии engine без отката. На выходе
+    очищает все таблицы. Возвращает фабрику сессий для подготовки данных.
+    """
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_test_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = get_test_db
+    try:
+        yield session_maker
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+        reset_process_state()
+        tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+        async with engine.begin() as connection:
+            await connection.execute(text(f"TRUNCATE {tables} CASCADE"))
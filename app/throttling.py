@@ -0,0 +1,225 @@
+"""
+Ограничение частоты попыток входа.
+
+Попытки считаются в скользящем окне отдельно по email и по IP клиента.
+Проверка выполняется до поиска пользователя и проверки bcrypt, поэтому перебор
+паролей отклоняется с 429 почти бесплатно.
+
+Счётчики должны быть общими для всех воркеров (python -m app.server), иначе
+лимит фактически умножается на их число. По умолчанию они хранятся в таблице
+login_attempts (LOGIN_THROTTLE_BACKEND=postgres). Если задан
+LOGIN_THROTTLE_REDIS_URL, счётчики хранятся в Redis (нужен пакет redis):
+
+    docker run --rm -p 6379:6379 redis
+    LOGIN_THROTTLE_REDIS_URL=redis://localhost:6379/0 uvicorn app.main:app
+
+LOGIN_THROTTLE_BACKEND=memory держит счётчики в памяти процесса и подходит
+только для запуска в одном воркере.
+"""
+from collections import OrderedDict, deque
+from datetime import timedelta
+from time import monotonic, time
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import (
+    LOGIN_EMAIL_MAX_ATTEMPTS,
+    LOGIN_IP_MAX_ATTEMPTS,
+    LOGIN_THROTTLE_BACKEND,
+    LOGIN_THROTTLE_MAX_KEYS,
+    LOGIN_THROTTLE_REDIS_URL,
+    LOGIN_WINDOW_SECONDS,
+)
+from app.database import async_session_maker, utc_now
+from app.models import LoginAttempt
+
+
+# Класс advisory-блокировок попыток входа; пространство пар (int, int)
+# не пересекается с одиночными ключами app.leader
+ADVISORY_LOCK_CLASS = 0x6C6F67
+# Как часто удалять попытки, вышедшие из окна, по всем ключам
+PURGE_INTERVAL_SECONDS = 60 * 60
+
+
+class MemoryBackend:
+    """
+    Скользящее окно в памяти процесса: для каждого ключа — очередь отметок времени.
+    Хранит не больше max_keys ключей, давно не использованные вытесняются первыми.
+    """
+
+    def __init__(self, max_keys: int = LOGIN_THROTTLE_MAX_KEYS):
+        self.max_keys = max_keys
+        self._hits: OrderedDict[str, deque] = OrderedDict()
+
+    async def acquire(self, key: str, limit: int, window: float) -> float:
+        """
+        Засчитывает попытку, если лимит не исчерпан, и возвращает 0.
+        Иначе возвращает, через сколько секунд освободится место в окне.
+        """
+        now = monotonic()
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque()
+            if len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+        else:
+            self._hits.move_to_end(key)
+
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        if len(hits) >= limit:
+            return hits[0] + window - now
+        hits.append(now)
+        return 0.0
+
+    async def reset(self, key: str) -> None:
+        self._hits.pop(key, None)
+
+    def clear(self) -> None:
+        self._hits.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "keys": len(self._hits)}
+
+
+# Окно в отсортированном множестве: удалить старые отметки, посчитать, добавить
+_REDIS_ACQUIRE = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return tostring(tonumber(oldest[2]) + window - now)
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return '0'
+"""
+
+
+class RedisBackend:
+    """
+    Скользящее окно в Redis, общее для всех процессов. Атомарность — через Lua-скрипт.
+    """
+
+    def __init__(self, url: str, prefix: str = "login-throttle:"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._acquire = self._redis.register_script(_REDIS_ACQUIRE)
+        self._sequence = 0
+
+    async def acquire(self, key: str, limit: int, window: float) -> float:
+        self._sequence += 1
+        now = time()
+        # Уникальный член множества, чтобы одновременные попытки не схлопывались
+        member = f"{now}:{id(self)}:{self._sequence}"
+        retry_after = await self._acquire(keys=[self.prefix + key], args=[now, window, limit, member])
+        return float(retry_after)
+
+    async def reset(self, key: str) -> None:
+        await self._redis.delete(self.prefix + key)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class PostgresBackend:
+    """
+    Скользящее окно в таблице login_attempts, общее для всех процессов.
+    Попытки одного ключа считаются по очереди под advisory-блокировкой транзакции.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker = async_session_maker):
+        self.session_maker = session_maker
+        self._last_purge = monotonic()
+
+    async def acquire(self, key: str, limit: int, window: float) -> float:
+        now = utc_now()
+        window_start = now - timedelta(seconds=window)
+        async with self.session_maker() as db:
+            await db.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_CLASS, func.hashtext(key))))
+            await db.execute(delete(LoginAttempt).where(LoginAttempt.key == key,
+                                                        LoginAttempt.attempted_at <= window_start))
+            count, oldest = (await db.execute(
+                select(func.count(), func.min(LoginAttempt.attempted_at)).where(LoginAttempt.key == key)
+            )).one()
+            if count >= limit:
+                await db.commit()
+                return (oldest - window_start).total_seconds()
+            db.add(LoginAttempt(key=key, attempted_at=now))
+            if monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                # Ключи, по которым больше не входят, сами не очищаются
+                self._last_purge = monotonic()
+                await db.execute(delete(LoginAttempt).where(LoginAttempt.attempted_at <= window_start))
+            await db.commit()
+        return 0.0
+
+    async def reset(self, key: str) -> None:
+        async with self.session_maker() as db:
+            await db.execute(delete(LoginAttempt).where(LoginAttempt.key == key))
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {"backend": "postgres"}
+
+
+def _backend():
+    if LOGIN_THROTTLE_REDIS_URL:
+        return RedisBackend(LOGIN_THROTTLE_REDIS_URL)
+    if LOGIN_THROTTLE_BACKEND == "memory":
+        return MemoryBackend()
+    return PostgresBackend()
+
+
+class LoginThrottle:
+    """
+    Лимиты попыток входа по email и по IP клиента.
+    """
+
+    def __init__(self, backend, email_limit: int = LOGIN_EMAIL_MAX_ATTEMPTS,
+                 ip_limit: int = LOGIN_IP_MAX_ATTEMPTS, window: float = LOGIN_WINDOW_SECONDS):
+        self.backend = backend
+        self.email_limit = email_limit
+        self.ip_limit = ip_limit
+        self.window = window
+        self._rejected = 0
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f"email:{email.strip().lower()}"
+
+    async def check(self, email: str, client_ip: str | None) -> None:
+        """
+        Засчитывает попытку входа или выбрасывает HTTPException 429 с Retry-After.
+        """
+        limits = [(self._email_key(email), self.email_limit)]
+        if client_ip:
+            limits.insert(0, (f"ip:{client_ip}", self.ip_limit))
+
+        for key, limit in limits:
+            retry_after = await self.backend.acquire(key, limit, self.window)
+            if retry_after > 0:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many login attempts",
+                    headers={"Retry-After": str(max(1, round(retry_after)))},
+                )
+
+    async def succeeded(self, email: str) -> None:
+        """
+        Сбрасывает счётчик email после успешного входа. Счётчик IP не сбрасывается:
+        иначе один известный пароль открывал бы перебор остальных учётных записей.
+        """
+        await self.backend.reset(self._email_key(email))
+
+    def stats(self) -> dict:
+        return {**self.backend.stats(), "rejected": self._rejected}
+
+
+login_throttle = LoginThrottle(_backend())
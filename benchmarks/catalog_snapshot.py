@@ -0,0 +1,111 @@
+"""
+Задержка GET /products/ и память: колоночный снимок против SQL-пути.
+
+Снимок строится на синтетических товарах. SQL-путь замеряется только с флагом --sql
+(нужна база с данными, DATABASE_URL):
+
+    CATALOG_SNAPSHOT=1 python benchmarks/catalog_snapshot.py --products 1000000
+    CATALOG_SNAPSHOT=1 python benchmarks/catalog_snapshot.py --sql
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.catalog_snapshot import CatalogSnapshot
+
+QUERIES = {
+    "all": {},
+    "category": {"category_id": 7},
+    "price range": {"min_price": 100.0, "max_price": 500.0},
+    "category+stock+price sort": {"category_id": 7, "in_stock": True, "sort_key": "price"},
+    "seller newest": {"seller_id": 42, "sort_key": "created_at", "descending": True},
+}
+
+
+def synthetic_rows(count: int):
+    rng = np.random.default_rng(42)
+    start = datetime(2025, 1, 1)
+    prices = rng.integers(100, 100_000, count)
+    stocks = rng.integers(0, 50, count)
+    categories = rng.integers(1, 200, count)
+    sellers = rng.integers(1, 5000, count)
+    minutes = rng.integers(0, 500_000, count)
+    for index in range(count):
+        stamp = start + timedelta(minutes=int(minutes[index]))
+        yield SimpleNamespace(
+            id=index + 1, name=f"Товар {index}", description=None,
+            price=Decimal(int(prices[index])).scaleb(-2), image_url=None,
+            stock=int(stocks[index]), category_id=int(categories[index]), seller_id=int(sellers[index]),
+            rating=None, review_count=0, score=3.5, created_at=stamp, updated_at=stamp, is_active=True,
+        )
+
+
+def measure(fn, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def measure_sql(rounds: int) -> None:
+    from app.database import async_session_maker
+    from app.routers import products
+    from app.schemas.products import ProductSort
+
+    products.catalog = None
+    sorts = {"price": ProductSort.price, "created_at": ProductSort.created_at_desc}
+    async with async_session_maker() as db:
+        for name, query in QUERIES.items():
+            params = {key: value for key, value in query.items() if key not in ("sort_key", "descending")}
+            sort = sorts.get(query.get("sort_key"), ProductSort.id)
+            timings = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                await products.get_all_products(
+                    page=1, page_size=20, category_id=params.get("category_id"),
+                    min_price=params.get("min_price"), max_price=params.get("max_price"),
+                    in_stock=params.get("in_stock"), seller_id=params.get("seller_id"),
+                    created_at=None, updated_at=None, sort=sort, cursor=None, db=db,
+                )
+                timings.append(time.perf_counter() - started)
+            print(f"sql       {name:28} median {statistics.median(timings) * 1000:8.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--sql", action="store_true", help="Замерить SQL-путь на базе из DATABASE_URL")
+    args = parser.parse_args()
+
+    snapshot = CatalogSnapshot()
+    tracemalloc.start()
+    started = time.perf_counter()
+    snapshot.load(list(synthetic_rows(args.products)))
+    load_time = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = snapshot.nbytes()
+    print(f"products: {len(snapshot)}, load: {load_time:.1f}s, peak during load: {peak / 2**20:.0f} MiB")
+    print(f"snapshot size: {size / 2**20:.0f} MiB ({size / len(snapshot):.0f} B/product, "
+          f"{size / 2**20 * 1_000_000 / len(snapshot):.0f} MiB per million)")
+    for name, query in QUERIES.items():
+        latency = measure(lambda: snapshot.list(1, 20, **query), args.rounds)
+        print(f"snapshot  {name:28} median {latency:8.2f} ms")
+
+    if args.sql:
+        asyncio.run(measure_sql(args.rounds))
+
+
+if __name__ == "__main__":
+    main()
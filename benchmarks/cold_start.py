@@ -0,0 +1,79 @@
+"""
+Холодный старт: время до первого успешного запроса и задержка первых запросов.
+
+Запускает uvicorn с прогревом пула (DB_POOL_WARMUP) и без него, ждёт первого
+успешного GET /products/ и затем отправляет пачку параллельных запросов:
+без прогрева они ждут открытия соединений и компиляции SQL. Нужна база
+с данными (DATABASE_URL).
+
+    python benchmarks/cold_start.py --warmup 5 --burst 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import urlopen
+
+PATH = "/products/?page_size=20"
+
+
+def get(url: str) -> float:
+    started = time.perf_counter()
+    with urlopen(url, timeout=10) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(port: int, warmup: int, burst: int) -> dict:
+    base_url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "DB_POOL_WARMUP": str(warmup), "REQUEST_LOG": "0"}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn завершился при старте")
+            try:
+                first_ms = get(base_url + PATH)
+                break
+            except (URLError, ConnectionError):
+                time.sleep(0.01)
+        to_first = time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=burst) as pool:
+            latencies = list(pool.map(lambda _: get(base_url + PATH), range(burst)))
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "to_first_s": to_first,
+        "first_ms": first_ms,
+        "burst_p50_ms": statistics.median(latencies),
+        "burst_max_ms": max(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--warmup", type=int, default=5, help="DB_POOL_WARMUP для прогретого запуска")
+    parser.add_argument("--burst", type=int, default=20, help="Параллельных запросов после первого")
+    args = parser.parse_args()
+
+    for name, warmup in (("cold", 0), ("warm", args.warmup)):
+        result = measure(args.port, warmup, args.burst)
+        print(f"{name}: first success after {result['to_first_s']:.2f}s "
+              f"(first request {result['first_ms']:.1f} ms), "
+              f"burst of {args.burst}: p50 {result['burst_p50_ms']:.1f} ms, max {result['burst_max_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Байты в сети и CPU на запрос при сжатии ответов.
+
+Тела — синтетические ответы GET /products/?page_size=100, GET /categories/
+и GET /reviews/. Для каждого доступного кодека замеряется сжатие без кэша
+и повторная отдача того же тела из кэша сжатых ответов.
+
+    python benchmarks/compression.py --repeat 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.compression import CODECS, CompressionCache
+
+
+def products_page(count: int) -> bytes:
+    rng = random.Random(1)
+    start = datetime(2025, 1, 1)
+    items = [
+        {
+            "id": index,
+            "name": f"Товар {index}",
+            "description": "Описание товара " * rng.randint(1, 8),
+            "price": f"{rng.randint(100, 100_000) / 100:.2f}",
+            "image_url": f"https://cdn.example.com/products/{index}.jpg",
+            "stock": rng.randint(0, 50),
+            "category_id": rng.randint(1, 200),
+            "is_active": True,
+            "rating": rng.randint(1, 5),
+            "review_count": rng.randint(0, 500),
+            "score": round(rng.uniform(1, 5), 4),
+            "created_at": (start + timedelta(minutes=rng.randint(0, 500_000))).isoformat(),
+            "updated_at": None,
+        }
+        for index in range(count)
+    ]
+    return json.dumps({"items": items, "total": 100_000, "page": 1, "page_size": count,
+                       "next_cursor": None}, ensure_ascii=False).encode()
+
+
+def categories(count: int) -> bytes:
+    items = [{"id": index, "name": f"Категория {index}", "parent_id": index // 10 or None,
+              "is_active": True, "product_count": index * 7, "stats_refreshed_at": "2026-10-19T12:00:00"}
+             for index in range(1, count + 1)]
+    return json.dumps(items, ensure_ascii=False).encode()
+
+
+def reviews(count: int) -> bytes:
+    rng = random.Random(2)
+    items = [{"id": index, "user_id": rng.randint(1, 10_000), "product_id": rng.randint(1, 1000),
+              "comment": "Отличный товар, рекомендую " * rng.randint(1, 4),
+              "comment_date": "2026-10-19T12:00:00", "grade": rng.randint(1, 5), "is_active": True}
+             for index in range(count)]
+    return json.dumps(items, ensure_ascii=False).encode()
+
+
+async def measure(body: bytes, encoding: str, repeat: int) -> tuple[int, float, float]:
+    cold = CompressionCache(max_entries=0)
+    started = time.process_time()
+    for _ in range(repeat):
+        compressed = await cold.compress(body, encoding)
+    cold_ms = (time.process_time() - started) / repeat * 1000
+
+    warm = CompressionCache()
+    await warm.compress(body, encoding)
+    started = time.process_time()
+    for _ in range(repeat):
+        await warm.compress(body, encoding)
+    warm_ms = (time.process_time() - started) / repeat * 1000
+    return len(compressed), cold_ms, warm_ms
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    bodies = {
+        "products page_size=100": products_page(100),
+        "categories (500)": categories(500),
+        "reviews (5000)": reviews(5000),
+    }
+    for name, body in bodies.items():
+        print(f"{name}: {len(body)} B uncompressed")
+        for encoding in CODECS:
+            size, cold_ms, warm_ms = await measure(body, encoding, args.repeat)
+            print(f"  {encoding:>5}: {size:>8} B ({size / len(body):6.1%}), "
+                  f"compress {cold_ms:7.3f} ms CPU, cached {warm_ms:7.3f} ms CPU")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Загрузка изображений: пропускная способность приёма и задержка отдачи копий.
+
+Приём замеряется без сервера: синтетические JPEG проходят через ImageIngest
+(потоковая запись с хешем и построение копий в пуле процессов), затем те же
+файлы загружаются повторно и отсекаются дедупликацией. Задержка отдачи
+замеряется только с --base-url (запущенный сервер с тем же IMAGE_STORAGE_DIR).
+Нужен Pillow:
+
+    IMAGE_STORAGE_DIR=/tmp/bench-images python benchmarks/images.py --images 100
+    IMAGE_STORAGE_DIR=/tmp/bench-images python benchmarks/images.py --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import io
+import random
+import statistics
+import time
+from urllib.request import Request, urlopen
+
+from fastapi import UploadFile
+from PIL import Image
+
+from app.images import SIZES, ImageIngest, image_storage
+
+
+def synthetic_jpeg(seed: int, width: int, height: int) -> bytes:
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    # Немного деталей, чтобы кодеку было что сжимать
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        image.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, min(width, x + 40), min(height, y + 40)))
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+
+async def ingest_all(ingest: ImageIngest, payloads: list[bytes], concurrency: int) -> tuple[float, list[str]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(payload: bytes) -> str:
+        async with semaphore:
+            return await ingest.ingest(UploadFile(io.BytesIO(payload), filename="image.jpg"))
+
+    started = time.perf_counter()
+    digests = await asyncio.gather(*(one(payload) for payload in payloads))
+    return time.perf_counter() - started, digests
+
+
+def serve_latency(base_url: str, digests: list[str], requests: int) -> list[float]:
+    latencies = []
+    for index in range(requests):
+        digest = digests[index % len(digests)]
+        request = Request(f"{base_url}/images/{digest}/medium.webp")
+        started = time.perf_counter()
+        with urlopen(request) as response:
+            response.read()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--height", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4, help="Процессов для построения копий")
+    parser.add_argument("--concurrency", type=int, default=8, help="Одновременных загрузок")
+    parser.add_argument("--base-url", help="Замерить отдачу копий с запущенного сервера")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    payloads = [synthetic_jpeg(seed, args.width, args.height) for seed in range(args.images)]
+    total_mb = sum(map(len, payloads)) / 1024 / 1024
+    ingest = ImageIngest(image_storage, workers=args.workers)
+    try:
+        elapsed, digests = await ingest_all(ingest, payloads, args.concurrency)
+        print(f"ingest: {args.images} images ({total_mb:.1f} MB, {args.width}x{args.height}) in {elapsed:.2f}s, "
+              f"{args.images / elapsed:.1f} images/s, {len(SIZES) * 2} variants each")
+        elapsed, _ = await ingest_all(ingest, payloads, args.concurrency)
+        print(f"re-upload (deduplicated): {args.images / elapsed:.1f} images/s")
+    finally:
+        ingest.shutdown()
+    print(ingest.stats())
+
+    if args.base_url:
+        latencies = sorted(serve_latency(args.base_url, digests, args.requests))
+        print(f"serve medium.webp: p50 {statistics.median(latencies):.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Пропускная способность с логированием и без.
+
+Минимальное ASGI-приложение вызывается напрямую, без сети; каждый запрос
+«выполняет» --statements SQL-запросов. Режимы:
+
+- off   — логирование выключено;
+- echo  — каждый запрос к базе пишется синхронным StreamHandler, как при echo=True;
+- queue — JSON-лог запроса через очередь и фоновый поток (app.logs),
+          SQL — с выборкой --sample-rate.
+
+    python benchmarks/logging_overhead.py --requests 20000 --statements 5
+"""
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+
+from app.logs import RequestLogMiddleware, setup_logging
+
+STATEMENT = "SELECT products.id, products.name, products.price FROM products WHERE products.id = $1::INTEGER"
+
+
+def make_app(statements: int, sql_logger: logging.Logger, sample_rate: float | None):
+    async def app(scope, receive, send):
+        for _ in range(statements):
+            if sample_rate is None:
+                sql_logger.info(STATEMENT)
+                sql_logger.info("[cached since 1.2s ago] (42,)")
+            elif sample_rate and random.random() < sample_rate:
+                sql_logger.info("query", extra={"statement": STATEMENT, "duration_ms": 0.4})
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"ok":true}'})
+    return app
+
+
+async def drive(app, requests: int, concurrency: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/products/1", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def worker(count: int):
+        for _ in range(count):
+            await app(dict(scope), receive, send)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+    return requests / (time.perf_counter() - started)
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    return root
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--statements", type=int, default=5)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    sql_logger = logging.getLogger("bench.sql")
+    with tempfile.TemporaryFile("w") as output:
+        root = reset_root()
+        root.setLevel(logging.WARNING)
+        off = await drive(make_app(args.statements, sql_logger, 0), args.requests, args.concurrency)
+
+        root = reset_root()
+        handler = logging.StreamHandler(output)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        echo = await drive(make_app(args.statements, sql_logger, None), args.requests, args.concurrency)
+
+        listener = setup_logging("INFO", stream=output)
+        app = RequestLogMiddleware(make_app(args.statements, sql_logger, args.sample_rate), enabled=True)
+        queued = await drive(app, args.requests, args.concurrency)
+        listener.stop()
+
+    print(f"  off: {off:10.0f} req/s")
+    print(f" echo: {echo:10.0f} req/s ({echo / off:.0%} of off)")
+    print(f"queue: {queued:10.0f} req/s ({queued / off:.0%} of off), "
+          f"request log + {args.sample_rate:.0%} SQL sample")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""
+CPU на перебор паролей: вход без ограничений против LoginThrottle.
+
+Атака — подбор пароля к нескольким email с небольшого пула IP, вперемешку
+с редкими входами настоящих пользователей. Для каждой попытки, пропущенной
+ограничителем, выполняется настоящая проверка bcrypt, как в POST /users/token.
+База не нужна: запрос пользователя одинаков в обоих вариантах и не замеряется.
+
+    python benchmarks/login_throttling.py --attempts 2000 --targets 5 --ips 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from fastapi import HTTPException
+
+from app.auth import hash_password, verify_password
+from app.throttling import LoginThrottle, MemoryBackend
+
+
+def attack_traffic(attempts: int, targets: int, ips: int, legit_share: float):
+    rng = random.Random(42)
+    for index in range(attempts):
+        if rng.random() < legit_share:
+            yield f"user{index}@example.com", f"10.0.0.{rng.randrange(1, 255)}", True
+        else:
+            yield f"victim{rng.randrange(targets)}@example.com", f"203.0.113.{rng.randrange(ips)}", False
+
+
+async def run(throttle: LoginThrottle | None, traffic, stored_hash: str) -> dict:
+    counts = {"verified": 0, "rejected": 0, "legit_rejected": 0}
+    started = time.process_time()
+    for email, ip, legit in traffic:
+        if throttle is not None:
+            try:
+                await throttle.check(email, ip)
+            except HTTPException:
+                counts["rejected"] += 1
+                counts["legit_rejected"] += legit
+                continue
+        verify_password("password123" if legit else "wrong-guess", stored_hash)
+        counts["verified"] += 1
+    counts["cpu_seconds"] = time.process_time() - started
+    return counts
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--attempts", type=int, default=2000)
+    parser.add_argument("--targets", type=int, default=5, help="Сколько email атакуется")
+    parser.add_argument("--ips", type=int, default=20, help="Размер пула IP атакующего")
+    parser.add_argument("--legit-share", type=float, default=0.02, help="Доля настоящих входов")
+    args = parser.parse_args()
+
+    stored_hash = hash_password("password123")
+    traffic = list(attack_traffic(args.attempts, args.targets, args.ips, args.legit_share))
+
+    baseline = await run(None, traffic, stored_hash)
+    throttled = await run(LoginThrottle(MemoryBackend()), traffic, stored_hash)
+
+    for name, result in (("no throttle", baseline), ("throttle", throttled)):
+        per_attempt = result["cpu_seconds"] / len(traffic) * 1000
+        print(f"{name:>12}: cpu {result['cpu_seconds']:.2f}s ({per_attempt:.2f} ms/attempt), "
+              f"bcrypt {result['verified']}, rejected {result['rejected']} "
+              f"(legit {result['legit_rejected']})")
+    saved = 1 - throttled["cpu_seconds"] / baseline["cpu_seconds"]
+    print(f"CPU saved: {saved:.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Полезная пропускная способность (goodput) за точкой насыщения с допуском и без него.
+
+Модель без сервера и базы: обработчик занимает «соединение пула» (семафор на
+--pool слотов) на --service мс. Клиенты приходят пуассоновским потоком с
+нагрузкой от 0.5 до 3 ёмкостей и ждут ответа не дольше --client-timeout;
+ответ, пришедший позже, клиенту уже не нужен, хотя слот на него потрачен.
+Без допуска очередь к пулу растёт, и за насыщением почти все ответы
+опаздывают. С AdmissionMiddleware лишние запросы сразу получают 503,
+а допущенные укладываются в срок. Доля --critical запросов идёт на
+POST /users/token и проверяет, что вход проходит и под перегрузкой:
+
+    python benchmarks/overload.py --pool 15 --service 20 --seconds 10
+"""
+import argparse
+import asyncio
+import random
+
+from app.admission import AdmissionController, AdmissionMiddleware, default_classes
+
+
+def pooled_app(pool: asyncio.Semaphore, service: float):
+    async def app(scope, receive, send):
+        async with pool:
+            await asyncio.sleep(service)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app
+
+
+async def call(app, method: str, path: str) -> int:
+    status = 500
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "query_string": b""}
+    await app(scope, receive, send)
+    return status
+
+
+async def run_load(app, rate: float, seconds: float, client_timeout: float, critical: float, seed: int) -> dict:
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    results = []
+
+    async def one(kind: str, method: str, path: str) -> None:
+        started = loop.time()
+        status = await call(app, method, path)
+        results.append((kind, status, loop.time() - started))
+
+    tasks = []
+    started = loop.time()
+    arrival = started
+    while arrival - started < seconds:
+        arrival += rng.expovariate(rate)
+        delay = arrival - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < critical:
+            tasks.append(asyncio.create_task(one("critical", "POST", "/users/token")))
+        else:
+            tasks.append(asyncio.create_task(one("read", "GET", "/products/1")))
+    await asyncio.gather(*tasks)
+
+    def good(kind: str | None = None) -> int:
+        return sum(1 for result_kind, status, latency in results
+                   if status == 200 and latency <= client_timeout and kind in (None, result_kind))
+
+    critical_total = sum(1 for kind, _, _ in results if kind == "critical")
+    return {
+        "goodput": good() / seconds,
+        "rejected": sum(1 for _, status, _ in results if status == 503) / len(results),
+        "critical_ok": good("critical") / critical_total if critical_total else 1.0,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pool", type=int, default=15, help="Слотов пула соединений")
+    parser.add_argument("--service", type=float, default=20, help="Время обработки запроса, мс")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--client-timeout", type=float, default=1.0, help="Сколько клиент ждёт ответа, с")
+    parser.add_argument("--critical", type=float, default=0.05, help="Доля запросов входа")
+    parser.add_argument("--queue", type=int, default=50)
+    parser.add_argument("--max-wait", type=float, default=0.5)
+    parser.add_argument("--loads", type=float, nargs="+", default=[0.5, 0.8, 1.0, 1.5, 2.0, 3.0])
+    args = parser.parse_args()
+
+    service = args.service / 1000
+    capacity_rps = args.pool / service
+    print(f"capacity: {capacity_rps:.0f} req/s, client timeout {args.client_timeout}s")
+    print(f"{'load':>5} {'offered':>8} | {'no admission':>12} {'login ok':>8} | "
+          f"{'admission':>9} {'login ok':>8} {'503':>5}")
+    for load in args.loads:
+        rate = capacity_rps * load
+        plain = await run_load(pooled_app(asyncio.Semaphore(args.pool), service),
+                               rate, args.seconds, args.client_timeout, args.critical, seed=1)
+        controller = AdmissionController(args.pool, default_classes(args.pool, queue=args.queue,
+                                                                    max_wait=args.max_wait))
+        guarded = AdmissionMiddleware(pooled_app(asyncio.Semaphore(args.pool), service), controller)
+        admitted = await run_load(guarded, rate, args.seconds, args.client_timeout, args.critical, seed=1)
+        print(f"{load:>5.1f} {rate:>8.0f} | {plain['goodput']:>12.0f} {plain['critical_ok']:>8.0%} | "
+              f"{admitted['goodput']:>9.0f} {admitted['critical_ok']:>8.0%} {admitted['rejected']:>5.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Сравнение N одиночных запросов GET /products/{id} с одним GET /products/batch.
+
+Запуск против поднятого сервиса:
+    python benchmarks/products_batch.py --base-url http://localhost:8000 --ids 1-50
+"""
+import argparse
+import json
+import statistics
+import time
+from urllib.request import urlopen
+
+
+def parse_ids(value: str) -> list[int]:
+    if "-" in value:
+        start, end = value.split("-", 1)
+        return list(range(int(start), int(end) + 1))
+    return [int(item) for item in value.split(",") if item]
+
+
+def fetch(url: str) -> None:
+    with urlopen(url) as response:
+        json.load(response)
+
+
+def single_calls(base_url: str, ids: list[int]) -> float:
+    started = time.perf_counter()
+    for product_id in ids:
+        try:
+            fetch(f"{base_url}/products/{product_id}")
+        except OSError:
+            pass
+    return time.perf_counter() - started
+
+
+def batch_call(base_url: str, ids: list[int]) -> float:
+    query = "&".join(f"ids={product_id}" for product_id in ids)
+    started = time.perf_counter()
+    fetch(f"{base_url}/products/batch?{query}")
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--ids", default="1-50", help="Диапазон '1-50' или список '1,2,3'")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    ids = parse_ids(args.ids)
+    singles = [single_calls(args.base_url, ids) for _ in range(args.rounds)]
+    batches = [batch_call(args.base_url, ids) for _ in range(args.rounds)]
+
+    print(f"ids: {len(ids)}, rounds: {args.rounds}")
+    print(f"N x GET /products/{{id}}: median {statistics.median(singles) * 1000:.2f} ms")
+    print(f"GET /products/batch:     median {statistics.median(batches) * 1000:.2f} ms")
+    print(f"speedup: x{statistics.median(singles) / statistics.median(batches):.1f}")
+
+
+if __name__ == "__main__":
+    main()
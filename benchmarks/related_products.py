@@ -0,0 +1,46 @@
+"""
+Время и память расчёта похожих товаров на синтетических отзывах.
+
+    python benchmarks/related_products.py --reviews 1000000 --users 200000 --products 50000
+"""
+import argparse
+import resource
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.jobs.related_products import compute_related
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    # Популярность товаров распределена по Ципфу, как в реальном каталоге
+    product_ids = (rng.zipf(1.3, args.reviews) % args.products) + 1
+    user_ids = rng.integers(1, args.users + 1, args.reviews)
+    grades = rng.integers(1, 6, args.reviews).astype(np.float32)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    sources, _, _, _ = compute_related(user_ids, product_ids, grades,
+                                       top_k=args.top_k, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"reviews: {args.reviews}, products: {args.products}, users: {args.users}")
+    print(f"rows: {len(sources)}, time: {elapsed:.2f}s")
+    print(f"peak traced memory: {peak / 2**20:.1f} MiB, "
+          f"max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
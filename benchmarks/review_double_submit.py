@@ -0,0 +1,53 @@
+"""
+Проверка гонки при повторной отправке отзыва.
+
+Отправляет N одинаковых POST /reviews/ параллельно от одного покупателя и
+проверяет, что создан ровно один отзыв, а остальные получили 403.
+
+    python benchmarks/review_double_submit.py --token <access_token> --product-id 1 --parallel 20
+"""
+import argparse
+import json
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+
+def submit(base_url: str, token: str, product_id: int, barrier: Barrier) -> int:
+    body = json.dumps({"product_id": product_id, "grade": 5, "comment": "double submit"}).encode()
+    request = Request(f"{base_url}/reviews/", data=body, method="POST", headers={
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    })
+    barrier.wait()
+    try:
+        with urlopen(request) as response:
+            return response.status
+    except HTTPError as exc:
+        return exc.code
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="access_token покупателя без отзыва на товар")
+    parser.add_argument("--product-id", type=int, required=True)
+    parser.add_argument("--parallel", type=int, default=20)
+    args = parser.parse_args()
+
+    barrier = Barrier(args.parallel)
+    with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+        statuses = Counter(pool.map(
+            lambda _: submit(args.base_url, args.token, args.product_id, barrier), range(args.parallel)))
+
+    print(dict(statuses))
+    ok = statuses[200] == 1 and statuses[403] == args.parallel - 1
+    print("OK" if ok else "FAIL: ожидался ровно один созданный отзыв")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
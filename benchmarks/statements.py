@@ -0,0 +1,76 @@
+"""
+Процессорное время на подготовку запросов одного запроса к API: построение select(...)
+на каждый вызов против готовых запросов из app.statements.
+
+Замеряется построение конструкции и вычисление ключа кэша компиляции — то, что
+SQLAlchemy делает при каждом execute даже при попадании в кэш.
+
+    python benchmarks/statements.py --iterations 20000
+"""
+import argparse
+import time
+
+from sqlalchemy import func, select
+
+from app.models import Category as CategoryModel, Product as ProductModel
+from app.models.users import User as UserModel
+from app.schemas.products import ProductSort
+from app.statements import (
+    ACTIVE_CATEGORY_ID,
+    ACTIVE_PRODUCT_BY_ID,
+    ACTIVE_USER_BY_EMAIL,
+    product_count_statement,
+    product_list_statement,
+)
+
+
+def per_request_build():
+    statements = [
+        select(UserModel).where(UserModel.email == "user@example.com", UserModel.is_active == True),
+        select(ProductModel).where(ProductModel.id == 1, ProductModel.is_active == True),
+        select(CategoryModel).where(CategoryModel.id == 1, CategoryModel.is_active == True),
+    ]
+    filters = [ProductModel.is_active == True, ProductModel.category_id == 3,
+               ProductModel.price >= 10, ProductModel.stock > 0]
+    statements.append(select(func.count()).select_from(ProductModel).where(*filters))
+    statements.append(select(ProductModel).where(*filters).order_by(ProductModel.price, ProductModel.id)
+                      .offset(0).limit(21))
+    for stmt in statements:
+        stmt._generate_cache_key()
+
+
+def prebuilt():
+    filter_names = ("category_id", "in_stock", "min_price")
+    statements = [
+        ACTIVE_USER_BY_EMAIL,
+        ACTIVE_PRODUCT_BY_ID,
+        ACTIVE_CATEGORY_ID,
+        product_count_statement(filter_names),
+        product_list_statement(filter_names, ProductSort.price, None),
+    ]
+    for stmt in statements:
+        stmt._generate_cache_key()
+
+
+def measure(fn, iterations: int) -> float:
+    fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    before = measure(per_request_build, args.iterations)
+    after = measure(prebuilt, args.iterations)
+    print(f"select(...) per request: {before:8.1f} us CPU")
+    print(f"app.statements:          {after:8.1f} us CPU")
+    print(f"saved per request:       {before - after:8.1f} us ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Подсказки по названию товара: построение, память и задержка SuggestIndex.
+
+Названия синтетические — сочетания слов из небольшого словаря, поэтому
+у коротких префиксов длинные диапазоны, как у настоящего каталога.
+Запросы — начала случайных названий длиной от 1 до 8 символов:
+
+    python benchmarks/suggest.py --names 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.suggest import SuggestIndex
+
+
+WORDS = (
+    "смартфон ноутбук планшет наушники чехол кабель зарядка монитор клавиатура мышь "
+    "чайник кофеварка пылесос утюг фен холодильник плита микроволновка блендер миксер "
+    "кроссовки куртка футболка джинсы рюкзак сумка часы очки шапка перчатки "
+    "apple samsung xiaomi sony lg philips bosch asus lenovo huawei "
+    "черный белый синий красный серый pro max mini lite plus"
+).split()
+
+
+def synthetic_rows(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    stamp = datetime(2024, 1, 1)
+    for index in range(count):
+        name = " ".join(rng.choices(WORDS, k=rng.randint(2, 4))) + f" {rng.randint(1, 999)}"
+        yield SimpleNamespace(id=index + 1, name=name[:100], score=rng.uniform(1, 5),
+                              is_active=True, updated_at=stamp)
+
+
+def percentiles(timings: list[float]) -> str:
+    timings = sorted(timings)
+    return (f"p50 {statistics.median(timings) * 1000:.1f} µs, "
+            f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.1f} µs, "
+            f"max {timings[-1] * 1000:.1f} µs")
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--names", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--updates", type=int, default=2_000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.names))
+    index = SuggestIndex(max_names=args.names + args.updates)
+
+    started = time.perf_counter()
+    index.load(rows)
+    build_time = time.perf_counter() - started
+    size = index.nbytes()
+    print(f"names: {len(index)}, build: {build_time:.1f}s, heavy prefixes: {index.stats()['heavy_prefixes']}")
+    print(f"index memory: {size / 2**20:.0f} MiB ({size / len(index):.0f} B/name, "
+          f"{size / 2**20 * 1_000_000 / len(index):.0f} MiB per million)")
+
+    rng = random.Random(7)
+    for length in (1, 2, 3, 5, 8):
+        prefixes = [rng.choice(rows).name[:length] for _ in range(args.queries // 5)]
+        timings = [timed(index.suggest, prefix, args.limit) for prefix in prefixes]
+        print(f"suggest, prefix {length} chars: {percentiles(timings)}")
+
+    # Изменение оценки (отзыв), новый товар и удаление — как из обработчиков записи
+    changes = [rng.choice(rows) for _ in range(args.updates)]
+    timings = [timed(index.upsert, row.id, row.name, rng.uniform(1, 5)) for row in changes]
+    print(f"upsert score: {percentiles(timings)}")
+    fresh = list(synthetic_rows(args.updates, seed=1))
+    timings = [timed(index.upsert, args.names + row.id, row.name, row.score) for row in fresh]
+    print(f"insert: {percentiles(timings)}")
+    timings = [timed(index.remove, row.id) for row in changes]
+    print(f"remove: {percentiles(timings)}")
+    print(index.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Пропускная способность app.server при разном числе воркеров.
+
+Для каждого числа воркеров запускает python -m app.server, ждёт /health/ready
+и нагружает сервер из нескольких процессов с постоянными HTTP-соединениями.
+Запускать на многоядерной машине с базой (DATABASE_URL); нагрузочные процессы
+тоже занимают ядра, это стоит учитывать при сравнении.
+
+    python benchmarks/workers_throughput.py --workers 1 2 4 8 --seconds 10
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from urllib.error import URLError
+from urllib.request import urlopen
+
+
+def client(port: int, path: str, deadline: float, results) -> None:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                done += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+    results.put((done, errors))
+
+
+def wait_ready(port: int, server: subprocess.Popen) -> None:
+    while True:
+        if server.poll() is not None:
+            raise RuntimeError("app.server завершился при старте")
+        try:
+            with urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=1):
+                return
+        except (URLError, ConnectionError):
+            time.sleep(0.1)
+
+
+def measure(workers: int, args) -> tuple[float, int]:
+    env = {**os.environ, "REQUEST_LOG": "0", "LOG_LEVEL": "WARNING"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", str(workers), "--port", str(args.port)],
+        env=env,
+    )
+    try:
+        wait_ready(args.port, server)
+        # Ждём, пока прогреются все воркеры, а не только первый ответивший
+        time.sleep(2)
+        results = multiprocessing.Queue()
+        deadline = time.time() + args.seconds
+        clients = [multiprocessing.Process(target=client,
+                                           args=(args.port, args.path, deadline, results))
+                   for _ in range(args.clients)]
+        for process in clients:
+            process.start()
+        totals = [results.get() for _ in clients]
+        for process in clients:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    done = sum(result[0] for result in totals)
+    errors = sum(result[1] for result in totals)
+    return done / args.seconds, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--path", default="/products/?page_size=20")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=16,
+                        help="Нагрузочных процессов, у каждого одно постоянное соединение")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, GET {args.path}")
+    baseline = None
+    for workers in args.workers:
+        rps, errors = measure(workers, args)
+        baseline = baseline or rps
+        print(f"workers={workers:>3}: {rps:9.0f} req/s (x{rps / baseline:.2f}), errors {errors}")
+
+
+if __name__ == "__main__":
+    main()
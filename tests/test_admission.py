@@ -0,0 +1,280 @@
+import asyncio
+from time import monotonic
+from types import SimpleNamespace
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.exc import DBAPIError
+
+from app import admission as admission_module
+from app.admission import (
+    QUERY_CANCELED,
+    AdmissionController,
+    AdmissionMiddleware,
+    DeadlineExceeded,
+    RouteClass,
+    classify,
+    default_classes,
+)
+
+
+def controller(capacity: int = 2, reserved: int = 0, queue: int = 2, max_wait: float = 1.0) -> AdmissionController:
+    return AdmissionController(capacity, default_classes(capacity, queue=queue, max_wait=max_wait, deadline=5),
+                               reserved=reserved)
+
+
+async def settle() -> None:
+    # Даём ожидающим задачам дойти до очереди или получить слот
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_classify():
+    assert classify("POST", "/users/token") == "critical"
+    assert classify("POST", "/reviews/") == "write"
+    assert classify("GET", "/products/1") == "read"
+    assert classify("GET", "/reviews/") == "heavy"
+    assert classify("GET", "/products/category/3") == "heavy"
+    assert classify("GET", "/health/ready") is None
+    assert classify("GET", "/metrics") is None
+
+
+async def test_slots_are_counted_and_released():
+    admission = controller(capacity=2)
+    read = admission.classes["read"]
+    assert await admission.acquire(read) and await admission.acquire(read)
+    assert (admission.running, read.running) == (2, 2)
+
+    waiting = asyncio.create_task(admission.acquire(read))
+    await settle()
+    assert not waiting.done() and len(read.waiters) == 1
+
+    # Освободившийся слот сразу переходит ожидающему
+    admission.release(read)
+    assert await waiting is True
+    assert (admission.running, read.running, len(read.waiters)) == (2, 2, 0)
+
+    admission.release(read)
+    admission.release(read)
+    assert admission.running == 0
+    assert read.counters["admitted"] == 3 and read.counters["queued"] == 1
+
+
+async def test_full_queue_rejects_immediately():
+    admission = controller(capacity=1, queue=1)
+    write = admission.classes["write"]
+    assert await admission.acquire(write)
+    waiting = asyncio.create_task(admission.acquire(write))
+    await settle()
+
+    assert await admission.acquire(write) is False
+    assert write.counters["rejected"] == 1
+
+    admission.release(write)
+    assert await waiting
+    admission.release(write)
+
+
+async def test_wait_timeout():
+    admission = controller(capacity=1, max_wait=0.05)
+    read = admission.classes["read"]
+    assert await admission.acquire(read)
+
+    started = monotonic()
+    assert await admission.acquire(read) is False
+    assert 0.04 < monotonic() - started < 0.5
+    assert read.counters["timed_out"] == 1 and not read.waiters
+
+    admission.release(read)
+    assert admission.running == 0
+
+
+async def test_reserved_slot_for_critical():
+    admission = controller(capacity=2, reserved=1)
+    read, critical = admission.classes["read"], admission.classes["critical"]
+    assert await admission.acquire(read)
+
+    # Последний слот зарезервирован: чтение ждёт, вход проходит сразу
+    waiting_read = asyncio.create_task(admission.acquire(read))
+    await settle()
+    assert not waiting_read.done()
+    assert await admission.acquire(critical)
+    assert admission.running == 2
+
+    admission.release(critical)
+    await settle()
+    assert not waiting_read.done()
+    admission.release(read)
+    assert await waiting_read
+    admission.release(read)
+    assert admission.running == 0
+
+
+async def test_released_slot_goes_to_highest_priority():
+    admission = controller(capacity=1)
+    read, write, critical = (admission.classes[name] for name in ("read", "write", "critical"))
+    assert await admission.acquire(read)
+    order = []
+
+    async def wait(route_class: RouteClass):
+        assert await admission.acquire(route_class)
+        order.append(route_class.name)
+        admission.release(route_class)
+
+    tasks = [asyncio.create_task(wait(route_class)) for route_class in (read, write, critical)]
+    await settle()
+    admission.release(read)
+    await asyncio.gather(*tasks)
+    assert order == ["critical", "write", "read"]
+
+
+async def test_heavy_class_limit():
+    admission = controller(capacity=8)
+    heavy = admission.classes["heavy"]
+    assert heavy.limit == 2
+    assert await admission.acquire(heavy) and await admission.acquire(heavy)
+    waiting = asyncio.create_task(admission.acquire(heavy))
+    await settle()
+    assert not waiting.done()
+    # Другие классы не упираются в предел тяжёлых выборок
+    assert await admission.acquire(admission.classes["read"])
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+
+async def test_cancelled_waiter_leaves_queue():
+    admission = controller(capacity=1)
+    read = admission.classes["read"]
+    assert await admission.acquire(read)
+    waiting = asyncio.create_task(admission.acquire(read))
+    await settle()
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert not read.waiters
+
+    admission.release(read)
+    assert admission.running == 0 and read.running == 0
+
+
+async def test_cancel_after_grant_returns_slot():
+    admission = controller(capacity=1)
+    read = admission.classes["read"]
+    assert await admission.acquire(read)
+    waiting = asyncio.create_task(admission.acquire(read))
+    await settle()
+
+    # Слот выдан ожидающему, но задача отменена раньше, чем успела его получить.
+    # asyncio.wait_for в зависимости от версии Python либо возвращает слот
+    # (его освобождает вызывающий), либо поднимает CancelledError — слот не должен потеряться
+    admission.release(read)
+    waiting.cancel()
+    try:
+        granted = await waiting
+    except asyncio.CancelledError:
+        granted = False
+    if granted:
+        assert admission.running == 1
+        admission.release(read)
+    assert (admission.running, read.running) == (0, 0)
+
+
+def endpoint(error: Exception | None = None, after_start: bool = False, seen: list | None = None):
+    async def app(scope, receive, send):
+        if seen is not None:
+            seen.append(admission_module._deadline.get())
+        if error is not None and not after_start:
+            raise error
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        if error is not None:
+            raise error
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app
+
+
+def http(app) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+class QueryCanceled(Exception):
+    sqlstate = QUERY_CANCELED
+
+
+async def test_middleware_rejects_with_retry_after():
+    admission = controller(capacity=1, queue=0)
+    # Единственный слот занят
+    assert await admission.acquire(admission.classes["read"])
+    async with http(AdmissionMiddleware(endpoint(), admission)) as client:
+        response = await client.get("/products/1")
+        health = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(admission_module.ADMISSION_RETRY_AFTER)
+    assert response.json() == {"detail": "Server is overloaded"}
+    # Проверки здоровья проходят мимо допуска
+    assert health.status_code == 200
+
+
+async def test_middleware_sets_deadline_and_releases():
+    admission = controller()
+    seen = []
+    async with http(AdmissionMiddleware(endpoint(seen=seen), admission)) as client:
+        started = monotonic()
+        assert (await client.get("/products/1")).status_code == 200
+    assert started + 4 < seen[0] <= monotonic() + 5
+    assert admission_module._deadline.get() is None
+    assert admission.running == 0
+
+
+@pytest.mark.parametrize("error", [
+    DBAPIError("SELECT 1", {}, QueryCanceled("canceling statement due to statement timeout")),
+    DeadlineExceeded(),
+])
+async def test_middleware_maps_deadline_to_503(error):
+    admission = controller()
+    async with http(AdmissionMiddleware(endpoint(error), admission)) as client:
+        response = await client.post("/reviews/")
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Request deadline exceeded"}
+    assert "retry-after" in response.headers
+    assert admission.classes["write"].counters["deadline_exceeded"] == 1
+    assert admission.running == 0
+
+
+async def test_middleware_reraises_other_errors():
+    admission = controller()
+    other = DBAPIError("SELECT 1", {}, Exception("connection reset"))
+    async with http(AdmissionMiddleware(endpoint(other), admission)) as client:
+        with pytest.raises(DBAPIError):
+            await client.get("/products/1")
+        # Ответ уже начат: 503 отправить нельзя
+        with pytest.raises(DeadlineExceeded):
+            await AdmissionMiddleware(endpoint(DeadlineExceeded(), after_start=True), admission)(
+                {"type": "http", "method": "GET", "path": "/products/1", "headers": []},
+                None, lambda message: asyncio.sleep(0))
+    assert admission.running == 0
+
+
+def test_session_deadline_sets_statement_timeout():
+    executed = []
+    connection = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), exec_driver_sql=executed.append)
+
+    admission_module._apply_deadline(None, None, connection)
+    assert executed == []
+
+    token = admission_module._deadline.set(monotonic() + 2)
+    try:
+        admission_module._apply_deadline(None, None, connection)
+    finally:
+        admission_module._deadline.reset(token)
+    timeout = int(executed[0].rsplit(" ", 1)[1])
+    assert executed[0].startswith("SET LOCAL statement_timeout = ") and 1900 < timeout <= 2000
+
+    token = admission_module._deadline.set(monotonic() - 1)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            admission_module._apply_deadline(None, None, connection)
+    finally:
+        admission_module._deadline.reset(token)
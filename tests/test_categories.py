@@ -0,0 +1,42 @@
+from sqlalchemy import update
+
+from app.models import Category
+from tests.conftest import auth
+
+
+async def create_category(client, name: str, parent_id: int | None = None) -> dict:
+    response = await client.post("/categories/", json={"name": name, "parent_id": parent_id})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def test_update_rejects_cycle(client):
+    alpha = await create_category(client, "Alpha")
+    beta = await create_category(client, "Beta", alpha["id"])
+    gamma = await create_category(client, "Gamma", beta["id"])
+
+    for parent in (beta, gamma):
+        response = await client.put(f"/categories/{alpha['id']}", json={"name": "Alpha", "parent_id": parent["id"]})
+        assert response.status_code == 400, response.text
+    response = await client.put(f"/categories/{alpha['id']}", json={"name": "Alpha", "parent_id": alpha["id"]})
+    assert response.status_code == 400
+
+    # Перенос в другую ветку без цикла разрешён
+    other = await create_category(client, "Other")
+    response = await client.put(f"/categories/{gamma['id']}", json={"name": "Gamma", "parent_id": other["id"]})
+    assert response.status_code == 200, response.text
+
+
+async def test_product_page_survives_category_cycle(client, db, seller):
+    alpha = await create_category(client, "Alpha")
+    beta = await create_category(client, "Beta", alpha["id"])
+    # Цикл в обход API, например от одновременных PUT
+    await db.execute(update(Category).where(Category.id == alpha["id"]).values(parent_id=beta["id"]))
+    await db.commit()
+
+    product = (await client.post("/products/", headers=auth(seller), json={
+        "name": "Laptop", "price": "999.00", "stock": 5, "category_id": beta["id"],
+    })).json()
+    response = await client.get(f"/products/{product['id']}/page")
+    assert response.status_code == 200, response.text
+    assert [category["name"] for category in response.json()["category_path"]] == ["Alpha", "Beta"]
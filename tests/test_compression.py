@@ -0,0 +1,144 @@
+import gzip
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app import compression
+from app.compression import CompressionCache, CompressionMiddleware, choose_encoding
+from tests.conftest import auth
+
+
+@pytest.fixture
+def all_codecs(monkeypatch):
+    # Набор кодеков зависит от установленных пакетов; порядок — предпочтение сервера
+    monkeypatch.setattr(compression, "CODECS", {"zstd": bytes, "br": bytes, "gzip": compression._gzip})
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(compression, "CODECS", {"gzip": compression._gzip})
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("gzip, br, zstd", "zstd"),
+    ("GZIP;q=0.5, br;q=0.4", "gzip"),
+    ("zstd;q=0, gzip", "gzip"),
+    ("br;q=0.9, gzip;q=1.0", "gzip"),
+    ("*", "zstd"),
+    ("*;q=0.5, br;q=0.8", "br"),
+    ("*, zstd;q=0", "br"),
+    ("*;q=0", None),
+    ("gzip;q=bad, br", "br"),
+    ("deflate, compress", None),
+])
+def test_choose_encoding(all_codecs, accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected
+
+
+def test_choose_encoding_ignores_missing_codecs(gzip_only):
+    assert choose_encoding("zstd, br") is None
+    assert choose_encoding("zstd, br, gzip;q=0.1") == "gzip"
+    assert choose_encoding("*") == "gzip"
+
+
+def responder(body: bytes, content_type: str = "application/json", chunks: int = 1, **headers: str):
+    async def app(scope, receive, send):
+        raw = [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+        raw += [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+        await send({"type": "http.response.start", "status": 200, "headers": raw})
+        size = len(body) // chunks
+        for index in range(chunks):
+            part = body[index * size:] if index == chunks - 1 else body[index * size:(index + 1) * size]
+            await send({"type": "http.response.body", "body": part, "more_body": index < chunks - 1})
+
+    return app
+
+
+async def fetch(app, cache: CompressionCache, accept_encoding: str = "gzip", min_size: int = 100):
+    middleware = CompressionMiddleware(app, cache, min_size=min_size)
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        return await client.get("/", headers={"Accept-Encoding": accept_encoding})
+
+
+BODY = b'{"items": [' + b",".join(b'{"id": %d, "name": "Laptop"}' % n for n in range(50)) + b"]}"
+
+
+async def test_compresses_and_rewrites_headers(gzip_only):
+    cache = CompressionCache()
+    response = await fetch(responder(BODY, vary="Authorization"), cache)
+
+    assert response.headers["content-encoding"] == "gzip"
+    compressed_length = int(response.headers["content-length"])
+    assert compressed_length < len(BODY)
+    assert compressed_length == len(gzip.compress(BODY, compresslevel=compression.COMPRESSION_GZIP_LEVEL, mtime=0))
+    assert [value.strip() for value in response.headers["vary"].split(",")] == ["Authorization", "Accept-Encoding"]
+    assert response.content == BODY
+
+
+@pytest.mark.parametrize("app, accept_encoding, length", [
+    (responder(BODY[:99]), "gzip", 99),
+    (responder(BODY, content_type="image/png"), "gzip", len(BODY)),
+    (responder(BODY, content_encoding="br"), "gzip", len(BODY)),
+    (responder(BODY, cache_control="public, no-transform"), "gzip", len(BODY)),
+    (responder(BODY, chunks=3), "gzip", len(BODY)),
+    (responder(BODY), "identity", len(BODY)),
+])
+async def test_passes_through(gzip_only, app, accept_encoding, length):
+    cache = CompressionCache()
+    response = await fetch(app, cache, accept_encoding)
+
+    assert response.headers.get("content-encoding") in (None, "br")
+    assert response.headers["content-length"] == str(length)
+    assert "accept-encoding" not in response.headers.get("vary", "").lower()
+    assert cache.stats()["compressed"] == 0
+
+
+async def test_min_size_threshold(gzip_only):
+    cache = CompressionCache()
+    assert "content-encoding" not in (await fetch(responder(BODY[:99]), cache)).headers
+    assert (await fetch(responder(BODY[:100]), cache)).headers["content-encoding"] == "gzip"
+    assert cache.stats()["skipped"] == 1
+
+
+async def test_text_types_are_compressed(gzip_only):
+    response = await fetch(responder(BODY, content_type="text/plain; charset=utf-8"), CompressionCache())
+    assert response.headers["content-encoding"] == "gzip"
+
+
+async def test_repeated_body_hits_cache(gzip_only):
+    cache = CompressionCache(max_entries=1)
+    first = await fetch(responder(BODY), cache)
+    second = await fetch(responder(BODY), cache)
+    assert first.headers["content-length"] == second.headers["content-length"]
+    assert cache.stats()["compressed"] == 1 and cache.stats()["cache_hits"] == 1
+
+    # Другое тело вытесняет единственную запись
+    await fetch(responder(BODY.replace(b"Laptop", b"Tablet")), cache)
+    await fetch(responder(BODY), cache)
+    assert cache.stats()["compressed"] == 3 and cache.stats()["entries"] == 1
+
+
+async def test_offloaded_compression(gzip_only, monkeypatch):
+    monkeypatch.setattr(compression, "COMPRESSION_OFFLOAD_SIZE", 1)
+    response = await fetch(responder(BODY), CompressionCache())
+    assert response.content == BODY
+
+
+async def test_endpoint_response_compressed(client, seller, category, gzip_only):
+    for number in range(20):
+        await client.post("/products/", headers=auth(seller), json={
+            "name": f"Product {number}", "price": "10.00", "stock": 1, "category_id": category["id"],
+        })
+    response = await client.get("/products/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()["items"]) == 20
+
+    plain = await client.get("/products/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert int(plain.headers["content-length"]) > int(response.headers["content-length"])
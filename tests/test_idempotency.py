@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore, PostgresIdempotencyStore
+
+KEY = ("/reviews/", "Bearer token", "key-1")
+
+
+async def test_postgres_store_shared_between_workers(shared_sessions):
+    first, second = PostgresIdempotencyStore(shared_sessions), PostgresIdempotencyStore(shared_sessions)
+
+    outcome, claim = await first.begin(KEY, "body-a")
+    assert outcome == "run"
+    # Повтор в другом воркере ждёт, пока первый запрос не сохранит ответ
+    waiting = asyncio.create_task(second.begin(KEY, "body-a"))
+    await asyncio.sleep(0.1)
+    assert not waiting.done()
+    await first.finish(KEY, claim, (201, [(b"content-type", b"application/json")], b'{"id": 1}'))
+    assert await waiting == ("replay", (201, [(b"content-type", b"application/json")], b'{"id": 1}'))
+
+    assert await second.begin(KEY, "body-b") == ("mismatch", None)
+    assert second.stats()["waited"] == 1
+
+
+async def test_postgres_store_releases_failed_request(shared_sessions):
+    store = PostgresIdempotencyStore(shared_sessions)
+    outcome, claim = await store.begin(KEY, "body-a")
+    await store.finish(KEY, claim, None)
+    outcome, claim = await store.begin(KEY, "body-a")
+    assert outcome == "run"
+
+
+async def test_postgres_store_takes_over_abandoned_claim(shared_sessions):
+    crashed = PostgresIdempotencyStore(shared_sessions, lock_timeout=0.1)
+    outcome, stale_claim = await crashed.begin(KEY, "body-a")
+    await asyncio.sleep(0.15)
+
+    retry = PostgresIdempotencyStore(shared_sessions, lock_timeout=0.1)
+    outcome, claim = await retry.begin(KEY, "body-a")
+    assert outcome == "run"
+    # Запоздавший первый запрос не перезаписывает чужую строку
+    await crashed.finish(KEY, stale_claim, (200, [], b"stale"))
+    await retry.finish(KEY, claim, (200, [], b"fresh"))
+    assert (await retry.begin(KEY, "body-a"))[1][2] == b"fresh"
+
+
+
+@pytest.fixture(params=["memory", "postgres"])
+def store(request):
+    if request.param == "memory":
+        return IdempotencyStore()
+    return PostgresIdempotencyStore(request.getfixturevalue("shared_sessions"))
+
+
+class Handler:
+    """
+    ASGI-приложение вместо эндпоинта. Вызов номер n отвечает statuses[n]
+    (None — исключение), следующие — 201. Ответ ждёт события release.
+    """
+
+    def __init__(self, *statuses: int | None):
+        self.statuses = list(statuses)
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        call = self.calls
+        status = self.statuses[call - 1] if call <= len(self.statuses) else 201
+        body = (await receive())["body"]
+        await self.release.wait()
+        if status is None:
+            raise RuntimeError("handler failed")
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"call": %d, "echo": %s}' % (call, body)})
+
+
+def client(handler: Handler, store) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=IdempotencyMiddleware(handler, store)), base_url="http://test")
+
+
+def post(http: AsyncClient, body: bytes = b"1", key: str | None = "key-1", path: str = "/reviews/",
+         token: str = "a"):
+    headers = {"Authorization": f"Bearer {token}"}
+    if key is not None:
+        headers["Idempotency-Key"] = key
+    return http.post(path, content=body, headers=headers)
+
+
+async def test_replays_stored_response(store):
+    handler = Handler()
+    async with client(handler, store) as http:
+        first = await post(http)
+        replay = await post(http)
+        other_key = await post(http, key="key-2")
+        no_key = await post(http, key=None)
+
+    assert first.status_code == replay.status_code == 201
+    assert replay.json() == first.json() == {"call": 1, "echo": 1}
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert replay.headers["content-type"] == "application/json"
+    assert "idempotent-replayed" not in first.headers
+    assert (other_key.json()["call"], no_key.json()["call"]) == (2, 3)
+    assert store.stats()["replayed"] == 1
+
+
+async def test_key_scoped_by_credentials_and_path(store):
+    handler = Handler()
+    async with client(handler, store) as http:
+        await post(http)
+        responses = [await post(http, token="b"), await post(http, path="/products/"),
+                     await post(http, path="/categories/")]
+    assert all("idempotent-replayed" not in response.headers for response in responses)
+    assert handler.calls == 4
+
+
+async def test_same_key_different_body_rejected(store):
+    handler = Handler()
+    async with client(handler, store) as http:
+        await post(http, body=b"1")
+        response = await post(http, body=b"2")
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Idempotency-Key reused with different payload"}
+    assert handler.calls == 1
+
+
+async def test_concurrent_duplicate_waits_for_first(store):
+    handler = Handler()
+    handler.release.clear()
+    async with client(handler, store) as http:
+        first = asyncio.create_task(post(http))
+        await asyncio.sleep(0.05)
+        duplicates = [asyncio.create_task(post(http)) for _ in range(3)]
+        await asyncio.sleep(0.2)
+        # Обработчик вызван один раз, повторы ждут его ответа
+        assert handler.calls == 1
+        assert not any(task.done() for task in duplicates)
+        handler.release.set()
+        responses = await asyncio.gather(first, *duplicates)
+
+    assert handler.calls == 1
+    assert {response.json()["call"] for response in responses} == {1}
+    assert [response.headers.get("idempotent-replayed") for response in responses] == [None] + ["true"] * 3
+    assert store.stats()["waited"] >= 1
+
+
+async def test_server_error_is_not_stored(store):
+    handler = Handler(503)
+    async with client(handler, store) as http:
+        assert (await post(http)).status_code == 503
+        retry = await post(http)
+    assert retry.status_code == 201
+    assert "idempotent-replayed" not in retry.headers
+    assert handler.calls == 2
+
+
+async def test_exception_is_not_stored(store):
+    handler = Handler(None)
+    async with client(handler, store) as http:
+        with pytest.raises(RuntimeError):
+            await post(http)
+        retry = await post(http)
+    assert retry.status_code == 201
+    assert retry.json()["call"] == 2
+
+
+async def test_waiting_duplicate_reruns_after_failure(store):
+    handler = Handler(500)
+    handler.release.clear()
+    async with client(handler, store) as http:
+        first = asyncio.create_task(post(http))
+        await asyncio.sleep(0.05)
+        duplicate = asyncio.create_task(post(http))
+        await asyncio.sleep(0.1)
+        handler.release.set()
+        assert (await first).status_code == 500
+        response = await duplicate
+    # Ответ 5xx не сохранён: ждавший повтор выполняет обработчик сам
+    assert response.status_code == 201
+    assert response.json()["call"] == 2
+    assert "idempotent-replayed" not in response.headers
@@ -0,0 +1,49 @@
+from sqlalchemy import select, update
+
+from app.models import OutboxEvent
+from app.outbox import Outbox
+
+
+async def test_unknown_topic_is_retried_then_failed(db):
+    box = Outbox(max_attempts=2, backoff=0)
+    box.enqueue(db, "nobody.listens", {"id": 1})
+    await db.commit()
+
+    assert await box.process_batch(db) == 1
+    event = await db.scalar(select(OutboxEvent).execution_options(populate_existing=True))
+    assert (event.attempts, event.failed_at) == (1, None)
+    assert "No outbox handler" in event.last_error
+
+    # Задержка повтора в будущем; делаем событие готовым сразу
+    await db.execute(update(OutboxEvent).values(available_at=event.created_at))
+    assert await box.process_batch(db) == 1
+    event = await db.scalar(select(OutboxEvent).execution_options(populate_existing=True))
+    assert event.attempts == 2 and event.failed_at is not None
+    assert await box.process_batch(db) == 0
+    assert box.stats() == {"processed": 0, "retried": 1, "failed": 1, "batches": 3}
+
+
+async def test_failed_handler_rolls_back_only_its_event(db):
+    box = Outbox(backoff=0)
+    applied = []
+
+    @box.handler("ok", after_commit=lambda payload: applied.append(payload["n"]))
+    async def ok(session, payload):
+        session.add(OutboxEvent(topic="ok.followup", payload=payload))
+
+    @box.handler("broken")
+    async def broken(session, payload):
+        session.add(OutboxEvent(topic="broken.followup", payload=payload))
+        await session.flush()
+        raise RuntimeError("boom")
+
+    box.enqueue(db, "ok", {"n": 1})
+    box.enqueue(db, "broken", {"n": 2})
+    box.enqueue(db, "ok", {"n": 3})
+    await db.commit()
+
+    assert await box.process_batch(db) == 3
+    assert applied == [1, 3]
+    topics = sorted((await db.scalars(select(OutboxEvent.topic))).all())
+    # Успешные события удалены, их побочные записи сохранены; запись упавшего обработчика откатана
+    assert topics == ["broken", "ok.followup", "ok.followup"]
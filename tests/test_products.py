@@ -0,0 +1,139 @@
+import io
+from datetime import datetime
+
+import pytest
+from PIL import Image
+from sqlalchemy import select, update
+
+from app.edge_cache import edge_cache, product_key
+from app.images import images
+from app.models import Product
+from tests.conftest import auth
+
+
+async def create_products(client, seller, category, count: int) -> list[dict]:
+    products = []
+    for number in range(count):
+        response = await client.post("/products/", headers=auth(seller), json={
+            "name": f"Product {number}", "price": f"{100 + number}.00", "stock": number,
+            "category_id": category["id"],
+        })
+        assert response.status_code == 200, response.text
+        products.append(response.json())
+    return products
+
+
+async def test_create_product_requires_seller(client, buyer, category):
+    response = await client.post("/products/", headers=auth(buyer), json={
+        "name": "Phone", "price": "10.00", "stock": 1, "category_id": category["id"],
+    })
+    assert response.status_code == 403
+
+
+async def test_get_product(client, product):
+    response = await client.get(f"/products/{product['id']}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Laptop"
+    assert (await client.get("/products/1000000000")).status_code == 404
+
+
+async def test_list_filters_and_offset(client, seller, category):
+    await create_products(client, seller, category, 5)
+
+    response = await client.get("/products/", params={"page_size": 2, "page": 2, "sort": "price"})
+    body = response.json()
+    assert response.status_code == 200
+    assert body["total"] == 5
+    assert [item["name"] for item in body["items"]] == ["Product 2", "Product 3"]
+
+    response = await client.get("/products/", params={"in_stock": "false"})
+    assert [item["name"] for item in response.json()["items"]] == ["Product 0"]
+
+    response = await client.get("/products/", params={"min_price": 200, "max_price": 100})
+    assert response.status_code == 400
+
+
+async def test_list_cursor_pages(client, seller, category):
+    created = await create_products(client, seller, category, 5)
+
+    seen, cursor = [], None
+    while True:
+        params = {"page_size": 2, "sort": "-price"}
+        if cursor is not None:
+            params["cursor"] = cursor
+        body = (await client.get("/products/", params=params)).json()
+        seen += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [product["id"] for product in reversed(created)]
+
+
+async def test_update_product(client, db, product, category, purger):
+    response = await client.put(f"/products/{product['id']}", json={
+        "name": "Laptop Pro", "price": "1299.00", "stock": 3, "category_id": category["id"],
+    })
+    assert response.status_code == 200, response.text
+    assert response.json()["name"] == "Laptop Pro"
+
+    updated = await db.scalar(select(Product).where(Product.id == product["id"])
+                              .execution_options(populate_existing=True))
+    assert updated.updated_at.tzinfo is None
+    assert updated.updated_at >= updated.created_at
+
+    await edge_cache.flush()
+    assert product_key(product["id"]) in purger.keys
+    assert (await client.get(f"/products/{product['id']}")).json()["name"] == "Laptop Pro"
+
+
+async def test_delete_product(client, product):
+    assert (await client.delete(f"/products/{product['id']}")).status_code == 200
+    assert (await client.get(f"/products/{product['id']}")).status_code == 404
+    assert (await client.delete("/products/1000000000")).status_code == 404
+
+
+async def test_upload_image(client, seller, buyer, product, tmp_path, monkeypatch):
+    monkeypatch.setattr(images.storage, "root", tmp_path)
+    picture = io.BytesIO()
+    Image.new("RGB", (64, 48), "red").save(picture, format="PNG")
+
+    def upload(user):
+        return client.post(f"/products/{product['id']}/image", headers=auth(user),
+                           files={"file": ("photo.png", picture.getvalue(), "image/png")})
+
+    assert (await upload(buyer)).status_code == 403
+    try:
+        response = await upload(seller)
+    finally:
+        images.shutdown()
+    assert response.status_code == 200, response.text
+    assert response.json()["image_url"]
+    assert any(tmp_path.rglob("*.webp"))
+
+
+@pytest.mark.parametrize("sort", ["created_at", "-created_at"])
+async def test_list_cursor_across_null_created_at(client, db, seller, category, sort):
+    created = await create_products(client, seller, category, 6)
+    ids = [product["id"] for product in created]
+    # Два товара без даты создания и два с одинаковой датой
+    await db.execute(update(Product).where(Product.id.in_(ids[:2])).values(created_at=None))
+    await db.execute(update(Product).where(Product.id.in_(ids[2:4])).values(created_at=datetime(2024, 1, 1)))
+    await db.commit()
+
+    dated = sorted((await db.execute(select(Product.created_at, Product.id)
+                                     .where(Product.id.in_(ids), Product.created_at.isnot(None)))).all())
+    expected = [product_id for _, product_id in dated] + ids[:2]
+    if sort.startswith("-"):
+        expected.reverse()
+
+    seen, cursor = [], None
+    while True:
+        params = {"page_size": 2, "sort": sort}
+        if cursor is not None:
+            params["cursor"] = cursor
+        body = (await client.get("/products/", params=params)).json()
+        seen += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
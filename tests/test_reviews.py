@@ -0,0 +1,106 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from app.edge_cache import edge_cache, product_key, reviews_key
+from app.models import OutboxEvent, Product, Review
+from app.outbox import outbox
+from tests.conftest import auth, register
+
+
+async def post_review(client, user, product, grade=5):
+    return await client.post("/reviews/", headers=auth(user), json={
+        "product_id": product["id"], "grade": grade, "comment": "Хороший товар",
+    })
+
+
+async def test_create_review(client, db, buyer, product, purger):
+    response = await post_review(client, buyer, product)
+    assert response.status_code == 200, response.text
+    assert response.json()["grade"] == 5
+
+    listed = await client.get(f"/reviews/{product['id']}")
+    assert [review["id"] for review in listed.json()] == [response.json()["id"]]
+
+    event = await db.scalar(select(OutboxEvent))
+    assert event.topic == "review.graded"
+    assert event.payload == {"product_id": product["id"], "count": 1, "grade": 5}
+
+    await edge_cache.flush()
+    assert reviews_key(product["id"]) in purger.keys
+
+
+async def test_duplicate_review_forbidden(client, buyer, product):
+    assert (await post_review(client, buyer, product)).status_code == 200
+    response = await post_review(client, buyer, product, grade=1)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Already have review"
+
+
+async def test_review_requires_buyer(client, seller, product):
+    assert (await post_review(client, seller, product)).status_code == 403
+
+
+async def test_review_of_missing_product(client, buyer):
+    assert (await post_review(client, buyer, {"id": 10**9})).status_code == 404
+
+
+async def test_outbox_applies_grades(client, db, buyer, product, purger):
+    review = (await post_review(client, buyer, product, grade=4)).json()
+    assert await outbox.process_batch(db) == 1
+
+    graded = await db.scalar(select(Product).where(Product.id == product["id"])
+                             .execution_options(populate_existing=True))
+    assert (graded.review_count, graded.grade_sum, graded.rating) == (1, 4, 4)
+    assert graded.updated_at is not None and graded.updated_at.tzinfo is None
+    assert await db.scalar(select(func.count()).select_from(OutboxEvent)) == 0
+
+    await edge_cache.flush()
+    assert product_key(product["id"]) in purger.keys
+
+    response = await client.delete(f"/reviews/{review['id']}", headers=auth(buyer))
+    assert response.status_code == 200
+    assert await outbox.process_batch(db) == 1
+    graded = await db.scalar(select(Product).where(Product.id == product["id"])
+                             .execution_options(populate_existing=True))
+    assert (graded.review_count, graded.grade_sum, graded.rating) == (0, 0, None)
+
+
+async def test_delete_review_records_deactivation(client, db, buyer, product):
+    review = (await post_review(client, buyer, product)).json()
+    response = await client.delete(f"/reviews/{review['id']}", headers=auth(buyer))
+    assert response.status_code == 200
+
+    deleted = await db.scalar(select(Review).where(Review.id == review["id"])
+                              .execution_options(populate_existing=True))
+    assert deleted.is_active is False
+    assert deleted.deactivated_at is not None
+    assert (await client.get(f"/reviews/{product['id']}")).json() == []
+
+    # После удаления можно оставить новый отзыв
+    assert (await post_review(client, buyer, product)).status_code == 200
+
+
+async def test_delete_foreign_review_forbidden(client, buyer, product):
+    review = (await post_review(client, buyer, product)).json()
+    other = await register(client, "other-buyer@example.com", "buyer")
+    response = await client.delete(f"/reviews/{review['id']}", headers=auth(other))
+    assert response.status_code == 403
+
+
+async def test_parallel_duplicate_reviews(committed_client):
+    client = committed_client
+    seller = await register(client, "seller@example.com", "seller")
+    buyer = await register(client, "buyer@example.com", "buyer")
+    category = (await client.post("/categories/", json={"name": "Electronics"})).json()
+    product = (await client.post("/products/", headers=auth(seller), json={
+        "name": "Laptop", "price": "999.00", "stock": 5, "category_id": category["id"],
+    })).json()
+
+    responses = await asyncio.gather(*(post_review(client, buyer, product, grade=grade % 5 + 1)
+                                       for grade in range(8)))
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] + [403] * 7, [response.text for response in responses]
+
+    listed = (await client.get(f"/reviews/{product['id']}")).json()
+    assert len(listed) == 1
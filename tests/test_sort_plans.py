@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy import text
+
+from app.plans import PLANNER_SETTINGS, build_statement, explain_sql, plan_problems, seek_modes
+from app.statements import SORT_KEYS
+
+
+CASES = [(sort, category_id, seek)
+         for sort in SORT_KEYS for category_id in (None, 1) for seek in seek_modes(sort)]
+
+
+@pytest.mark.parametrize("sort, category_id, seek", CASES,
+                         ids=[f"{sort.value}-{category_id}-{seek}" for sort, category_id, seek in CASES])
+async def test_list_statement_reads_index(db, sort, category_id, seek):
+    # Настройки откатываются вместе с транзакцией теста
+    for setting in PLANNER_SETTINGS:
+        await db.execute(text(setting))
+    raw = await db.scalar(text(explain_sql(build_statement(sort, category_id, seek))))
+    assert plan_problems(raw[0]["Plan"], sort, seek) == []
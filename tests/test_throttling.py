@@ -0,0 +1,46 @@
+import asyncio
+
+from app.throttling import LoginThrottle, MemoryBackend, PostgresBackend
+
+
+async def test_memory_backend_window():
+    backend = MemoryBackend()
+    assert await backend.acquire("email:a", 2, 60) == 0.0
+    assert await backend.acquire("email:a", 2, 60) == 0.0
+    assert 0 < await backend.acquire("email:a", 2, 60) <= 60
+    await backend.reset("email:a")
+    assert await backend.acquire("email:a", 2, 60) == 0.0
+
+
+async def test_postgres_backend_shared_between_workers(shared_sessions):
+    # Два экземпляра — как два воркера с общей базой
+    workers = [PostgresBackend(shared_sessions), PostgresBackend(shared_sessions)]
+    results = await asyncio.gather(*(workers[n % 2].acquire("email:a", 5, 60) for n in range(8)))
+    assert sorted(result == 0.0 for result in results) == [False] * 3 + [True] * 5
+    assert all(0 < result <= 60 for result in results if result)
+
+    # Другой ключ считается отдельно, сброс освобождает ключ во всех воркерах
+    assert await workers[0].acquire("email:b", 5, 60) == 0.0
+    await workers[1].reset("email:a")
+    assert await workers[0].acquire("email:a", 5, 60) == 0.0
+
+
+async def test_postgres_backend_window_expires(shared_sessions):
+    backend = PostgresBackend(shared_sessions)
+    assert await backend.acquire("ip:10.0.0.1", 1, 0.2) == 0.0
+    assert await backend.acquire("ip:10.0.0.1", 1, 0.2) > 0
+    await asyncio.sleep(0.25)
+    assert await backend.acquire("ip:10.0.0.1", 1, 0.2) == 0.0
+
+
+async def test_login_throttle_limit_across_workers(shared_sessions):
+    throttles = [LoginThrottle(PostgresBackend(shared_sessions), email_limit=3, ip_limit=100, window=60)
+                 for _ in range(2)]
+    rejected = 0
+    for attempt in range(6):
+        try:
+            await throttles[attempt % 2].check("user@example.com", "10.0.0.1")
+        except Exception as exc:
+            assert exc.status_code == 429
+            rejected += 1
+    assert rejected == 3
@@ -0,0 +1,95 @@
+from tests.conftest import PASSWORD, auth, register
+
+
+async def test_login_returns_tokens(client, buyer):
+    response = await client.get("/users/me/stats", headers=auth(buyer))
+    # Токен покупателя принят, но статистика есть только у продавцов
+    assert response.status_code == 403
+
+
+async def test_login_rejects_wrong_password(client, buyer):
+    response = await client.post("/users/token", data={"username": buyer["email"], "password": "wrong-password"})
+    assert response.status_code == 401
+
+
+async def test_login_throttled_by_email(client, buyer):
+    for _ in range(5):
+        response = await client.post("/users/token", data={"username": buyer["email"], "password": "wrong"})
+        assert response.status_code == 401
+    response = await client.post("/users/token", data={"username": buyer["email"], "password": PASSWORD})
+    assert response.status_code == 429
+
+
+async def test_login_throttle_uses_forwarded_client_ip(client, monkeypatch):
+    from app.proxies import TrustedProxies, trusted_proxies
+    from app.throttling import login_throttle
+
+    # ASGITransport подключается с 127.0.0.1 — считаем его балансировщиком
+    monkeypatch.setattr(trusted_proxies, "networks", TrustedProxies(["127.0.0.1"]).networks)
+    seen = []
+    original_check = login_throttle.check
+
+    async def check(email, client_ip):
+        seen.append(client_ip)
+        await original_check(email, client_ip)
+
+    monkeypatch.setattr(login_throttle, "check", check)
+    await client.post("/users/token", data={"username": "nobody@example.com", "password": "x"},
+                      headers={"X-Forwarded-For": "198.51.100.7"})
+    assert seen == ["198.51.100.7"]
+
+
+async def test_refresh_rotation_and_grace_window(client, buyer):
+    first = await client.post("/users/refresh-token", json={"refresh_token": buyer["refresh_token"]})
+    assert first.status_code == 200
+    # Повтор запроса в окне отсрочки получает тот же новый токен
+    retry = await client.post("/users/refresh-token", json={"refresh_token": buyer["refresh_token"]})
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+
+    rotated = first.json()["refresh_token"]
+    second = await client.post("/users/refresh-token", json={"refresh_token": rotated})
+    assert second.status_code == 200
+    assert second.json()["refresh_token"] != rotated
+
+
+async def test_refresh_reuse_after_grace_revokes_family(client, buyer, monkeypatch):
+    monkeypatch.setattr("app.routers.users.REFRESH_REUSE_GRACE_SECONDS", 0)
+    first = await client.post("/users/refresh-token", json={"refresh_token": buyer["refresh_token"]})
+    assert first.status_code == 200
+
+    reuse = await client.post("/users/refresh-token", json={"refresh_token": buyer["refresh_token"]})
+    assert reuse.status_code == 401
+    assert reuse.json()["detail"] == "Refresh token reuse detected"
+
+    # Отозвано всё семейство: и новый refresh-токен, и access-токен входа
+    successor = await client.post("/users/access-token", json={"refresh_token": first.json()["refresh_token"]})
+    assert successor.status_code == 401
+    assert (await client.get("/users/me/stats", headers=auth(buyer))).status_code == 401
+
+
+async def test_logout_revokes_tokens(client, seller):
+    response = await client.post("/users/logout", headers=auth(seller))
+    assert response.status_code == 200
+    assert (await client.get("/users/me/stats", headers=auth(seller))).status_code == 401
+    response = await client.post("/users/access-token", json={"refresh_token": seller["refresh_token"]})
+    assert response.status_code == 401
+
+
+async def test_revocation_applied_only_after_commit(db):
+    from app.revocation import revocations
+
+    await revocations.revoke(db, "rolled-back-token", 2**31)
+    await db.rollback()
+    assert not revocations.is_revoked({"jti": "rolled-back-token"})
+
+    await revocations.revoke(db, "committed-token", 2**31)
+    assert not revocations.is_revoked({"jti": "committed-token"})
+    await db.commit()
+    assert revocations.is_revoked({"jti": "committed-token"})
+
+
+async def test_register_rejects_duplicate_email(client, buyer):
+    response = await client.post("/users/", json={"email": buyer["email"], "password": PASSWORD, "role": "buyer"})
+    assert response.status_code == 400
+    assert await register(client, "other@example.com", "buyer")